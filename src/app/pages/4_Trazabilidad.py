@@ -1,7 +1,11 @@
 import json
+from datetime import date, datetime, time, timezone
+
 import streamlit as st
 
 from src.app.state import load_last
+from src.blockchain.adapter import LocalLedgerAdapter
+from src.blockchain.hashing import content_hash
 from src.blockchain.register import register_evidence
 from src.app.ui_helpers import (
     inject_global_ui,
@@ -27,6 +31,84 @@ with st.sidebar:
     section_title("Consejo demo")
     st.caption("Aqui ensena: hash, timestamp y descarga del comprobante JSON.")
 
+PAGE_SIZE = 25
+
+
+@st.cache_resource
+def get_ledger() -> LocalLedgerAdapter:
+    # Solo lectura del ledger local (tambien es la cache del adaptador BSV): sin red
+    return LocalLedgerAdapter()
+
+
+def render_history() -> None:
+    """Historial paginado usando los indices secundarios del ledger."""
+    st.write("")
+    section_label("Historial")
+    ledger = get_ledger()
+
+    f1, f2, f3, f4 = st.columns(4, gap="small")
+    with f1:
+        scene = st.selectbox("Escena", ["(todas)"] + ledger.distinct_values("scene_id"))
+    with f2:
+        dataset = st.selectbox("Dataset", ["(todos)"] + ledger.distinct_values("dataset_id"))
+    with f3:
+        model = st.selectbox("Modelo", ["(todos)"] + ledger.distinct_values("model_version"))
+    with f4:
+        status = st.selectbox("Estado", ["(todos)"] + ledger.distinct_values("status"))
+    dates = st.date_input("Rango de fechas (UTC)", value=(), format="YYYY-MM-DD")
+
+    # Mientras se elige el rango, date_input devuelve solo la fecha inicial
+    dates = [dates] if isinstance(dates, date) else list(dates)
+    since = datetime.combine(dates[0], time.min, tzinfo=timezone.utc) if dates else None
+    until = datetime.combine(dates[1], time.max, tzinfo=timezone.utc) if len(dates) > 1 else None
+
+    filters = {
+        "scene_id": None if scene == "(todas)" else scene,
+        "dataset_id": None if dataset == "(todos)" else dataset,
+        "model_version": None if model == "(todos)" else model,
+        "status": None if status == "(todos)" else status,
+        "since": since,
+        "until": until,
+    }
+    # Pila de cursores: al cambiar los filtros se vuelve a la primera pagina
+    nav = st.session_state.setdefault("history_nav", {"filters": None, "cursors": [None]})
+    if nav["filters"] != repr(filters):
+        nav.update(filters=repr(filters), cursors=[None])
+
+    page = ledger.query(**filters, limit=PAGE_SIZE, cursor=nav["cursors"][-1])
+    n_page = len(nav["cursors"])
+    st.caption(f"{page['total']} registros · pagina {n_page}")
+
+    rows = [
+        {
+            "timestamp_utc": r.get("timestamp_utc"),
+            "scene_id": r.get("scene_id"),
+            "dataset_id": r.get("dataset_id"),
+            "model_version": r.get("model_version"),
+            "estado": r.get("status", "registered"),
+            "tx_id": r.get("tx_id") or "",
+            # Ultima verificacion on-chain cacheada con el registro (sin consultar WhatsOnChain)
+            "confirmaciones": (r.get("verification") or {}).get("confirmations"),
+            "analysis_hash": r.get("analysis_hash"),
+        }
+        for r in page["records"]
+    ]
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    else:
+        st.info("Sin registros para estos filtros.")
+
+    b1, b2, _ = st.columns([1, 1, 4])
+    with b1:
+        if st.button("Anterior", disabled=n_page == 1, use_container_width=True):
+            nav["cursors"].pop()
+            st.rerun()
+    with b2:
+        if st.button("Siguiente", disabled=page["next_cursor"] is None, use_container_width=True):
+            nav["cursors"].append(page["next_cursor"])
+            st.rerun()
+
+
 page_header(
     "Trazabilidad",
     "Evidencia de integridad del analisis: hash + timestamp + resultado de registro.",
@@ -36,11 +118,18 @@ page_header(
 run = load_last()
 if not run:
     st.info("No hay ultima ejecucion. Ve a Deteccion y sube una imagen.")
+    render_history()
     st.stop()
 
 bundle = run["bundle"]
 
-result = register_evidence(bundle)
+# Cada interaccion re-ejecuta la pagina: se registra una vez por contenido del
+# bundle (el ledger tambien deduplica, asi que nunca se repite la transaccion)
+registered = st.session_state.setdefault("evidence_results", {})
+key = content_hash(bundle)
+if key not in registered:
+    registered[key] = register_evidence(bundle)
+result = registered[key]
 evidence = result.get("evidence", {})
 chain = result.get("chain", {})
 
@@ -91,3 +180,5 @@ with left:
 with right:
     st.subheader("Resultado on-chain")
     st.code(json.dumps(chain, indent=2) if chain else "Sin datos")
+
+render_history()
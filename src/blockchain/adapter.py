@@ -1,17 +1,44 @@
 from __future__ import annotations
 
+import atexit
 import hashlib
 import json
 import logging
+import os
+import threading
 import uuid
+import weakref
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
-
-import requests
+from concurrent.futures import Future
+from typing import Any, Iterator
 
 from src import config
+from src.blockchain.canonical import canonical_bytes, canonical_hash, canonical_json
+from src.blockchain.broadcast_queue import BroadcastQueue, batch_owner, ensure_worker
+from src.blockchain.http_client import IMMUTABLE, arc_broadcast, arc_client, woc_client
+from src.blockchain.ledger_chain import (
+    UPDATABLE_FIELDS,
+    chain_entry,
+    load_checkpoints,
+    read_chain_head,
+    remap_checkpoints,
+    write_checkpoint,
+)
+from src.blockchain.ledger_catalog import LedgerCatalog
+from src.blockchain.ledger_index import (
+    LedgerIndex,
+    default_lock_path,
+    default_updates_archive_path,
+    iter_lines_reverse,
+)
+from src.blockchain.ledger_segments import LedgerSegments, period_key
+from src.blockchain.merkle import build_levels, merkle_proof, verify_proof
+from src.blockchain.tx_pool import TxPipeline
+from src.blockchain.utxo import UtxoManager
+from src.blockchain.verify_cache import cache_entry, fetch_tx_status, is_stale
+from src.storage.blob_store import BlobStore, default_blob_dir
 
 
 logger = logging.getLogger(__name__)
@@ -19,35 +46,28 @@ logger = logging.getLogger(__name__)
 # Protocol prefix for OP_RETURN data
 APP_PREFIX = "TRAFFIC_EVIDENCE"
 APP_VERSION = "v1.0"
+# Merkle batch anchors: [MERKLE_PREFIX, root, leaf_count, APP_VERSION]
+MERKLE_PREFIX = "TRAFFIC_EVIDENCE_MERKLE"
+# Smallest coin worth spending for a data tx (fee is a few dozen sats)
+MIN_FUNDING_SATS = 100
+# Size estimate of a one-input P2PKH tx, excluding its data outputs
+TX_OVERHEAD_BYTES = 10
+P2PKH_INPUT_BYTES = 148
+P2PKH_OUTPUT_BYTES = 34
+# Cached verification fields copied onto the record returned by verify()
+VERIFICATION_FIELDS = (
+    "on_chain_verified", "confirmations", "merkle_root_in_tx", "output_verified",
+    "raw_tx_available", "verify_error",
+)
 
 
 # ======================================================================
 # INTEGRITY (HASHING) - CASE (A)
 # ======================================================================
 
-def canonical_json(data: dict[str, Any]) -> str:
-    """
-    Deterministic JSON:
-    - sort_keys=True for stable ordering
-    - separators remove whitespace
-    - ensure_ascii=True for cross-platform reproducibility
-    """
-    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
-
-
 def compute_hash(data: dict[str, Any]) -> str:
     """SHA-256 hex of canonical JSON."""
-    canon = canonical_json(data)
-    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
-
-
-def compute_file_hash(file_path: str) -> str:
-    """SHA-256 hex of file bytes."""
-    sha = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            sha.update(chunk)
-    return sha.hexdigest()
+    return canonical_hash(data)
 
 
 def build_analysis_payload(
@@ -110,7 +130,9 @@ def build_evidence_record(
     - analysis_hash (required)
     - scene_id (optional but recommended)
     """
-    analysis_hash = compute_hash(analysis_payload)
+    # Serialize once: the same canonical bytes give the hash and the stored copy
+    canon = canonical_bytes(analysis_payload)
+    analysis_hash = hashlib.sha256(canon).hexdigest()
 
     record: dict[str, Any] = {
         "analysis_hash": analysis_hash,
@@ -126,7 +148,7 @@ def build_evidence_record(
     # Useful for local ledger: audit/debug and later verification
     if store_payload_locally:
         record["analysis_payload"] = analysis_payload
-        record["analysis_payload_canonical"] = canonical_json(analysis_payload)
+        record["analysis_payload_canonical"] = canon.decode("ascii")
 
     return record
 
@@ -158,6 +180,64 @@ class BlockchainAdapter(ABC):
         """List recent evidence records."""
         ...
 
+    @abstractmethod
+    def iter_records(
+        self,
+        scene_id: str | None = None,
+        dataset_id: str | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream evidence records (oldest first) matching the filters."""
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        scene_id: str | None = None,
+        dataset_id: str | None = None,
+        model_version: str | None = None,
+        status: str | list[str] | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+        newest_first: bool = True,
+        with_total: bool = True,
+    ) -> dict[str, Any]:
+        """One page of records matching the filters: {records, next_cursor, total}."""
+        ...
+
+
+def _as_utc(ts: str | datetime) -> datetime:
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def record_matches(
+    record: dict[str, Any],
+    scene_id: str | None = None,
+    dataset_id: str | None = None,
+    since: str | datetime | None = None,
+    until: str | datetime | None = None,
+) -> bool:
+    """Filter predicate shared by the adapters' iter_records."""
+    if scene_id is not None and record.get("scene_id") != scene_id:
+        return False
+    if dataset_id is not None and record.get("dataset_id") != dataset_id:
+        return False
+    if since is not None or until is not None:
+        ts = record.get("timestamp_utc")
+        if not ts:
+            return False
+        t = _as_utc(ts)
+        if since is not None and t < _as_utc(since):
+            return False
+        if until is not None and t > _as_utc(until):
+            return False
+    return True
+
 
 # ======================================================================
 # LOCAL JSONL LEDGER (always active, also used as cache for BSV)
@@ -169,69 +249,446 @@ class LocalLedgerAdapter(BlockchainAdapter):
     def __init__(self, ledger_path: str | Path | None = None):
         self.ledger_path = Path(ledger_path) if ledger_path else Path(config.LEDGER_PATH)
         self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        # Sealed segments; the file at ledger_path is the active segment
+        self.segments = LedgerSegments(self.ledger_path, getattr(config, "LEDGER_BLOOM_FP_RATE", 0.01))
+        # Its lock is also a file lock: appends, updates, rotation and compaction
+        # of the same ledger by other processes are serialised with ours
+        self._index = LedgerIndex(
+            self.ledger_path,
+            lock_path=default_lock_path(self.ledger_path),
+            on_shrink=self.segments.reload,  # rotated elsewhere: pick up the new segment
+        )
+        self._index.sync()  # pick up lines written before the index existed
+        # Entries after this point are only updated through the chained updates log
+        self._index.start_updates_chain()
+        self._compaction_stop: threading.Event | None = None
+        # Payloads live in a content-addressed store; ledger lines keep metadata only
+        self.blobs = BlobStore(default_blob_dir(self.ledger_path))
+        self.checkpoint_every = int(getattr(config, "LEDGER_CHECKPOINT_EVERY", 0))
+        self.segment_max_bytes = int(getattr(config, "LEDGER_SEGMENT_MAX_BYTES", 0))
+        self.segment_period = str(getattr(config, "LEDGER_SEGMENT_PERIOD", ""))
+        # Secondary indexes (scene, dataset, model, time, status) over every segment
+        self._catalog = LedgerCatalog(self.ledger_path)
+        if len(self._catalog) == 0 and (len(self.segments) or self.ledger_path.exists()):
+            self.rebuild_catalog()
+        else:
+            self._sync_catalog()
+        # Hash-chain head; reloaded from the tail whenever another writer appended
+        self._chain_head, self._chain_seq = read_chain_head(self.ledger_path)
+        self._chain_end = self.ledger_path.stat().st_size if self.ledger_path.exists() else 0
+        self._chain_version = self.segments.version
 
     def register(self, evidence_record: dict[str, Any]) -> dict[str, Any]:
-        evidence_id = str(uuid.uuid4())
-        entry = {
-            "evidence_id": evidence_id,
-            **evidence_record,
-        }
-        with open(self.ledger_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, sort_keys=True, ensure_ascii=True) + "\n")
-
-        logger.info(
-            "[LOCAL] Registered %s -> %s",
-            str(evidence_record.get("analysis_hash", ""))[:16],
-            evidence_id[:8],
-        )
+        analysis_hash = str(evidence_record.get("analysis_hash", ""))
+        with self._index.lock:
+            # Idempotent: the index doubles as the dedupe table (one line per analysis_hash)
+            self._index.sync()
+            existing = self._existing_result(analysis_hash) if analysis_hash else None
+            if existing is not None:
+                logger.info("[LOCAL] %s already registered -> %s", analysis_hash[:16], existing["evidence_id"][:8])
+                return existing
+
+            self._maybe_rotate()
+            evidence_id = str(uuid.uuid4())
+            entry = self._detach_payload({
+                "evidence_id": evidence_id,
+                **evidence_record,
+            })
+            # Fields outside entry_hash go through the chained updates log, never the entry line
+            initial = {k: entry.pop(k) for k in list(entry) if k in UPDATABLE_FIELDS and k != "entry_hash"}
+            with open(self.ledger_path, "ab") as f:
+                offset = f.tell()
+                # Reload the head if another writer appended, or rotated (new active file)
+                self.segments.reload()
+                if offset != self._chain_end or self.segments.version != self._chain_version:
+                    self._chain_head, self._chain_seq = read_chain_head(self.ledger_path)
+                    self._chain_version = self.segments.version
+                entry = chain_entry(entry, self._chain_head, self._chain_seq + 1)
+                line = (json.dumps(entry, sort_keys=True, ensure_ascii=True) + "\n").encode("utf-8")
+                f.write(line)
+            self._chain_head, self._chain_seq = entry["entry_hash"], entry["chain_seq"]
+            self._chain_end = offset + len(line)
+            self._index.add(analysis_hash, offset, len(line))
+            self._catalog.add(entry, offset, len(line))
+            if initial:
+                self._index.add_updates({analysis_hash: initial})
+                self._sync_catalog()
+
+            if self.checkpoint_every > 0 and (self._chain_seq + 1) % self.checkpoint_every == 0:
+                write_checkpoint(self.ledger_path, self._chain_head, self._chain_seq, offset)
+
+        logger.info("[LOCAL] Registered %s -> %s", analysis_hash[:16], evidence_id[:8])
         return {
             "evidence_id": evidence_id,
             "tx_id": f"local_{evidence_id[:8]}",
             "status": "registered",
         }
 
-    def verify(self, analysis_hash: str) -> dict[str, Any] | None:
-        if not self.ledger_path.exists():
+    def _existing_result(self, analysis_hash: str) -> dict[str, Any] | None:
+        """Result of an earlier registration of the same analysis, or None."""
+        record = self._read_record(analysis_hash)
+        if record is None:
             return None
+        evidence_id = str(record.get("evidence_id", ""))
+        return {
+            "evidence_id": evidence_id,
+            "tx_id": record.get("tx_id") or f"local_{evidence_id[:8]}",
+            "status": record.get("status", "registered"),
+            "timestamp_utc": record.get("timestamp_utc"),
+            "duplicate": True,
+        }
 
-        text = self.ledger_path.read_text(encoding="utf-8").strip()
-        if not text:
-            return None
+    def _read_record(self, analysis_hash: str) -> dict[str, Any] | None:
+        """Active segment first (index), then sealed segments pruned by the manifest."""
+        record = self._index.read_record(analysis_hash)
+        # Another adapter or process may have sealed segments since we last looked
+        if record is None and (self.segments.reload() or len(self.segments)):
+            record = self.segments.read_record(analysis_hash)
+            if record is not None:
+                record = self._index.apply_updates(record)
+        return record
 
-        for line in text.splitlines():
-            record = json.loads(line)
-            if record.get("analysis_hash") == analysis_hash:
-                return record
-        return None
+    def verify(self, analysis_hash: str) -> dict[str, Any] | None:
+        """O(1): index lookup + one seek/parse of the matching line."""
+        self._index.sync()
+        return self._read_record(analysis_hash)
+
+    def read_records(self, hashes: list[str]) -> dict[str, dict[str, Any]]:
+        """Bulk verify(): one indexed pass per segment that may hold any of the hashes."""
+        self._index.sync()
+        out = self._index.read_records(hashes)
+        missing = [h for h in dict.fromkeys(hashes) if h not in out]
+        if missing and (self.segments.reload() or len(self.segments)):
+            for h, record in self.segments.read_records(missing).items():
+                out[h] = self._index.apply_updates(record)
+        return out
+
+    def _files_newest_first(self) -> Iterator[Path]:
+        self.segments.reload()
+        yield self.ledger_path
+        for seg in reversed(self.segments.segments):
+            yield self.segments.path(seg)
 
     def list_records(self, limit: int = 50) -> list[dict[str, Any]]:
-        if not self.ledger_path.exists():
-            return []
-        text = self.ledger_path.read_text(encoding="utf-8").strip()
-        if not text:
-            return []
-        lines = text.splitlines()
-        records = [json.loads(line) for line in lines[-limit:]]
-        return list(reversed(records))
-
-    def _update_record_txid(self, analysis_hash: str, txid: str) -> None:
-        """Update a local record with the on-chain txid."""
-        if not self.ledger_path.exists():
-            return
+        """Most recent first; reads only the tail blocks holding `limit` lines."""
+        records: list[dict[str, Any]] = []
+        if limit <= 0:
+            return records
+        for path in self._files_newest_first():
+            if not path.exists():
+                continue
+            for line in iter_lines_reverse(path):
+                records.append(self._index.apply_updates(json.loads(line)))
+                if len(records) >= limit:
+                    return records
+        return records
+
+    def iter_records(
+        self,
+        scene_id: str | None = None,
+        dataset_id: str | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream matching records (constant memory). With scene_id/dataset_id the
+        secondary indexes pick the records; otherwise the ledger is streamed
+        line by line, skipping sealed segments outside [since, until].
+        """
+        if scene_id is not None or dataset_id is not None:
+            cursor = None
+            while True:
+                page = self.query(
+                    scene_id=scene_id, dataset_id=dataset_id, since=since, until=until,
+                    limit=500, cursor=cursor, newest_first=False, with_total=False,
+                )
+                for record in page["records"]:
+                    if record_matches(record, scene_id, dataset_id, since, until):
+                        yield record
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    return
+
+        self.segments.reload()
+        paths = [self.segments.path(seg) for seg in self.segments.overlapping(since, until)]
+        paths.append(self.ledger_path)
+        for path in paths:
+            if not path.exists():
+                continue
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = self._index.apply_updates(json.loads(line))
+                    if record_matches(record, scene_id, dataset_id, since, until):
+                        yield record
+
+    def query(
+        self,
+        scene_id: str | None = None,
+        dataset_id: str | None = None,
+        model_version: str | None = None,
+        status: str | list[str] | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+        newest_first: bool = True,
+        with_total: bool = True,
+    ) -> dict[str, Any]:
+        """
+        One page of records matching the filters, ordered by timestamp_utc.
+        Uses the secondary indexes, then reads just the page through the
+        primary index. Pass next_cursor back to get the following page.
+        """
+        self._index.sync()
+        self._sync_catalog()
+        filters = {"scene_id": scene_id, "dataset_id": dataset_id, "model_version": model_version, "status": status}
+        hashes, next_cursor = self._catalog.find(since, until, limit, cursor, newest_first, **filters)
+        found = self.read_records(hashes)
+        return {
+            "records": [found[h] for h in hashes if h in found],
+            "next_cursor": next_cursor,
+            "total": self._catalog.count(since, until, **filters) if with_total else None,
+        }
 
-        text = self.ledger_path.read_text(encoding="utf-8").strip()
-        if not text:
-            return
+    def distinct_values(self, field: str) -> list[str]:
+        """Known values of an indexed field (scene_id, dataset_id, model_version, status)."""
+        return self._catalog.distinct(field)
+
+    def rebuild_catalog(self) -> int:
+        """Recreate the secondary indexes from every segment and the updates log."""
+        with self._index.lock:
+            self.segments.reload()
+            files = [self.segments.path(seg) for seg in self.segments.segments] + [self.ledger_path]
+            return self._catalog.rebuild(files, self._index.updates_path)
+
+    # ---- payloads ----
+
+    def _detach_payload(self, record: dict[str, Any]) -> dict[str, Any]:
+        """Move analysis_payload(_canonical) into the blob store."""
+        payload = record.pop("analysis_payload", None)
+        canonical = record.pop("analysis_payload_canonical", None)
+        if isinstance(canonical, str):
+            key = self.blobs.put_bytes(canonical.encode("utf-8"))
+        elif isinstance(payload, dict):
+            key = self.blobs.put(payload)
+        else:
+            return record
+        if key != record.get("analysis_hash"):
+            # Payload does not hash to analysis_hash; keep it reachable anyway
+            record["payload_hash"] = key
+        return record
 
-        lines = text.splitlines()
-        updated_lines: list[str] = []
-        for line in lines:
-            record = json.loads(line)
-            if record.get("analysis_hash") == analysis_hash:
-                record["tx_id"] = txid
-            updated_lines.append(json.dumps(record, sort_keys=True, ensure_ascii=True))
+    def _payload_key(self, record_or_hash: dict[str, Any] | str) -> str | None:
+        if isinstance(record_or_hash, str):
+            record = self.verify(record_or_hash) or {"analysis_hash": record_or_hash}
+        else:
+            record = record_or_hash
+        return record.get("payload_hash") or record.get("analysis_hash")
+
+    def load_payload(self, record_or_hash: dict[str, Any] | str) -> dict[str, Any] | None:
+        """Payload of a record, loaded lazily (inline in legacy lines, else from the blob store)."""
+        if isinstance(record_or_hash, dict) and isinstance(record_or_hash.get("analysis_payload"), dict):
+            return record_or_hash["analysis_payload"]
+        key = self._payload_key(record_or_hash)
+        return self.blobs.get(key) if key else None
+
+    def load_canonical(self, record_or_hash: dict[str, Any] | str) -> str | None:
+        """Canonical JSON of the payload, as hashed into analysis_hash."""
+        if isinstance(record_or_hash, dict) and isinstance(record_or_hash.get("analysis_payload"), dict):
+            return canonical_json(record_or_hash["analysis_payload"])
+        key = self._payload_key(record_or_hash)
+        return self.blobs.get_canonical(key) if key else None
 
-        self.ledger_path.write_text("\n".join(updated_lines) + "\n", encoding="utf-8")
+    def _update_record_txid(self, analysis_hash: str, txid: str) -> None:
+        """Record the on-chain txid as an appended update (merged at read time)."""
+        self._update_record(analysis_hash, {"tx_id": txid})
+
+    def _update_record(self, analysis_hash: str, fields: dict[str, Any]) -> None:
+        self._update_records({analysis_hash: fields})
+
+    def _update_records(self, updates: dict[str, dict[str, Any]]) -> None:
+        """Apply field updates to several records in one append + one index transaction."""
+        immutable = {k for fields in updates.values() for k in fields} - UPDATABLE_FIELDS
+        if immutable:
+            raise ValueError(f"Fields covered by the ledger hash chain cannot be updated: {sorted(immutable)}")
+        self._index.add_updates(updates)
+        self._sync_catalog()
+
+    def _sync_catalog(self) -> None:
+        # The catalog follows the active file by offset: not while another process compacts it
+        with self._index.lock:
+            self._catalog.sync(self._index.updates_path)
+
+    # ---- rotation ----
+
+    def _active_opened(self) -> datetime:
+        opened = self.segments.active_opened()
+        if opened is None:
+            # Never rotated: date the active segment by its last write
+            opened = datetime.fromtimestamp(self.ledger_path.stat().st_mtime, timezone.utc)
+            self.segments.set_active_opened(opened)
+        return opened
+
+    def _maybe_rotate(self) -> None:
+        """Seal the active segment if it is over the size limit or from an earlier day/month."""
+        size = self.ledger_path.stat().st_size if self.ledger_path.exists() else 0
+        if size == 0:
+            return
+        if self.segment_max_bytes > 0 and size >= self.segment_max_bytes:
+            self.rotate()
+        elif self.segment_period and (
+            period_key(self._active_opened(), self.segment_period)
+            != period_key(datetime.now(timezone.utc), self.segment_period)
+        ):
+            self.rotate()
+
+    def rotate(self) -> dict[str, Any] | None:
+        """
+        Seal the active segment: move it into the segment directory, describe
+        it in the manifest and start a new, empty active file. The hash chain
+        continues across segments. Returns the manifest entry (None if empty).
+        """
+        with self._index.lock:
+            self._index.sync()
+            if not self.ledger_path.exists() or self.ledger_path.stat().st_size == 0:
+                return None
+            cp_hashes = {cp["entry_hash"] for cp in load_checkpoints(self.ledger_path) if not cp.get("segment")}
+            seg, cp_offsets = self.segments.seal(self.ledger_path, cp_hashes)
+            remap_checkpoints(self.ledger_path, cp_offsets, segment=seg["name"])
+            self._index.clear_records()
+            self._catalog.mark_synced(0)
+            self._chain_end = 0
+        return seg
+
+    # ---- compaction ----
+
+    def _compact_file(
+        self,
+        path: Path,
+        pending: dict[str, dict[str, Any]],
+        detach_payloads: bool,
+        cp_hashes: set[str],
+    ) -> tuple[int, dict[str, int]]:
+        """Rewrite one segment file with `pending` folded in. Returns (records rewritten, checkpoint offsets)."""
+        cp_offsets: dict[str, int] = {}
+        tmp = path.with_name(path.name + ".compact")
+        rewritten = 0
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                upd = pending.get(record.get("analysis_hash"))
+                inline = detach_payloads and (
+                    "analysis_payload" in record or "analysis_payload_canonical" in record
+                )
+                if upd or inline:
+                    record.update(upd or {})
+                    if inline:
+                        record = self._detach_payload(record)
+                    line = (json.dumps(record, sort_keys=True, ensure_ascii=True) + "\n").encode("utf-8")
+                    rewritten += 1
+                if record.get("entry_hash") in cp_hashes:
+                    cp_offsets[record["entry_hash"]] = dst.tell()
+                dst.write(line)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if rewritten:
+            os.replace(tmp, path)
+        else:
+            tmp.unlink()
+        return rewritten, cp_offsets
+
+    def compact(self, detach_payloads: bool = False) -> int:
+        """
+        Fold pending updates into the ledger files (and, with detach_payloads,
+        move inline payloads of older lines into the blob store).
+
+        Each segment holding an updated record is rewritten next to the old
+        one, fsynced and swapped in with an atomic rename, so a crash leaves
+        either the old or the new file. Sealed segments whose Bloom filter
+        rules out every pending hash are not read at all.
+        Updates appended while compacting are kept for the next run; folded
+        ones are appended to the updates archive.
+        Only UPDATABLE_FIELDS change, so entry hashes stay valid; checkpoint
+        offset hints are moved to the rewritten lines.
+        Returns the number of records rewritten.
+        """
+        with self._index.lock:
+            self._index.sync()
+            self.segments.reload()  # every segment must see the updates folded below
+            self._catalog.sync(self._index.updates_path)
+            pending = self._index.all_updates()
+            if not pending and not detach_payloads:
+                return 0
+            folded_upto = self._index.updates_bytes
+            cp_hashes = {cp["entry_hash"] for cp in load_checkpoints(self.ledger_path)}
+
+            rewritten = 0
+            for seg in list(self.segments.segments):
+                if not detach_payloads and not any(self.segments.may_contain(seg, h) for h in pending):
+                    continue
+                n, cp_offsets = self._compact_file(self.segments.path(seg), pending, detach_payloads, cp_hashes)
+                if n:
+                    remap_checkpoints(self.ledger_path, cp_offsets, segment=seg["name"])
+                    self.segments.refresh(seg["name"])
+                    rewritten += n
+            if self.ledger_path.exists():
+                n, cp_offsets = self._compact_file(self.ledger_path, pending, detach_payloads, cp_hashes)
+                if n:
+                    remap_checkpoints(self.ledger_path, cp_offsets)
+                    rewritten += n
+                self._chain_end = self.ledger_path.stat().st_size
+
+            # Keep only updates that arrived after the snapshot we folded. The
+            # folded ones move to the archive: the updates chain, and audit()'s
+            # check of the folded fields, continue across it
+            updates_path = self._index.updates_path
+            if updates_path.exists():
+                with open(updates_path, "rb") as f:
+                    folded = f.read(folded_upto)
+                    tail = f.read()
+                if folded:
+                    with open(default_updates_archive_path(updates_path), "ab") as f:
+                        f.write(folded)
+                        f.flush()
+                        os.fsync(f.fileno())
+                tmp_upd = updates_path.with_name(updates_path.name + ".compact")
+                with open(tmp_upd, "wb") as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_upd, updates_path)
+
+            self._index.rebuild()
+            # Everything was cataloged before the rewrite; re-follow the kept updates tail
+            active_size = self.ledger_path.stat().st_size if self.ledger_path.exists() else 0
+            self._catalog.mark_synced(active_size, 0)
+            self._catalog.sync(self._index.updates_path)
+
+        logger.info("[LOCAL] Compacted ledger: %d records updated", rewritten)
+        return rewritten
+
+    def start_background_compaction(self, interval_s: float = 3600.0) -> threading.Thread:
+        """Run compact() periodically in a daemon thread until stop_background_compaction()."""
+        stop = self._compaction_stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(interval_s):
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error("[LOCAL] Compaction failed: %s", e, exc_info=True)
+
+        t = threading.Thread(target=loop, name="ledger-compaction", daemon=True)
+        t.start()
+        return t
+
+    def stop_background_compaction(self) -> None:
+        if self._compaction_stop is not None:
+            self._compaction_stop.set()
 
 
 # ======================================================================
@@ -246,15 +703,57 @@ class BSVAdapter(BlockchainAdapter):
     All records are also saved to local ledger for fast lookups.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        anchor_mode: str | None = None,
+        async_broadcast: bool | None = None,
+        woc_base: str | None = None,
+        arc_url: str | None = None,
+    ):
         self.private_key_wif = getattr(config, "BSV_PRIVATE_KEY", "")
         self.network = getattr(config, "BSV_NETWORK", "testnet")  # "main" or "testnet"
-        self.arc_url = getattr(config, "ARC_URL", "")
-        self.woc_base = getattr(config, "WOC_BASE", "")
+        self.arc_url = arc_url or getattr(config, "ARC_URL", "")
+        self.woc_base = woc_base or getattr(config, "WOC_BASE", "")
+        self.arc_api_key = getattr(config, "ARC_API_KEY", "") or os.getenv("ARC_API_KEY") or None
+        # Pooled, rate-limited clients shared per base URL
+        self._woc = woc_client(self.woc_base) if self.woc_base else None
+        self._arc = arc_client(self.arc_url) if self.arc_url else None
         self._local = LocalLedgerAdapter()  # always keep local copy
 
+        # Merkle batching
+        self.anchor_mode = anchor_mode or getattr(config, "BSV_ANCHOR_MODE", "single")
+        self.batch_max_size = int(getattr(config, "BSV_BATCH_MAX_SIZE", 64))
+        self.batch_max_age_s = float(getattr(config, "BSV_BATCH_MAX_AGE_S", 60.0))
+        self.multi_max_outputs = int(getattr(config, "BSV_MULTI_MAX_OUTPUTS", 50))
+        self.multi_max_tx_bytes = int(getattr(config, "BSV_MULTI_MAX_TX_BYTES", 50_000))
+        self.batch_claim_ttl_s = float(getattr(config, "BSV_BATCH_CLAIM_TTL_S", 600.0))
+        self._batch: list[str] = []
+        self._batch_lock = threading.RLock()
+        self._batch_timer: threading.Timer | None = None
+        self._batch_owner = batch_owner()
+
+        # Async broadcast: durable queue drained by a background worker
+        if async_broadcast is None:
+            async_broadcast = bool(getattr(config, "BSV_ASYNC_BROADCAST", False))
+        self.async_broadcast = async_broadcast
+        self._queue = BroadcastQueue() if async_broadcast else None
+
+        # Batch leaves are claimed in the queue DB so two adapters never anchor the same one
+        self._claims = self._queue or (BroadcastQueue() if self.anchor_mode == "merkle" else None)
+        if self.anchor_mode == "merkle":
+            self._recover_pending_batch()
+
+        # Fixed sat/kB rate, or 0 for the live policy (used in-process and by the pipeline)
+        self.fee_rate_sat_per_kb = int(getattr(config, "BSV_FEE_RATE_SAT_PER_KB", 0))
+
+        # Build + sign in worker processes (0 = in this process)
+        self.tx_pool_workers = int(getattr(config, "BSV_TX_POOL_WORKERS", 0))
+        self._pipeline: TxPipeline | None = None
+        self._pipeline_lock = threading.Lock()
+
         self._key = None
         self._address = None
+        self.utxos: UtxoManager | None = None
 
         if not self.private_key_wif:
             logger.warning("BSV_PRIVATE_KEY not set - BSVAdapter in local-only mode")
@@ -267,6 +766,7 @@ class BSVAdapter(BlockchainAdapter):
             from bsv import PrivateKey
             self._key = PrivateKey(self.private_key_wif)
             self._address = self._key.address()
+            self.utxos = UtxoManager(str(self._address), self._fetch_utxos, self._fetch_raw_tx)
             logger.info("[BSV] Initialized key, address: %s", self._address)
         except Exception as e:
             logger.error("[BSV] Failed to init PrivateKey: %s", e)
@@ -287,75 +787,44 @@ class BSVAdapter(BlockchainAdapter):
         """Fetch unspent outputs for our address from WhatsOnChain."""
         if not self._address:
             return []
-        url = f"{self.woc_base}/address/{self._address}/unspent"
-        resp = requests.get(url, timeout=15)
-        resp.raise_for_status()
-        utxos = resp.json()
+        utxos = self._woc.get_json(f"address/{self._address}/unspent")
         logger.info("[BSV] Found %d UTXOs for %s", len(utxos), self._address)
         return utxos
 
     def _fetch_raw_tx(self, txid: str) -> str:
         """Fetch raw transaction hex from WhatsOnChain."""
-        url = f"{self.woc_base}/tx/{txid}/hex"
-        resp = requests.get(url, timeout=15)
-        resp.raise_for_status()
-        return resp.text.strip()
+        # A txid's raw hex never changes: cache it for the process lifetime
+        return self._woc.get_text(f"tx/{txid}/hex", cache_ttl_s=IMMUTABLE)
 
     # ---- Transaction building ----
 
-    def _build_op_return_tx(self, analysis_hash: str, scene_id: str) -> Any:
-        """Build a signed OP_RETURN transaction using bsv-sdk."""
-        from bsv import (
-            Transaction, TransactionInput, TransactionOutput,
-            P2PKH, OpReturn,
-        )
+    def _build_tx(self, utxo: dict[str, Any], outputs: list[Any]) -> Any:
+        """
+        Build and sign a tx spending one reserved coin into `outputs` plus
+        change back to our address. The parent tx comes from the local cache.
+        """
+        from bsv import Transaction, TransactionInput, TransactionOutput, P2PKH
 
-        if not self._address or not self._key:
+        if not self._address or not self._key or self.utxos is None:
             raise RuntimeError("BSV key/address not initialized")
 
-        utxos = self._fetch_utxos()
-        if not utxos:
-            raise RuntimeError(
-                f"No UTXOs available for address {self._address}. "
-                "Fund the address to broadcast on-chain."
-            )
-
-        # Pick UTXO with max value (simple selection)
-        utxo = max(utxos, key=lambda u: u.get("value", 0))
-        source_txid = utxo["tx_hash"]
-        source_vout = utxo["tx_pos"]
-        source_satoshis = utxo["value"]
-
         logger.info(
             "[BSV] Using UTXO %s:%d (%d sats)",
-            source_txid, source_vout, source_satoshis,
+            utxo["txid"], utxo["vout"], utxo["satoshis"],
         )
-
-        raw_hex = self._fetch_raw_tx(source_txid)
-        source_tx = Transaction.from_hex(raw_hex)
+        source_tx = Transaction.from_hex(self.utxos.source_tx_hex(utxo["txid"]))
 
         tx = Transaction()
 
         tx_input = TransactionInput(
             source_transaction=source_tx,
-            source_output_index=source_vout,
+            source_output_index=utxo["vout"],
             unlocking_script_template=P2PKH().unlock(self._key),
         )
         tx.add_input(tx_input)
 
-        # OP_RETURN data: keep it minimal
-        # Format: [APP_PREFIX, analysis_hash, scene_id, APP_VERSION]
-        op_return_data = [
-            APP_PREFIX,
-            analysis_hash,
-            scene_id,
-            APP_VERSION,
-        ]
-        data_output = TransactionOutput(
-            locking_script=OpReturn().lock(op_return_data),
-            satoshis=0,
-        )
-        tx.add_output(data_output)
+        for out in outputs:
+            tx.add_output(out)
 
         # Change back to our address
         change_output = TransactionOutput(
@@ -365,7 +834,7 @@ class BSVAdapter(BlockchainAdapter):
         tx.add_output(change_output)
 
         # Fee and sign
-        tx.fee()
+        tx.fee(self._fee_model())
         tx.sign()
 
         logger.info(
@@ -374,22 +843,121 @@ class BSVAdapter(BlockchainAdapter):
         )
         return tx
 
-    def _broadcast_tx(self, tx: Any) -> str:
-        """Broadcast transaction via ARC. Returns txid."""
-        from bsv import ARC
+    def _build_data_tx(self, op_return_data: list[str], utxo: dict[str, Any]) -> Any:
+        """Signed tx with one OP_RETURN output."""
+        return self._build_multi_data_tx([op_return_data], utxo)
 
-        broadcaster = ARC(self.arc_url)
-        response = broadcaster.sync_broadcast(tx, timeout=30)
+    def _build_multi_data_tx(self, op_return_data: list[list[str]], utxo: dict[str, Any]) -> Any:
+        """Signed tx with one OP_RETURN output per entry, in order (output i <- entry i)."""
+        from bsv import TransactionOutput, OpReturn
 
-        if getattr(response, "status", "") == "success":
-            txid = getattr(response, "txid", "")
-            if not txid:
-                raise RuntimeError("ARC broadcast success but txid missing")
-            logger.info("[BSV] Broadcast success: %s", txid)
-            return txid
+        # OP_RETURN data: keep it minimal
+        data_outputs = [
+            TransactionOutput(locking_script=OpReturn().lock(data), satoshis=0)
+            for data in op_return_data
+        ]
+        return self._build_tx(utxo, data_outputs)
 
-        desc = getattr(response, "description", None) or getattr(response, "message", None) or "unknown"
-        raise RuntimeError(f"ARC broadcast failed: {getattr(response, 'status', 'error')} - {desc}")
+    def _send_tx(self, utxo: dict[str, Any], build: Any) -> str:
+        """
+        Build with a reserved coin, broadcast and commit our outputs to the
+        local UTXO set. The coin goes back to the pool if the build fails; a
+        failed broadcast settles it through UtxoManager.abandon().
+        """
+        from bsv import P2PKH
+
+        try:
+            tx = build(utxo)
+        except Exception:
+            self.utxos.release(utxo)
+            raise
+        try:
+            txid = self._broadcast_tx(tx)
+        except Exception as e:
+            self.utxos.abandon(utxo, e)
+            raise
+
+        ours = P2PKH().lock(self._address).hex()
+        outputs = [
+            (i, int(o.satoshis or 0))
+            for i, o in enumerate(tx.outputs)
+            if o.locking_script.hex() == ours
+        ]
+        self.utxos.commit([utxo], txid, tx.hex(), outputs)
+        return txid
+
+    def _send_data_tx(self, op_return_data: list[str]) -> str:
+        """Reserve a coin, build + broadcast an OP_RETURN tx. Returns txid."""
+        return self._send_multi_data_tx([op_return_data])
+
+    def _send_multi_data_tx(self, op_return_data: list[list[str]]) -> str:
+        """Same with one OP_RETURN output per entry; goes through the worker pool if enabled."""
+        if self.utxos is None:
+            raise RuntimeError("BSV key/address not initialized")
+        pipeline = self.pipeline
+        if pipeline is not None:
+            return pipeline.submit(op_return_data, MIN_FUNDING_SATS).result()["tx_id"]
+        utxo = self.utxos.reserve(min_sats=MIN_FUNDING_SATS)
+        return self._send_tx(utxo, lambda u: self._build_multi_data_tx(op_return_data, u))
+
+    @property
+    def pipeline(self) -> TxPipeline | None:
+        """Process-pool build/sign pipeline, started on first use (None if disabled)."""
+        if self.tx_pool_workers <= 0 or self.utxos is None:
+            return None
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                self._pipeline = TxPipeline(self, processes=self.tx_pool_workers)
+                _PIPELINED_ADAPTERS.add(self)
+                logger.info("[BSV] Tx pipeline started with %d worker processes", self.tx_pool_workers)
+            return self._pipeline
+
+    def close(self) -> None:
+        """Stop the tx pipeline's worker processes (started again on next use)."""
+        with self._pipeline_lock:
+            pipeline, self._pipeline = self._pipeline, None
+        if pipeline is not None:
+            pipeline.shutdown()
+
+    def _fee_model(self) -> Any:
+        """Pinned SatoshisPerKilobyte, or None so tx.fee() uses the live policy."""
+        if self.fee_rate_sat_per_kb <= 0:
+            return None
+        from bsv.fee_models import SatoshisPerKilobyte
+        return SatoshisPerKilobyte(self.fee_rate_sat_per_kb)
+
+    def pipeline_stats(self) -> dict[str, Any]:
+        """Per-stage (reserve/build/sign/broadcast) latencies of the worker-pool pipeline."""
+        return self._pipeline.timings.summary() if self._pipeline is not None else {}
+
+    def presplit_utxos(self, n: int, satoshis_each: int = 1000) -> str:
+        """
+        Split the largest coin into n outputs of satoshis_each so n broadcasts
+        can run in parallel without competing for the same input.
+        """
+        from bsv import TransactionOutput, P2PKH
+
+        if self.utxos is None:
+            raise RuntimeError("BSV key/address not initialized")
+        utxo = self.utxos.reserve(min_sats=n * satoshis_each + MIN_FUNDING_SATS, largest=True)
+        outputs = [
+            TransactionOutput(locking_script=P2PKH().lock(self._address), satoshis=satoshis_each)
+            for _ in range(n)
+        ]
+        txid = self._send_tx(utxo, lambda u: self._build_tx(u, outputs))
+        logger.info("[BSV] Pre-split into %d UTXOs of %d sats: %s", n, satoshis_each, txid)
+        return txid
+
+    def _broadcast_tx(self, tx: Any) -> str:
+        """Broadcast transaction via ARC (pooled client). Returns txid."""
+        # Extended format carries the parent outputs so ARC needs no lookups
+        try:
+            raw = tx.to_ef().hex()
+        except Exception:
+            raw = tx.hex()
+        txid = arc_broadcast(self._arc, raw, self.arc_api_key)
+        logger.info("[BSV] Broadcast success: %s", txid)
+        return txid
 
     def _explorer_url(self, txid: str) -> str:
         """Build WhatsOnChain explorer URL."""
@@ -397,25 +965,281 @@ class BSVAdapter(BlockchainAdapter):
             return f"https://test.whatsonchain.com/tx/{txid}"
         return f"https://whatsonchain.com/tx/{txid}"
 
+    # ---- Merkle batch anchoring ----
+
+    def _recover_pending_batch(self) -> None:
+        """Re-queue records left waiting for a batch by a previous process."""
+        pending = [
+            h for h, upd in self._local._index.all_updates().items()
+            if upd.get("status") == "pending_batch"
+        ]
+        if not pending:
+            return
+        claimed = self._claims.claim_batch(pending, self._batch_owner, self.batch_claim_ttl_s)
+        if claimed:
+            logger.info("[BSV] Recovered %d records pending Merkle anchoring", len(claimed))
+            with self._batch_lock:
+                self._batch.extend(claimed)
+                self._arm_batch_timer()
+
+    def _arm_batch_timer(self) -> None:
+        # Caller holds _batch_lock
+        if self._batch and self._batch_timer is None and self.batch_max_age_s > 0:
+            self._batch_timer = threading.Timer(self.batch_max_age_s, self.flush_batch)
+            self._batch_timer.daemon = True
+            self._batch_timer.start()
+
+    def _enqueue_for_batch(self, analysis_hash: str, local_result: dict[str, Any]) -> dict[str, Any]:
+        self._local._update_record(analysis_hash, {"status": "pending_batch"})
+        with self._batch_lock:
+            queued = analysis_hash in self._batch
+        # Not claimed: already waiting in another adapter's batch
+        if not queued and self._claims.claim_batch([analysis_hash], self._batch_owner, self.batch_claim_ttl_s):
+            with self._batch_lock:
+                self._batch.append(analysis_hash)
+                size = len(self._batch)
+                self._arm_batch_timer()
+            if size >= self.batch_max_size:
+                self.flush_batch()
+
+        return {**local_result, "status": "pending_batch", "address": self._address}
+
+    def flush_batch(self) -> dict[str, Any] | None:
+        """
+        Anchor the Merkle root of the pending hashes in one OP_RETURN tx and
+        store each record's inclusion proof. On failure the leaves go back to
+        the batch and the timer is armed again.
+        """
+        with self._batch_lock:
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+                self._batch_timer = None
+            leaves = list(self._batch)
+            self._batch.clear()
+        if not leaves:
+            return None
+
+        # Broadcast outside the lock: registrations keep filling the next batch
+        try:
+            # Renew the claims; leaves another adapter took over are its to anchor
+            leaves = self._claims.claim_batch(leaves, self._batch_owner, self.batch_claim_ttl_s)
+            if not leaves:
+                return None
+            levels = build_levels(leaves)
+            root = levels[-1][0].hex()
+            txid = self._send_data_tx([MERKLE_PREFIX, root, str(len(leaves)), APP_VERSION])
+        except Exception as e:
+            logger.warning("[BSV] Merkle batch of %d failed, will retry: %s", len(leaves), e)
+            with self._batch_lock:
+                self._batch[:0] = leaves
+            return {"status": "local_fallback", "warning": str(e), "batch_size": len(leaves)}
+        finally:
+            with self._batch_lock:
+                self._arm_batch_timer()  # restored leaves, or ones that arrived meanwhile
+
+        self._local._update_records({
+            h: {
+                "tx_id": txid,
+                "status": "on_chain",
+                "anchor": "merkle",
+                "merkle_root": root,
+                "merkle_proof": merkle_proof(levels, i),
+            }
+            for i, h in enumerate(leaves)
+        })
+        self._claims.release_batch(leaves)
+
+        logger.info("[BSV] Anchored Merkle root %s (%d analyses) in %s", root[:16], len(leaves), txid)
+        return {
+            "tx_id": txid,
+            "status": "on_chain",
+            "merkle_root": root,
+            "batch_size": len(leaves),
+            "explorer_url": self._explorer_url(txid),
+        }
+
+    # ---- Multi-output batches ----
+
+    @staticmethod
+    def _op_return_size(op_return_data: list[str]) -> int:
+        """Serialized size of an OP_FALSE OP_RETURN output carrying these pushes."""
+        script = 2
+        for item in op_return_data:
+            n = len(item.encode("utf-8"))
+            script += n + (1 if n < 76 else 2 if n < 256 else 3)
+        return 8 + (1 if script < 253 else 3) + script
+
+    def _pack_outputs(self, items: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+        """Split (analysis_hash, scene_id) pairs into chunks within the output count and tx size limits."""
+        base = TX_OVERHEAD_BYTES + P2PKH_INPUT_BYTES + P2PKH_OUTPUT_BYTES
+        chunks: list[list[tuple[str, str]]] = []
+        current: list[tuple[str, str]] = []
+        size = base
+        for h, scene_id in items:
+            out = self._op_return_size([APP_PREFIX, h, scene_id, APP_VERSION])
+            if current and (len(current) >= self.multi_max_outputs or size + out > self.multi_max_tx_bytes):
+                chunks.append(current)
+                current, size = [], base
+            current.append((h, scene_id))
+            size += out
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _anchor_multi(self, items: list[tuple[str, str]]) -> str:
+        """
+        Build + broadcast one tx with an OP_RETURN output per record, then
+        write the shared txid and each record's output index in one update.
+        """
+        txid = self._send_multi_data_tx([[APP_PREFIX, h, scene_id, APP_VERSION] for h, scene_id in items])
+        self._local._update_records({
+            h: {"tx_id": txid, "vout": i, "status": "on_chain", "anchor": "multi"}
+            for i, (h, _) in enumerate(items)
+        })
+        return txid
+
+    def register_many(self, evidence_records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Register several records, packing up to BSV_MULTI_MAX_OUTPUTS of them
+        (within BSV_MULTI_MAX_TX_BYTES) into each transaction, one OP_RETURN
+        output per record. Always synchronous; duplicates are reported (or
+        retried) as in register(). Returns one result per input record, in order.
+        """
+        if self.anchor_mode == "merkle":
+            return [self.register(r) for r in evidence_records]
+
+        results: list[dict[str, Any]] = []
+        fresh: dict[str, int] = {}  # analysis_hash -> index of its result
+        repeated: list[tuple[int, int]] = []  # same analysis twice in this call
+        items: list[tuple[str, str]] = []
+        for record in evidence_records:
+            h = record.get("analysis_hash")
+            if h in fresh:
+                repeated.append((len(results), fresh[h]))
+                results.append({})
+                continue
+            local_result = self._local.register(record)
+            if local_result.get("duplicate") and (
+                _is_chain_tx(local_result["tx_id"])
+                or not self.is_configured
+                or self._anchor_in_flight(h, local_result.get("status"))
+            ):
+                txid = local_result["tx_id"]
+                if _is_chain_tx(txid):
+                    local_result["explorer_url"] = self._explorer_url(txid)
+                results.append({**local_result, "address": self._address})
+            elif not self.is_configured:
+                results.append({**local_result, "status": "local_only"})
+            else:
+                fresh[h] = len(results)
+                results.append(local_result)
+                items.append((h, record.get("scene_id", "unknown")))
+
+        for chunk in self._pack_outputs(items):
+            try:
+                txid = self._anchor_multi(chunk)
+                update = {"tx_id": txid, "status": "on_chain", "network": self.network,
+                          "explorer_url": self._explorer_url(txid)}
+            except Exception as e:
+                logger.warning("[BSV] Multi-output tx of %d records failed: %s", len(chunk), e)
+                update = {"status": "local_fallback", "warning": str(e)}
+                self._local._update_records({h: {"status": "local_fallback", "last_error": str(e)} for h, _ in chunk})
+            for vout, (h, _) in enumerate(chunk):
+                extra = {"vout": vout} if update["status"] == "on_chain" else {}
+                results[fresh[h]].update({**update, **extra, "address": self._address})
+
+        for i, j in repeated:
+            results[i] = {**results[j], "duplicate": True}
+        logger.info("[BSV] register_many: %d records, %d new", len(evidence_records), len(fresh))
+        return results
+
+    def _anchored_txid(self, analysis_hash: str) -> str | None:
+        """Chain txid already recorded for this hash, or None."""
+        record = self._local.verify(analysis_hash)
+        txid = (record or {}).get("tx_id")
+        return txid if _is_chain_tx(txid) else None
+
+    def _anchor_single(self, analysis_hash: str, scene_id: str) -> str:
+        """Build + broadcast one OP_RETURN tx and record the txid locally."""
+        # A queue job re-run after a crash may already be anchored: never pay twice
+        txid = self._anchored_txid(analysis_hash)
+        if txid is not None:
+            logger.info("[BSV] %s already anchored in %s, not broadcasting again", analysis_hash[:16], txid)
+            return txid
+        # Format: [APP_PREFIX, analysis_hash, scene_id, APP_VERSION]
+        txid = self._send_data_tx([APP_PREFIX, analysis_hash, scene_id, APP_VERSION])
+        # Update local record with real txid
+        self._local._update_record(analysis_hash, {"tx_id": txid, "status": "on_chain"})
+        return txid
+
+    def _anchor_single_async(self, analysis_hash: str, scene_id: str) -> Future:
+        """
+        Non-blocking _anchor_single(): hands the tx to the pipeline and returns
+        a future with the txid, so the broadcast worker can keep several txs in
+        flight (build, sign and broadcast of different jobs overlap).
+        """
+        pipeline = self.pipeline
+        if pipeline is None or self._anchored_txid(analysis_hash) is not None:
+            done: Future = Future()
+            try:
+                done.set_result(self._anchor_single(analysis_hash, scene_id))
+            except Exception as e:
+                done.set_exception(e)
+            return done
+
+        result: Future = Future()
+
+        def finish(f: Future) -> None:
+            try:
+                txid = f.result()["tx_id"]
+                self._local._update_record(analysis_hash, {"tx_id": txid, "status": "on_chain"})
+            except Exception as e:
+                result.set_exception(e)
+                return
+            result.set_result(txid)
+
+        pipeline.submit([[APP_PREFIX, analysis_hash, scene_id, APP_VERSION]], MIN_FUNDING_SATS).add_done_callback(finish)
+        return result
+
     # ---- Public API ----
 
     def register(self, evidence_record: dict[str, Any]) -> dict[str, Any]:
         # Always save locally first (fast, resilient)
         local_result = self._local.register(evidence_record)
 
+        analysis_hash = evidence_record["analysis_hash"]
+        scene_id = evidence_record.get("scene_id", "unknown")
+
+        if local_result.get("duplicate"):
+            # Same analysis already registered: report its status, never build a
+            # second tx, unless the earlier attempt failed to anchor it
+            txid = local_result["tx_id"]
+            if (
+                _is_chain_tx(txid)
+                or not self.is_configured
+                or self._anchor_in_flight(analysis_hash, local_result.get("status"))
+            ):
+                if _is_chain_tx(txid):
+                    local_result["explorer_url"] = self._explorer_url(txid)
+                return {**local_result, "address": self._address}
+            logger.info("[BSV] %s not anchored yet (%s), retrying", analysis_hash[:16], local_result.get("status"))
+
         if not self.is_configured:
             logger.info("[BSV] Not configured - registered locally only")
             return {**local_result, "status": "local_only"}
 
-        analysis_hash = evidence_record["analysis_hash"]
-        scene_id = evidence_record.get("scene_id", "unknown")
+        if self.anchor_mode == "merkle":
+            return self._enqueue_for_batch(analysis_hash, local_result)
 
-        try:
-            tx = self._build_op_return_tx(analysis_hash, scene_id)
-            txid = self._broadcast_tx(tx)
+        if self._queue is not None:
+            # Return immediately; the worker builds and broadcasts the tx
+            self._local._update_record(analysis_hash, {"status": "pending"})
+            self._queue.enqueue(analysis_hash, scene_id)
+            ensure_worker(self, self._queue).notify()
+            return {**local_result, "status": "pending", "address": self._address}
 
-            # Update local record with real txid
-            self._local._update_record_txid(analysis_hash, txid)
+        try:
+            txid = self._anchor_single(analysis_hash, scene_id)
 
             return {
                 "tx_id": txid,
@@ -428,6 +1252,7 @@ class BSVAdapter(BlockchainAdapter):
 
         except RuntimeError as e:
             logger.warning("[BSV] %s", e)
+            self._local._update_record(analysis_hash, {"status": "local_fallback", "last_error": str(e)})
             return {
                 **local_result,
                 "status": "local_fallback",
@@ -437,6 +1262,7 @@ class BSVAdapter(BlockchainAdapter):
 
         except Exception as e:
             logger.error("[BSV] Unexpected error: %s", e, exc_info=True)
+            self._local._update_record(analysis_hash, {"status": "error", "last_error": str(e)})
             return {
                 **local_result,
                 "status": "error",
@@ -444,41 +1270,172 @@ class BSVAdapter(BlockchainAdapter):
                 "address": self._address,
             }
 
+    def _anchor_in_flight(self, analysis_hash: str, status: str | None) -> bool:
+        """True if a queued job or a Merkle batch is still going to anchor the record."""
+        if status == "pending_batch":
+            # In Merkle mode _enqueue_for_batch() sorts it out through the batch claims
+            return self.anchor_mode != "merkle"
+        if status == "pending":
+            if self._queue is None:
+                return True  # queued by another process: its worker owns it
+            job = self._queue.get(analysis_hash)
+            return job is not None and job["status"] in ("pending", "sending")
+        return False
+
     def verify(self, analysis_hash: str) -> dict[str, Any] | None:
         # Check local ledger first
         record = self._local.verify(analysis_hash)
         if not record:
             return None
 
+        if self._queue is not None and record.get("status") in ("pending", "failed"):
+            job = self._queue.get(analysis_hash)
+            if job:
+                record["broadcast"] = {
+                    "attempts": job["attempts"],
+                    "last_error": job["last_error"],
+                    "next_attempt_at": job["next_attempt_at"],
+                }
+
+        if record.get("merkle_proof") is not None:
+            record["merkle_verified"] = verify_proof(
+                analysis_hash, record["merkle_proof"], record.get("merkle_root", "")
+            )
+
         txid = record.get("tx_id", "")
-        if txid and isinstance(txid, str) and not txid.startswith("local_"):
-            # Verify on-chain via WhatsOnChain
-            try:
-                resp = requests.get(f"{self.woc_base}/tx/{txid}", timeout=10)
-                if resp.status_code == 200:
-                    tx_data = resp.json()
-                    record["on_chain_verified"] = True
-                    record["confirmations"] = tx_data.get("confirmations", 0)
-                    record["explorer_url"] = self._explorer_url(txid)
-
-                    hex_resp = requests.get(f"{self.woc_base}/tx/{txid}/hex", timeout=10)
-                    record["raw_tx_available"] = hex_resp.status_code == 200
-                else:
-                    record["on_chain_verified"] = False
-            except Exception as e:
-                record["on_chain_verified"] = False
-                record["verify_error"] = str(e)
+        if _is_chain_tx(txid):
+            # Cached verification while it is fresh; WhatsOnChain only when stale
+            entry = record.get("verification")
+            cached = not is_stale(record)
+            if not cached:
+                fetched = self.refresh_verifications(records={analysis_hash: record})
+                entry = fetched.get(analysis_hash, {"on_chain_verified": False, "verify_error": "no WhatsOnChain client"})
+            record.update({k: v for k, v in entry.items() if k in VERIFICATION_FIELDS})
+            record["verification"] = entry
+            record["verification_cached"] = cached
+            if entry.get("on_chain_verified"):
+                record["explorer_url"] = self._explorer_url(txid)
 
         return record
 
+    def refresh_verifications(
+        self,
+        hashes: list[str] | None = None,
+        records: dict[str, dict[str, Any]] | None = None,
+        force: bool = False,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Re-check on WhatsOnChain the records whose cached verification is
+        stale (or all of them with force), one bulk request per 20 distinct
+        txids, and store the results with the records in one updates write.
+        Returns analysis_hash -> verification for the records fetched.
+        """
+        if records is None:
+            records = self._local.read_records(hashes or [])
+        stale = {
+            h: r for h, r in records.items()
+            if _is_chain_tx(r.get("tx_id")) and (force or is_stale(r))
+        }
+        if not stale or self._woc is None:
+            return {}
+
+        statuses = fetch_tx_status(self._woc, {r["tx_id"] for r in stale.values()})
+        now = datetime.now(timezone.utc).isoformat()
+        entries: dict[str, dict[str, Any]] = {}
+        for h, r in stale.items():
+            status = statuses.get(r["tx_id"], {})
+            if "verify_error" in status:
+                # Network trouble says nothing about the tx: report it, cache nothing
+                entries[h] = {"on_chain_verified": False, "verify_error": status["verify_error"]}
+                continue
+            entry = cache_entry(r, status, _tx_contains_data, now)
+            tx_data = status.get("_tx")
+            if tx_data is not None and not entry["raw_tx_available"]:
+                # WoC tx JSON usually embeds the hex; otherwise one (cached) request
+                try:
+                    entry["raw_tx_available"] = bool(self._fetch_raw_tx(r["tx_id"]))
+                except Exception:
+                    entry["raw_tx_available"] = False
+            entries[h] = entry
+        self._local._update_records({
+            h: {"verification": e} for h, e in entries.items() if "verify_error" not in e
+        })
+        return entries
+
     def list_records(self, limit: int = 50) -> list[dict[str, Any]]:
         return self._local.list_records(limit=limit)
 
+    def iter_records(
+        self,
+        scene_id: str | None = None,
+        dataset_id: str | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        return self._local.iter_records(scene_id, dataset_id, since, until)
+
+    def query(
+        self,
+        scene_id: str | None = None,
+        dataset_id: str | None = None,
+        model_version: str | None = None,
+        status: str | list[str] | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+        newest_first: bool = True,
+        with_total: bool = True,
+    ) -> dict[str, Any]:
+        return self._local.query(
+            scene_id, dataset_id, model_version, status, since, until, limit, cursor, newest_first, with_total
+        )
+
+
+def _is_chain_tx(txid: Any) -> bool:
+    return isinstance(txid, str) and bool(txid) and not txid.startswith("local_")
+
+
+def _tx_contains_data(tx_data: dict[str, Any], text: str, vout: int | None = None) -> bool:
+    """True if an output script of a WhatsOnChain tx JSON (output `vout`, or any) pushes `text`."""
+    needle = text.encode("utf-8").hex()
+    for i, out in enumerate(tx_data.get("vout", [])):
+        if vout is not None and out.get("n", i) != vout:
+            continue
+        if needle in (out.get("scriptPubKey", {}).get("hex") or ""):
+            return True
+    return False
+
 
 # ======================================================================
 # FACTORY
 # ======================================================================
 
+_ADAPTERS: dict[str, BlockchainAdapter] = {}
+_ADAPTERS_LOCK = threading.Lock()
+# Adapters with a running tx pipeline, closed at exit
+_PIPELINED_ADAPTERS: weakref.WeakSet[BSVAdapter] = weakref.WeakSet()
+
+
 def get_blockchain_adapter() -> BlockchainAdapter:
-    """Returns BSVAdapter (falls back internally to local ledger)."""
-    return BSVAdapter()
+    """
+    Returns the process-wide BSVAdapter for config.LEDGER_PATH (falls back
+    internally to local ledger). Built on first use: opening one re-syncs the
+    index, catalog and UTXO store, so per-call adapters cost far more than a
+    registration.
+    """
+    key = str(Path(config.LEDGER_PATH))
+    with _ADAPTERS_LOCK:
+        adapter = _ADAPTERS.get(key)
+        if adapter is None:
+            adapter = _ADAPTERS[key] = BSVAdapter()
+    return adapter
+
+
+def close_adapters() -> None:
+    """Shut down the tx pipelines still running; called at process exit."""
+    for adapter in list(_PIPELINED_ADAPTERS):
+        adapter.close()
+
+
+atexit.register(close_adapters)
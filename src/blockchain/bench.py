@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import json
+import logging
+import tempfile
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+from src import config
+from src.blockchain.stand_in import StandInServer
+
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sync", "async", "merkle", "multi", "bsv_client")
+# Pinned while isolated: the SDK default rate, without asking the fee endpoint
+FEE_RATE_SAT_PER_KB = 100
+
+
+def _percentiles(values_ms: list[float]) -> dict[str, float]:
+    if not values_ms:
+        return {}
+    s = sorted(values_ms)
+
+    def pct(p: float) -> float:
+        return round(s[min(len(s) - 1, int(p / 100.0 * len(s)))], 2)
+
+    return {"p50": pct(50), "p90": pct(90), "p99": pct(99), "max": round(s[-1], 2)}
+
+
+def _isolate(workdir: Path, server: StandInServer) -> None:
+    """
+    Point this process at the stand-in with a throwaway key and private
+    stores, and pin the fee rate so no tx fetches the live mining policy:
+    a benchmark never touches mainnet or data/.
+    """
+    from bsv import PrivateKey
+
+    config.BSV_PRIVATE_KEY = PrivateKey().wif()
+    config.BSV_ADDRESS = ""
+    config.WOC_BASE = server.woc_base
+    config.ARC_URL = server.arc_url
+    config.ARC_API_KEY = ""
+    config.WOC_RATE_LIMIT_PER_S = 0.0
+    config.BSV_FEE_RATE_SAT_PER_KB = FEE_RATE_SAT_PER_KB
+    config.LEDGER_PATH = workdir / "ledger.jsonl"
+    config.BROADCAST_QUEUE_PATH = workdir / "broadcast_queue.sqlite"
+    config.UTXO_DB_PATH = workdir / "utxos.sqlite"
+
+
+def _record(i: int) -> dict[str, Any]:
+    from src.blockchain.hashing import build_evidence_record
+
+    payload = {
+        "scene_id": f"bench_{i:06d}",
+        "dataset_id": "bench",
+        "timestamp_utc": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()),
+        "model_version": "bench",
+        "nonce": uuid.uuid4().hex,  # never dedupe
+        "counts": {"car": i % 7, "truck": i % 3},
+    }
+    return build_evidence_record(payload)
+
+
+def run_benchmark(
+    mode: str = "sync",
+    n: int = 200,
+    concurrency: int = 8,
+    utxos: int | None = None,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    reject_rate: float = 0.0,
+    drain_timeout_s: float = 120.0,
+    tx_pool_workers: int | None = None,
+) -> dict[str, Any]:
+    """
+    Register `n` evidence records through one of the BSV paths against a
+    local stand-in and report registrations/s and latency percentiles.
+
+    sync        BSVAdapter, build + broadcast inside register()
+    async       BSVAdapter with the durable queue; also measures time until drained
+    merkle      BSVAdapter Merkle batching; one flush at the end
+    multi       BSVAdapter.register_many(), one OP_RETURN output per record
+    bsv_client  register_on_chain() (fetches UTXOs per call, no coin reservation)
+
+    tx_pool_workers overrides BSV_TX_POOL_WORKERS (0 = build/sign in-process).
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+
+    server = StandInServer(
+        latency_ms=latency_ms,
+        jitter_ms=jitter_ms,
+        error_rate=error_rate,
+        rate_limit_rate=rate_limit_rate,
+        reject_rate=reject_rate,
+        seed=0,
+    ).start()
+    workdir = Path(tempfile.mkdtemp(prefix="bsv_bench_"))
+    _isolate(workdir, server)
+    if tx_pool_workers is not None:
+        config.BSV_TX_POOL_WORKERS = tx_pool_workers
+
+    from bsv import PrivateKey
+    from src.blockchain.adapter import BSVAdapter
+    from src.blockchain.bsv_client import register_on_chain
+
+    address = str(PrivateKey(config.BSV_PRIVATE_KEY).address())
+    # Enough coins for every tx the queue worker keeps in flight
+    default_utxos = max(concurrency * 2, 4, int(getattr(config, "BSV_TX_POOL_IN_FLIGHT", 0)))
+    server.state.fund(address, n_outputs=utxos or default_utxos, satoshis=1_000_000)
+
+    adapter = None
+    call: Callable[[dict[str, Any]], dict[str, Any]]
+    if mode == "bsv_client":
+        call = register_on_chain
+    else:
+        adapter = BSVAdapter(
+            anchor_mode="merkle" if mode == "merkle" else "single",
+            async_broadcast=mode == "async",
+            woc_base=server.woc_base,
+            arc_url=server.arc_url,
+        )
+        if mode == "merkle":
+            adapter.batch_max_size = n + 1  # flush explicitly below
+            adapter.batch_max_age_s = 0
+        call = adapter.register
+
+    records = [_record(i) for i in range(n)]
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+
+    def one(rec: dict[str, Any]) -> None:
+        t0 = time.perf_counter()
+        try:
+            status = call(rec).get("status", "unknown")
+        except Exception as e:
+            status = f"exception:{type(e).__name__}"
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        statuses[status] += 1
+
+    def many(chunk: list[dict[str, Any]]) -> None:
+        t0 = time.perf_counter()
+        try:
+            chunk_statuses = [r.get("status", "unknown") for r in adapter.register_many(chunk)]
+        except Exception as e:
+            chunk_statuses = [f"exception:{type(e).__name__}"] * len(chunk)
+        ms = (time.perf_counter() - t0) * 1000.0
+        latencies.extend([ms] * len(chunk))
+        statuses.update(chunk_statuses)
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if mode == "multi":
+            size = adapter.multi_max_outputs
+            list(pool.map(many, [records[i:i + size] for i in range(0, n, size)]))
+        else:
+            list(pool.map(one, records))
+    elapsed = time.perf_counter() - t_start
+
+    report: dict[str, Any] = {
+        "mode": mode,
+        "n": n,
+        "concurrency": concurrency,
+        "tx_pool_workers": config.BSV_TX_POOL_WORKERS if mode != "bsv_client" else 0,
+        "fault_injection": {
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "error_rate": error_rate,
+            "rate_limit_rate": rate_limit_rate,
+            "reject_rate": reject_rate,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "registrations_per_s": round(n / elapsed, 1) if elapsed > 0 else None,
+        "latency_ms": _percentiles(latencies),
+        "statuses": dict(statuses),
+    }
+
+    if mode == "merkle":
+        t0 = time.perf_counter()
+        flushed = adapter.flush_batch() or {}
+        report["flush"] = {"status": flushed.get("status"), "ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+    if mode == "async":
+        deadline = time.monotonic() + drain_timeout_s
+        while time.monotonic() < deadline:
+            stats = adapter._queue.stats()
+            if not stats.get("pending") and not stats.get("sending"):
+                break
+            time.sleep(0.05)
+        drained = time.perf_counter() - t_start
+        report["queue"] = adapter._queue.stats()
+        report["drain_s"] = round(drained, 3)
+        report["anchored_per_s"] = round(report["queue"].get("done", 0) / drained, 1) if drained > 0 else None
+
+    if adapter is not None and adapter.pipeline_stats():
+        report["pipeline_ms"] = adapter.pipeline_stats()
+    report["server"] = dict(server.stats)
+    if adapter is not None:
+        adapter.close()
+    server.stop()
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Blockchain registration throughput against a local stand-in")
+    p.add_argument("--mode", choices=MODES, nargs="+", default=["sync"])
+    p.add_argument("-n", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--utxos", type=int, default=None, help="funding outputs (default 2x concurrency, at least the in-flight limit)")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0)
+    p.add_argument("--reject-rate", type=float, default=0.0)
+    p.add_argument("--tx-pool-workers", type=int, default=None, help="override BSV_TX_POOL_WORKERS")
+    p.add_argument("--out", default=None, help="append JSON results to this file")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for mode in args.mode:
+        result = run_benchmark(
+            mode=mode,
+            n=args.n,
+            concurrency=args.concurrency,
+            utxos=args.utxos,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            reject_rate=args.reject_rate,
+            tx_pool_workers=args.tx_pool_workers,
+        )
+        print(json.dumps(result, indent=2))
+        if args.out:
+            with open(args.out, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
@@ -0,0 +1,475 @@
+from __future__ import annotations
+
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from src import config
+
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================================
+# DURABLE OUTBOUND QUEUE (SQLite)
+# ======================================================================
+
+class BroadcastQueue:
+    """
+    Durable queue of analyses waiting to be anchored on-chain.
+    Job status: pending -> sending -> done | failed (retries go back to pending).
+    """
+
+    def __init__(self, db_path: str | Path | None = None):
+        self.db_path = Path(db_path) if db_path else Path(config.BROADCAST_QUEUE_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                analysis_hash TEXT PRIMARY KEY,
+                scene_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                tx_id TEXT,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(status, next_attempt_at);
+            CREATE TABLE IF NOT EXISTS batch_claims (
+                analysis_hash TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                claimed_at REAL NOT NULL
+            );
+            """
+        )
+
+    def enqueue(self, analysis_hash: str, scene_id: str) -> bool:
+        """Add a job (a failed one starts over). Returns False if the hash is already queued/done."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO jobs(analysis_hash, scene_id, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, 'pending', ?, ?, ?) "
+                "ON CONFLICT(analysis_hash) DO UPDATE SET status = 'pending', attempts = 0, "
+                "next_attempt_at = excluded.next_attempt_at, updated_at = excluded.updated_at "
+                "WHERE jobs.status = 'failed'",
+                (analysis_hash, scene_id, now, now, now),
+            )
+            return cur.rowcount == 1
+
+    def claim(self, now: float | None = None) -> dict[str, Any] | None:
+        """Atomically take the next due job (marks it 'sending')."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT analysis_hash, scene_id, attempts FROM jobs "
+                    "WHERE status = 'pending' AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'sending', updated_at = ? WHERE analysis_hash = ?",
+                    (now, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"analysis_hash": row[0], "scene_id": row[1], "attempts": row[2]}
+
+    def mark_done(self, analysis_hash: str, tx_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', tx_id = ?, last_error = NULL, updated_at = ? "
+                "WHERE analysis_hash = ?",
+                (tx_id, time.time(), analysis_hash),
+            )
+
+    def mark_retry(self, analysis_hash: str, error: str, delay_s: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = attempts + 1, last_error = ?, "
+                "next_attempt_at = ?, updated_at = ? WHERE analysis_hash = ?",
+                (error, now + delay_s, now, analysis_hash),
+            )
+
+    def mark_failed(self, analysis_hash: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', attempts = attempts + 1, last_error = ?, updated_at = ? "
+                "WHERE analysis_hash = ?",
+                (error, time.time(), analysis_hash),
+            )
+
+    def touch(self, hashes: list[str]) -> None:
+        """Heartbeat for jobs still being sent, so requeue_stale() leaves them alone."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET updated_at = ? WHERE analysis_hash = ? AND status = 'sending'",
+                [(now, h) for h in hashes],
+            )
+
+    def requeue_stale(self, older_than_s: float = 300.0) -> int:
+        """Jobs left in 'sending' by a crashed worker go back to pending."""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'pending' WHERE status = 'sending' AND updated_at < ?",
+                (cutoff,),
+            ).rowcount
+
+    def get(self, analysis_hash: str) -> dict[str, Any] | None:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM jobs WHERE analysis_hash = ?", (analysis_hash,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            return dict(zip([c[0] for c in cur.description], row))
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    # ---- Merkle batch leaves ----
+
+    def claim_batch(self, hashes: list[str], owner: str, ttl_s: float) -> list[str]:
+        """
+        Atomically take (or renew) Merkle batch leaves for `owner`: hashes
+        nobody holds, already held by owner, or whose holder is dead or has
+        not renewed its claim for ttl_s. Returns the hashes owner now holds.
+        """
+        if not hashes:
+            return []
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                held: dict[str, tuple[str, float]] = {}
+                for i in range(0, len(hashes), 500):
+                    chunk = hashes[i:i + 500]
+                    held.update(
+                        (h, (o, at)) for h, o, at in self._conn.execute(
+                            f"SELECT analysis_hash, owner, claimed_at FROM batch_claims "
+                            f"WHERE analysis_hash IN ({','.join('?' * len(chunk))})",
+                            chunk,
+                        )
+                    )
+                taken = [
+                    h for h in dict.fromkeys(hashes)
+                    if h not in held
+                    or held[h][0] == owner
+                    or held[h][1] < now - ttl_s
+                    or not _owner_alive(held[h][0])
+                ]
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO batch_claims(analysis_hash, owner, claimed_at) VALUES (?, ?, ?)",
+                    [(h, owner, now) for h in taken],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return taken
+
+    def release_batch(self, hashes: list[str]) -> None:
+        """Drop the claims of anchored leaves."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM batch_claims WHERE analysis_hash = ?", [(h,) for h in hashes])
+
+
+def batch_owner() -> str:
+    """Claim owner id for one adapter instance: host:pid:nonce."""
+    return f"{socket.gethostname()}:{os.getpid()}:{random.getrandbits(32):08x}"
+
+
+def _owner_alive(owner: str) -> bool:
+    host, _, rest = owner.partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # cannot tell from here: rely on the ttl
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# ======================================================================
+# CIRCUIT BREAKER
+# ======================================================================
+
+class CircuitBreaker:
+    """
+    closed -> (N consecutive failures) -> open -> (reset timeout) -> half_open
+    half_open lets one attempt through: success closes, failure re-opens.
+    The probe is a token: allow() hands it to one caller; an unused one is
+    given back with cancel() and a lost one expires after reset_timeout_s.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe_at: float | None = None  # half_open probe handed out at
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state != "half_open":
+                return state == "closed"
+            now = time.time()
+            if self._probe_at is not None and now - self._probe_at < self.reset_timeout_s:
+                return False
+            self._probe_at = now
+            return True
+
+    def cancel(self) -> None:
+        """Give back a probe that allow() handed out but was not used."""
+        with self._lock:
+            self._probe_at = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_at = None
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("[QUEUE] Circuit open after %d failures", self.failures)
+                self.opened_at = time.time()
+
+
+# ======================================================================
+# WORKER
+# ======================================================================
+
+class BroadcastWorker(threading.Thread):
+    """
+    Background thread that drains the queue through adapter._anchor_single()
+    with exponential backoff (+ jitter) and a circuit breaker, and writes the
+    resulting status back to the local ledger. When the adapter has a tx
+    pipeline (BSV_TX_POOL_WORKERS > 0) up to max_in_flight jobs are being
+    built, signed and broadcast at once.
+    """
+
+    def __init__(
+        self,
+        adapter: Any,
+        queue: BroadcastQueue | None = None,
+        max_attempts: int = 8,
+        base_delay_s: float = 2.0,
+        max_delay_s: float = 600.0,
+        poll_interval_s: float = 1.0,
+        breaker: CircuitBreaker | None = None,
+        max_in_flight: int | None = None,
+        stale_after_s: float = 300.0,
+    ):
+        super().__init__(name="bsv-broadcast-worker", daemon=True)
+        self.adapter = adapter
+        self.queue = queue or BroadcastQueue()
+        self.max_attempts = max_attempts
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.poll_interval_s = poll_interval_s
+        self.breaker = breaker or CircuitBreaker()
+        # Jobs handed to the tx pipeline and not finished yet
+        if max_in_flight is None:
+            max_in_flight = int(getattr(config, "BSV_TX_POOL_IN_FLIGHT", 16))
+        self._slots = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._in_flight: set[str] = set()
+        self._in_flight_lock = threading.Lock()
+        # 'sending' jobs untouched for this long belong to a dead worker
+        self.stale_after_s = stale_after_s
+        self._next_requeue = 0.0
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake.set()
+
+    def notify(self) -> None:
+        """Wake the worker right away (new job enqueued)."""
+        self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay_s, self.base_delay_s * (2 ** attempts))
+        return delay * random.uniform(0.5, 1.0)
+
+    def run_once(self) -> bool:
+        """Process at most one job. Returns True if a job was handled."""
+        if not self.breaker.allow():
+            return False
+        try:
+            handled = self._submit_one() if self._pipelined() else self._send_one()
+        except Exception:
+            self.breaker.cancel()
+            raise
+        if not handled:
+            self.breaker.cancel()  # no job took the half_open probe
+        return handled
+
+    def _send_one(self) -> bool:
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        try:
+            txid = self.adapter._anchor_single(job["analysis_hash"], job["scene_id"])
+        except Exception as e:
+            self._handle_failure(job, e)
+            return True
+        self._handle_success(job, txid)
+        return True
+
+    def _pipelined(self) -> bool:
+        return getattr(self.adapter, "pipeline", None) is not None
+
+    def _submit_one(self) -> bool:
+        """
+        Pipelined mode: claim a job and hand it to the adapter's process pool
+        without waiting for it, up to max_in_flight jobs at a time.
+        """
+        if not self._slots.acquire(blocking=False):
+            return False
+        job = self.queue.claim()
+        if job is None:
+            self._slots.release()
+            return False
+        h = job["analysis_hash"]
+        with self._in_flight_lock:
+            self._in_flight.add(h)
+
+        def done(f: Any) -> None:
+            try:
+                txid = f.result()
+            except Exception as e:
+                self._handle_failure(job, e)
+            else:
+                self._handle_success(job, txid)
+            finally:
+                with self._in_flight_lock:
+                    self._in_flight.discard(h)
+                self._slots.release()
+                self._wake.set()  # a slot is free again
+
+        try:
+            self.adapter._anchor_single_async(h, job["scene_id"]).add_done_callback(done)
+        except Exception as e:
+            self._handle_failure(job, e)
+            with self._in_flight_lock:
+                self._in_flight.discard(h)
+            self._slots.release()
+        return True
+
+    def _requeue_stale(self) -> None:
+        """Keep our own in-flight jobs fresh, then recover those of dead workers."""
+        now = time.monotonic()
+        if now < self._next_requeue:
+            return
+        self._next_requeue = now + self.stale_after_s / 5
+        with self._in_flight_lock:
+            mine = list(self._in_flight)
+        if mine:
+            self.queue.touch(mine)
+        n = self.queue.requeue_stale(self.stale_after_s)
+        if n:
+            logger.warning("[QUEUE] Requeued %d stale job(s)", n)
+
+    def _handle_success(self, job: dict[str, Any], txid: str) -> None:
+        self.breaker.record_success()
+        # The record's {tx_id, status} was already written by _anchor_single()
+        self.queue.mark_done(job["analysis_hash"], txid)
+
+    def _handle_failure(self, job: dict[str, Any], e: Exception) -> None:
+        h = job["analysis_hash"]
+        self.breaker.record_failure()
+        attempts = job["attempts"] + 1
+        if attempts >= self.max_attempts:
+            logger.error("[QUEUE] Giving up on %s after %d attempts: %s", h[:16], attempts, e)
+            self.queue.mark_failed(h, str(e))
+            self.adapter._local._update_record(h, {"status": "failed", "last_error": str(e)})
+        else:
+            delay = self.backoff(job["attempts"])
+            logger.warning("[QUEUE] %s failed (attempt %d), retry in %.1fs: %s", h[:16], attempts, delay, e)
+            self.queue.mark_retry(h, str(e), delay)
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                # Not only at start-up: a job can get stuck in 'sending' at any time
+                self._requeue_stale()
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.error("[QUEUE] Worker error: %s", e, exc_info=True)
+            self._wake.wait(self.poll_interval_s)
+            self._wake.clear()
+
+
+_WORKERS: dict[str, BroadcastWorker] = {}
+_WORKERS_LOCK = threading.Lock()
+
+
+def ensure_worker(adapter: Any, queue: BroadcastQueue) -> BroadcastWorker:
+    """One worker thread per queue file per process."""
+    key = str(queue.db_path)
+    with _WORKERS_LOCK:
+        worker = _WORKERS.get(key)
+        if worker is None or not worker.is_alive():
+            worker = BroadcastWorker(adapter, queue)
+            worker.start()
+            _WORKERS[key] = worker
+    return worker
+
+
+if __name__ == "__main__":
+    # Standalone worker: drains jobs left by short-lived processes (add_evidence CLI)
+    from src.blockchain.adapter import BSVAdapter
+
+    logging.basicConfig(level=logging.INFO)
+    adapter = BSVAdapter(async_broadcast=False)
+    worker = BroadcastWorker(adapter, BroadcastQueue())
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(1.0)
+    except KeyboardInterrupt:
+        worker.stop()
@@ -1,42 +1,31 @@
 from __future__ import annotations
 
-import asyncio
-import json
 import os
 from typing import Any
 
-import requests
-
 from src import config
+from src.blockchain.canonical import canonical_json
+from src.blockchain.http_client import IMMUTABLE, arc_broadcast, arc_client, woc_client
 
 try:
-    from bsv import ARC, P2PKH, PrivateKey, Script, Transaction, TransactionInput, TransactionOutput
+    from bsv import P2PKH, PrivateKey, Script, Transaction, TransactionInput, TransactionOutput
+    from bsv.fee_models import SatoshisPerKilobyte
     _BSV_AVAILABLE = True
 except ImportError:
     _BSV_AVAILABLE = False
 
 
-def _canonical_json(obj: dict[str, Any]) -> str:
-    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
-
-
 def _op_return_script(prefix: str, payload: dict[str, Any]):
-    data = (prefix + _canonical_json(payload)).encode("utf-8")
+    data = (prefix + canonical_json(payload)).encode("utf-8")
     return Script.from_asm(f"OP_FALSE OP_RETURN {data.hex()}")
 
 
 def _woc_get_json(path: str) -> Any:
-    url = f"{config.WOC_BASE.rstrip('/')}/{path.lstrip('/')}"
-    r = requests.get(url, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    return woc_client().get_json(path)
 
 
-def _woc_get_text(path: str) -> str:
-    url = f"{config.WOC_BASE.rstrip('/')}/{path.lstrip('/')}"
-    r = requests.get(url, timeout=20)
-    r.raise_for_status()
-    return r.text
+def _woc_get_text(path: str, cache_ttl_s: float | None = None) -> str:
+    return woc_client().get_text(path, cache_ttl_s=cache_ttl_s)
 
 
 def _pick_utxo(address: str, min_sats: int = 600) -> dict[str, Any] | None:
@@ -52,14 +41,6 @@ def _pick_utxo(address: str, min_sats: int = 600) -> dict[str, Any] | None:
     return ok[0]
 
 
-async def _broadcast_with_arc(tx: Transaction, arc_url: str, arc_api_key: str | None) -> None:
-    if arc_api_key:
-        broadcaster = ARC(arc_url, arc_api_key)
-    else:
-        broadcaster = ARC(arc_url)
-    await tx.broadcast(broadcaster)
-
-
 def register_on_chain(evidence_record: dict[str, Any]) -> dict[str, Any]:
     """
     Register evidence_record on BSV (OP_FALSE OP_RETURN <data>).
@@ -105,7 +86,7 @@ def register_on_chain(evidence_record: dict[str, Any]) -> dict[str, Any]:
         if not src_txid:
             return {"status": "failed", "error": "WhatsOnChain UTXO missing tx_hash"}
 
-        source_tx_hex = _woc_get_text(f"tx/{src_txid}/hex").strip()
+        source_tx_hex = _woc_get_text(f"tx/{src_txid}/hex", cache_ttl_s=IMMUTABLE)
         source_tx = Transaction.from_hex(source_tx_hex)
 
         tx_in = TransactionInput(
@@ -124,10 +105,11 @@ def register_on_chain(evidence_record: dict[str, Any]) -> dict[str, Any]:
         )
 
         tx = Transaction([tx_in], [opret_out, change_out], version=1)
-        tx.fee()
+        fee_rate = int(getattr(config, "BSV_FEE_RATE_SAT_PER_KB", 0))
+        tx.fee(SatoshisPerKilobyte(fee_rate) if fee_rate > 0 else None)
         tx.sign()
 
-        asyncio.run(_broadcast_with_arc(tx, arc_url, arc_api_key))
+        arc_broadcast(arc_client(arc_url), tx.to_ef().hex(), arc_api_key)
 
         return {
             "status": "ok",
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
+
+GOLDEN_PATH = Path(__file__).with_name("canonical_golden.jsonl")
+
+if _ORJSON_AVAILABLE:
+    # Let orjson reject what the stdlib encoder would not serialize as-is
+    _ORJSON_OPTS = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+    )
+
+
+# ======================================================================
+# CANONICAL FORM
+# ======================================================================
+#
+# The canonical form is, byte for byte, what every historical hash was
+# computed over:
+#     json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+# orjson produces the same bytes for plain JSON data except for float
+# exponents (1e16 vs 1e+16, 0.00001 vs 1e-05), NaN/Infinity, DEL and
+# non-ASCII characters. Those cases are detected and sent to the stdlib encoder.
+
+def _stdlib_bytes(data: Any) -> bytes:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=True).encode("ascii")
+
+
+_EXP_CANDIDATE = re.compile(rb"e[-0-9]")
+
+
+def _has_exponent(out: bytes) -> bool:
+    # Literal-first pattern + manual look-behind is much faster than (?<=[0-9])e
+    for m in _EXP_CANDIDATE.finditer(out):
+        i = m.start()
+        if i > 0 and 48 <= out[i - 1] <= 57:
+            return True
+    return False
+
+
+def _orjson_bytes(data: Any) -> bytes | None:
+    """orjson output if provably identical to the stdlib form, else None."""
+    try:
+        out = orjson.dumps(data, option=_ORJSON_OPTS)
+    except (TypeError, orjson.JSONEncodeError):
+        return None
+    if (
+        not out.isascii()
+        or b"\x7f" in out
+        or b"0.0000" in out  # |x| < 1e-4 written without exponent
+        or _has_exponent(out)
+    ):
+        return None
+    # Round trip catches NaN/Infinity (-> null) and types orjson serializes natively (UUID, Enum, ...)
+    if orjson.loads(out) != data:
+        return None
+    return out
+
+
+def canonical_bytes(data: Any) -> bytes:
+    """Canonical JSON as ASCII bytes (fast path with orjson when available)."""
+    if _ORJSON_AVAILABLE:
+        out = _orjson_bytes(data)
+        if out is not None:
+            return out
+    return _stdlib_bytes(data)
+
+
+def canonical_json(data: Any) -> str:
+    """
+    Deterministic JSON:
+    - sort_keys=True for stable ordering
+    - separators remove whitespace
+    - ensure_ascii=True for cross-platform reproducibility
+    """
+    return canonical_bytes(data).decode("ascii")
+
+
+def canonical_hash(data: Any) -> str:
+    """SHA-256 hex of the canonical form."""
+    return hashlib.sha256(canonical_bytes(data)).hexdigest()
+
+
+# ======================================================================
+# GOLDEN CORPUS / BENCHMARK
+# ======================================================================
+
+def check_golden(path: Path = GOLDEN_PATH) -> list[str]:
+    """Compare every backend against the stored canonical bytes. Returns failing case names."""
+    failures = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            case = json.loads(line)
+            expected = case["canonical"].encode("ascii")
+            outputs = {"json": _stdlib_bytes(case["input"]), "default": canonical_bytes(case["input"])}
+            if _ORJSON_AVAILABLE:
+                fast = _orjson_bytes(case["input"])
+                if fast is not None:
+                    outputs["orjson"] = fast
+            for backend, out in outputs.items():
+                if out != expected or hashlib.sha256(out).hexdigest() != case["sha256"]:
+                    failures.append(f"{case['name']} [{backend}]")
+    return failures
+
+
+def synthetic_bundle(n_detections: int, seed: int = 0) -> dict[str, Any]:
+    import random
+
+    rng = random.Random(seed)
+    dets = [
+        {
+            "class_id": rng.randrange(8),
+            "class_name": rng.choice(["car", "truck", "bus", "motorcycle", "bicycle"]),
+            "confidence": rng.random(),
+            "bbox_xyxy": [round(rng.uniform(0, 1920), 2) for _ in range(4)],
+            "typology": rng.choice(["sedan", "suv", "van", None]),
+            "typology_confidence": rng.random(),
+        }
+        for _ in range(n_detections)
+    ]
+    return {
+        "scene_id": f"bench_{seed}",
+        "timestamp_utc": "2026-01-01T00:00:00+00:00",
+        "model_version": "MyE_v1",
+        "detections": {"detections": dets, "num_detections": n_detections},
+        "metrics": {"occupancy_ratio": rng.random(), "density": [[rng.randrange(5) for _ in range(8)] for _ in range(8)]},
+    }
+
+
+def benchmark(n_detections: int = 500, repeat: int = 50) -> dict[str, float]:
+    import time
+
+    bundle = synthetic_bundle(n_detections)
+    assert canonical_bytes(bundle) == _stdlib_bytes(bundle)
+    result = {}
+    for name, fn in (("json", _stdlib_bytes), ("canonical", canonical_bytes)):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn(bundle)
+        result[f"{name}_ms"] = round((time.perf_counter() - t0) / repeat * 1000, 3)
+    result["speedup"] = round(result["json_ms"] / result["canonical_ms"], 2)
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Canonical JSON: golden corpus check and benchmark")
+    p.add_argument("--check", action="store_true", help="verify byte-identical output on the golden corpus")
+    p.add_argument("--bench", type=int, nargs="*", default=None, metavar="N", help="benchmark bundles with N detections")
+    args = p.parse_args()
+
+    print("orjson available:", _ORJSON_AVAILABLE)
+    if args.check or args.bench is None:
+        failed = check_golden()
+        print("golden corpus:", "OK" if not failed else f"FAILED {failed}")
+        if failed:
+            raise SystemExit(1)
+    for n in args.bench or []:
+        print(n, "detections:", benchmark(n))
@@ -1,36 +1,65 @@
 from __future__ import annotations
 
 import hashlib
-import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any
+from pathlib import Path
+from typing import Any, Iterable
 
-
-def canonical_json(data: dict[str, Any]) -> str:
-    """
-    Deterministic JSON:
-    - sort_keys=True for stable ordering
-    - separators remove whitespace
-    - ensure_ascii=True for cross-platform reproducibility
-    """
-    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+from src.blockchain.canonical import canonical_bytes, canonical_hash
 
 
 def compute_hash(data: dict[str, Any]) -> str:
     """SHA-256 hex of canonical JSON."""
-    canon = canonical_json(data)
-    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+    return canonical_hash(data)
+
+
+# Files at least this big are hashed through mmap (one update, no copies)
+MMAP_MIN_SIZE = 8 * 1024 * 1024
+FILE_HASH_CHUNK = 1024 * 1024
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
 
 
-def compute_file_hash(file_path: str) -> str:
-    """SHA-256 hex of file bytes."""
+def compute_bytes_hash(data: bytes | bytearray | memoryview) -> str:
+    """SHA-256 hex of bytes already in memory (e.g. an image read once for decoding)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def compute_file_hash(file_path: str | Path, chunk_size: int = FILE_HASH_CHUNK) -> str:
+    """SHA-256 hex of file bytes: mmap for large files, 1 MiB readinto buffer otherwise."""
     sha = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            sha.update(chunk)
+    with open(file_path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                sha.update(m)
+            return sha.hexdigest()
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while n := f.readinto(buf):
+            sha.update(view[:n])
     return sha.hexdigest()
 
 
+def hash_files(paths: Iterable[str | Path], max_workers: int | None = None) -> dict[str, str]:
+    """
+    Hash many files concurrently. hashlib releases the GIL on large updates,
+    so threads overlap both the I/O and the SHA-256 work.
+    """
+    paths = [str(p) for p in paths]
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(paths, pool.map(compute_file_hash, paths)))
+
+
+def hash_directory(directory: str | Path, exts: tuple[str, ...] = IMAGE_EXTS, max_workers: int | None = None) -> dict[str, str]:
+    """Hash every image under `directory` (recursive). Returns {path: sha256}."""
+    files = sorted(p for p in Path(directory).rglob("*") if p.is_file() and p.suffix.lower() in exts)
+    return hash_files(files, max_workers)
+
+
 def build_analysis_payload(
     scene_id: str,
     dataset_id: str,
@@ -92,7 +121,9 @@ def build_evidence_record(
     - analysis_hash (required)
     - scene_id (optional but recommended)
     """
-    analysis_hash = compute_hash(analysis_payload)
+    # Serialize once: the same canonical bytes give the hash and the stored copy
+    canon = canonical_bytes(analysis_payload)
+    analysis_hash = hashlib.sha256(canon).hexdigest()
 
     record: dict[str, Any] = {
         "analysis_hash": analysis_hash,
@@ -108,7 +139,7 @@ def build_evidence_record(
     # Useful for your LocalLedgerAdapter audit/debug
     if store_payload_locally:
         record["analysis_payload"] = analysis_payload
-        record["analysis_payload_canonical"] = canonical_json(analysis_payload)
+        record["analysis_payload_canonical"] = canon.decode("ascii")
 
     return record
 
@@ -117,10 +148,44 @@ def verify_integrity(analysis_payload: dict[str, Any], expected_hash: str) -> bo
     """Recompute and compare."""
     return compute_hash(analysis_payload) == expected_hash
 
+def content_hash(bundle: dict[str, Any]) -> str:
+    """
+    Dedupe key of a bundle: hash of its content only. The attached "evidence"
+    block (hash + registration timestamp) is not content.
+    """
+    return compute_hash({k: v for k, v in bundle.items() if k != "evidence"})
+
+
 def hash_bundle(bundle: dict[str, Any]) -> dict[str, Any]:
     ts = datetime.now(timezone.utc).isoformat()
     return {
-        "sha256": compute_hash(bundle),
+        "sha256": content_hash(bundle),
         "timestamp_utc": ts
     }
 
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    p = argparse.ArgumentParser(description="Bulk SHA-256 of image files")
+    p.add_argument("paths", nargs="+", help="files or directories")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--out", default=None, help="write {path: sha256} JSON here")
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    hashes: dict[str, str] = {}
+    files = [x for x in args.paths if Path(x).is_file()]
+    hashes.update(hash_files(files, args.workers))
+    for d in (x for x in args.paths if Path(x).is_dir()):
+        hashes.update(hash_directory(d, max_workers=args.workers))
+    elapsed = time.perf_counter() - t0
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(hashes, indent=2), encoding="utf-8")
+    else:
+        for path, h in hashes.items():
+            print(h, path)
+    print(f"{len(hashes)} files in {elapsed:.2f}s")
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src import config
+
+
+logger = logging.getLogger(__name__)
+
+# Cache TTL for responses that never change (e.g. raw hex of a txid)
+IMMUTABLE = float("inf")
+
+
+class TTLCache:
+    """Small thread-safe LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_s: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class RateLimiter:
+    """Spaces requests at most `rate_per_s` per second (0 = unlimited)."""
+
+    def __init__(self, rate_per_s: float = 0.0):
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def penalize(self, seconds: float) -> None:
+        """Push the next slot back (server asked us to slow down)."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class HttpClient:
+    """
+    Shared HTTP client for WhatsOnChain / ARC.
+
+    - keep-alive connection pool (one requests.Session per base URL)
+    - default (connect, read) timeouts
+    - client-side rate limit + honours 429 Retry-After
+    - LRU/TTL cache for GETs the caller marks cacheable
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float | tuple[float, float] = (3.05, 15.0),
+        rate_per_s: float = 0.0,
+        pool_size: int = 16,
+        max_429_retries: int = 3,
+        cache_size: int = 1024,
+        headers: dict[str, str] | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_429_retries = max_429_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.limiter = RateLimiter(rate_per_s)
+        self.cache = TTLCache(cache_size)
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, timeout: Any = None, **kwargs: Any) -> requests.Response:
+        url = self.url(path)
+        for attempt in range(self.max_429_retries + 1):
+            self.limiter.wait()
+            resp = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            if resp.status_code != 429 or attempt == self.max_429_retries:
+                return resp
+            try:
+                retry_after = float(resp.headers.get("Retry-After", "1"))
+            except ValueError:
+                retry_after = 1.0
+            logger.warning("[HTTP] 429 from %s, backing off %.1fs", url, retry_after)
+            self.limiter.penalize(retry_after)
+        return resp
+
+    def get(self, path: str, timeout: Any = None) -> requests.Response:
+        return self.request("GET", path, timeout=timeout)
+
+    def get_json(self, path: str, cache_ttl_s: float | None = None, timeout: Any = None) -> Any:
+        """GET + raise_for_status + JSON. With cache_ttl_s the parsed body is cached."""
+        key = "json:" + path
+        if cache_ttl_s is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+        resp = self.get(path, timeout=timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        if cache_ttl_s is not None:
+            self.cache.set(key, data, cache_ttl_s)
+        return data
+
+    def get_text(self, path: str, cache_ttl_s: float | None = None, timeout: Any = None) -> str:
+        key = "text:" + path
+        if cache_ttl_s is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+        resp = self.get(path, timeout=timeout)
+        resp.raise_for_status()
+        text = resp.text.strip()
+        if cache_ttl_s is not None:
+            self.cache.set(key, text, cache_ttl_s)
+        return text
+
+    def post_json(self, path: str, payload: Any, timeout: Any = None, headers: dict[str, str] | None = None) -> requests.Response:
+        return self.request("POST", path, timeout=timeout, json=payload, headers=headers)
+
+
+_CLIENTS: dict[str, HttpClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(base_url: str, **kwargs: Any) -> HttpClient:
+    """One pooled client per base URL per process."""
+    key = base_url.rstrip("/")
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = HttpClient(key, **kwargs)
+    return client
+
+
+def woc_client(base_url: str | None = None) -> HttpClient:
+    return get_client(
+        base_url or config.WOC_BASE,
+        timeout=(3.05, float(getattr(config, "WOC_TIMEOUT_S", 15.0))),
+        rate_per_s=float(getattr(config, "WOC_RATE_LIMIT_PER_S", 0.0)),
+    )
+
+
+def arc_client(base_url: str | None = None) -> HttpClient:
+    return get_client(
+        base_url or config.ARC_URL,
+        timeout=(3.05, float(getattr(config, "ARC_TIMEOUT_S", 30.0))),
+    )
+
+
+# ARC txStatus values meaning the tx was not accepted
+ARC_FAILURE_STATUSES = {"REJECTED", "ERROR", "INVALID", "MALFORMED"}
+# Rejection reasons meaning an input of the tx is already gone
+_INPUT_SPENT = re.compile(r"already spent|missing input|double spend", re.IGNORECASE)
+
+
+class ArcRejected(RuntimeError):
+    """
+    ARC answered and refused the tx: it was not broadcast. Timeouts, lost
+    connections and 5xx answers raise other errors, since the tx may still
+    have gone out. input_spent is set when ARC says an input is already spent.
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.input_spent = bool(_INPUT_SPENT.search(message))
+
+
+def arc_broadcast(client: HttpClient, raw_tx_hex: str, api_key: str | None = None) -> str:
+    """
+    POST /v1/tx to ARC over the pooled client. Returns txid; raises
+    ArcRejected if ARC refused the tx, RuntimeError on any other failure.
+    """
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    resp = client.post_json("v1/tx", {"rawTx": raw_tx_hex}, headers=headers)
+    try:
+        data = resp.json()
+    except ValueError:
+        data = {}
+
+    if not resp.ok:
+        desc = data.get("detail") or data.get("title") or resp.text[:200] or "unknown"
+        error = ArcRejected if 400 <= resp.status_code < 500 else RuntimeError
+        raise error(f"ARC broadcast failed: {resp.status_code} - {desc}")
+
+    status = data.get("txStatus", "")
+    if status in ARC_FAILURE_STATUSES:
+        raise ArcRejected(f"ARC broadcast failed: {status} - {data.get('extraInfo') or ''}".strip())
+    txid = data.get("txid", "")
+    if not txid:
+        raise RuntimeError("ARC broadcast success but txid missing")
+    return txid
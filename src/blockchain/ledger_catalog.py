@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+from src.blockchain.ledger_segments import parse_utc
+
+
+logger = logging.getLogger(__name__)
+
+# Columns with a secondary index (all combined with timestamp for range scans)
+INDEXED_FIELDS = ("scene_id", "dataset_id", "model_version", "status")
+# Stored for records without a (parseable) timestamp_utc: keeps `ts` NOT NULL so
+# ORDER BY ts, rowid is served by the indexes, and sorts them before everything
+NO_TS = -1e300
+
+
+def default_catalog_path(ledger_path: Path) -> Path:
+    return ledger_path.with_name(ledger_path.stem + ".catalog.sqlite")
+
+
+def _ts(value: Any) -> float:
+    t = parse_utc(value)
+    return t.timestamp() if t is not None else NO_TS
+
+
+def encode_cursor(ts: float, rowid: int) -> str:
+    return f"{ts!r}:{rowid}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    ts, rowid = cursor.rsplit(":", 1)
+    return float(ts), int(rowid)
+
+
+class LedgerCatalog:
+    """
+    Secondary indexes over the whole ledger (every segment): scene_id,
+    dataset_id, model_version, timestamp_utc and effective tx status.
+
+    One row per analysis_hash, in ledger order (rowid). Rows are added on
+    append and status/tx_id follow the updates log, so queries such as "all
+    evidence for scene X" or "still pending on-chain" are index range scans
+    instead of a full JSON scan. The catalog only says *which* records match;
+    the records themselves are read through the primary index.
+
+    Like the primary index it is derived data: `active_bytes`/`updates_bytes`
+    watermarks let sync() pick up lines from other writers, and rebuild()
+    recreates it from the ledger files.
+    """
+
+    def __init__(self, ledger_path: str | Path, catalog_path: str | Path | None = None):
+        self.ledger_path = Path(ledger_path)
+        self.catalog_path = Path(catalog_path) if catalog_path else default_catalog_path(self.ledger_path)
+        self.lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.catalog_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                rowid INTEGER PRIMARY KEY,
+                analysis_hash TEXT NOT NULL UNIQUE,
+                evidence_id TEXT,
+                scene_id TEXT,
+                dataset_id TEXT,
+                model_version TEXT,
+                ts REAL NOT NULL,
+                status TEXT,
+                tx_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_scene ON entries(scene_id, ts);
+            CREATE INDEX IF NOT EXISTS ix_dataset ON entries(dataset_id, ts);
+            CREATE INDEX IF NOT EXISTS ix_model ON entries(model_version, ts);
+            CREATE INDEX IF NOT EXISTS ix_status ON entries(status, ts);
+            CREATE INDEX IF NOT EXISTS ix_ts ON entries(ts);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta(key, value) VALUES ('active_bytes', 0);
+            INSERT OR IGNORE INTO meta(key, value) VALUES ('updates_bytes', 0);
+            """
+        )
+        self._conn.commit()
+
+    # ---- state ----
+
+    def _meta(self, key: str) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._conn.execute("UPDATE meta SET value = ? WHERE key = ?", (value, key))
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ---- writes ----
+
+    @staticmethod
+    def _row(record: dict[str, Any]) -> tuple:
+        return (
+            record["analysis_hash"],
+            record.get("evidence_id"),
+            record.get("scene_id"),
+            record.get("dataset_id"),
+            record.get("model_version"),
+            _ts(record.get("timestamp_utc")),
+            record.get("status") or "registered",
+            record.get("tx_id"),
+        )
+
+    def _insert(self, records: Iterable[dict[str, Any]]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO entries(analysis_hash, evidence_id, scene_id, dataset_id, "
+            "model_version, ts, status, tx_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self._row(r) for r in records if r.get("analysis_hash")),
+        )
+
+    def _apply_update(self, analysis_hash: str, fields: dict[str, Any]) -> None:
+        if "status" in fields or "tx_id" in fields:
+            self._conn.execute(
+                "UPDATE entries SET status = COALESCE(?, status), tx_id = COALESCE(?, tx_id) WHERE analysis_hash = ?",
+                (fields.get("status"), fields.get("tx_id"), analysis_hash),
+            )
+
+    def add(self, record: dict[str, Any], offset: int, length: int) -> None:
+        """Catalog a line just appended to the active ledger at `offset`."""
+        with self.lock:
+            self._insert([record])
+            # Same rule as LedgerIndex.add: only advance if nobody appended in between
+            self._conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'active_bytes' AND value = ?",
+                (offset + length, offset),
+            )
+            self._conn.commit()
+
+    def _scan(self, path: Path, start: int) -> int:
+        """Catalog complete lines of `path` from `start`; returns the new watermark."""
+        pos = start
+        batch: list[dict[str, Any]] = []
+        with open(path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial write in progress
+                pos += len(line)
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= 1000:
+                    self._insert(batch)
+                    batch.clear()
+        self._insert(batch)
+        return pos
+
+    def sync(self, updates_path: Path) -> None:
+        """Catch up with lines appended to the active ledger and the updates log by other writers."""
+        with self.lock:
+            size = self.ledger_path.stat().st_size if self.ledger_path.exists() else 0
+            start = self._meta("active_bytes")
+            if size < start:
+                start = 0  # rotated or compacted: rows are keyed by hash, rescanning is idempotent
+            if size != start:
+                self._set_meta("active_bytes", self._scan(self.ledger_path, start))
+
+            size = updates_path.stat().st_size if updates_path.exists() else 0
+            start = self._meta("updates_bytes")
+            if size < start:
+                start = 0
+            if size != start:
+                pos = start
+                with open(updates_path, "rb") as f:
+                    f.seek(start)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        pos += len(line)
+                        if line.strip():
+                            upd = json.loads(line)
+                            self._apply_update(upd.pop("analysis_hash"), upd)
+                self._set_meta("updates_bytes", pos)
+            self._conn.commit()
+
+    def mark_synced(self, active_bytes: int, updates_bytes: int | None = None) -> None:
+        """Move the watermarks after the caller rotated/rewrote files it had already cataloged."""
+        with self.lock:
+            self._set_meta("active_bytes", active_bytes)
+            if updates_bytes is not None:
+                self._set_meta("updates_bytes", updates_bytes)
+            self._conn.commit()
+
+    def rebuild(self, ledger_files: Iterable[Path], updates_path: Path) -> int:
+        """Drop and recreate the catalog from every ledger file (oldest first) and the updates log."""
+        with self.lock:
+            self._conn.execute("DELETE FROM entries")
+            files = list(ledger_files)
+            for path in files:
+                if path.exists() and path != self.ledger_path:
+                    self._scan(path, 0)
+            self.mark_synced(0, 0)
+            self.sync(updates_path)
+            return len(self)
+
+    # ---- queries ----
+
+    def _where(
+        self,
+        filters: dict[str, Any],
+        since: str | datetime | None,
+        until: str | datetime | None,
+    ) -> tuple[list[str], list[Any]]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        for field in INDEXED_FIELDS:
+            value = filters.get(field)
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{field} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{field} = ?")
+                params.append(value)
+        if parse_utc(since) is not None:
+            clauses.append("ts >= ?")
+            params.append(_ts(since))
+        if parse_utc(until) is not None:
+            clauses.append("ts <= ?")
+            params.append(_ts(until))
+        return clauses, params
+
+    def count(
+        self,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        **filters: Any,
+    ) -> int:
+        clauses, params = self._where(filters, since, until)
+        sql = "SELECT COUNT(*) FROM entries" + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+        return self._conn.execute(sql, params).fetchone()[0]
+
+    def find(
+        self,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+        newest_first: bool = True,
+        **filters: Any,
+    ) -> tuple[list[str], str | None]:
+        """
+        analysis_hashes matching the filters, ordered by (timestamp_utc, ledger
+        order). Keyset pagination: pass the returned cursor to get the next page.
+        Records without a timestamp sort first (oldest).
+        """
+        clauses, params = self._where(filters, since, until)
+        if cursor:
+            clauses.append(f"(ts, rowid) {'<' if newest_first else '>'} (?, ?)")
+            params.extend(decode_cursor(cursor))
+        order = "DESC" if newest_first else "ASC"
+        sql = (
+            "SELECT analysis_hash, ts, rowid FROM entries"
+            + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+            + f" ORDER BY ts {order}, rowid {order} LIMIT ?"
+        )
+        rows = self._conn.execute(sql, [*params, limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][2]) if more and rows else None
+        return [r[0] for r in rows], next_cursor
+
+    def distinct(self, field: str, limit: int = 1000) -> list[str]:
+        """Known values of an indexed field (for filter pickers)."""
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"field must be one of {INDEXED_FIELDS}")
+        rows = self._conn.execute(
+            f"SELECT DISTINCT {field} FROM entries WHERE {field} IS NOT NULL ORDER BY {field} LIMIT ?", (limit,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src import config
+
+    p = argparse.ArgumentParser(description="Query the evidence ledger through its secondary indexes")
+    p.add_argument("--ledger", default=str(config.LEDGER_PATH))
+    p.add_argument("--scene-id", default=None)
+    p.add_argument("--dataset-id", default=None)
+    p.add_argument("--model-version", default=None)
+    p.add_argument("--status", default=None)
+    p.add_argument("--since", default=None)
+    p.add_argument("--until", default=None)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--cursor", default=None)
+    p.add_argument("--oldest-first", action="store_true")
+    p.add_argument("--rebuild", action="store_true", help="recreate the catalog from the ledger files")
+    args = p.parse_args()
+
+    from src.blockchain.adapter import LocalLedgerAdapter
+
+    adapter = LocalLedgerAdapter(args.ledger)
+    if args.rebuild:
+        print("Cataloged", adapter.rebuild_catalog(), "records")
+    page = adapter.query(
+        scene_id=args.scene_id,
+        dataset_id=args.dataset_id,
+        model_version=args.model_version,
+        status=args.status,
+        since=args.since,
+        until=args.until,
+        limit=args.limit,
+        cursor=args.cursor,
+        newest_first=not args.oldest_first,
+    )
+    for r in page["records"]:
+        print(r.get("timestamp_utc"), r.get("status", "registered"), r.get("scene_id"), r.get("analysis_hash"))
+    print(f"{len(page['records'])} of {page['total']}; next cursor: {page['next_cursor']}")
@@ -0,0 +1,487 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from src import config
+from src.blockchain.canonical import canonical_bytes, canonical_hash
+
+
+logger = logging.getLogger(__name__)
+
+# prev_hash of the first chained entry
+GENESIS_HASH = "0" * 64
+
+# Fields written later through the updates log (and folded in by compaction).
+# They are excluded from entry_hash so updating/compacting never breaks the
+# chain; the updates log has its own hash chain that covers them instead.
+UPDATABLE_FIELDS = frozenset({
+    "entry_hash",
+    "tx_id",
+    "vout",
+    "status",
+    "anchor",
+    "merkle_root",
+    "merkle_proof",
+    "last_error",
+    "verification",
+})
+
+# Payloads are bound to the entry through analysis_hash (blob key = its hash),
+# so they can be moved out to the blob store without breaking the chain.
+DETACHED_FIELDS = frozenset({"analysis_payload", "analysis_payload_canonical"})
+
+# Chain bookkeeping of an updates-log line, never merged into the record.
+# ledger_seq is only on the first chained line: ledger entries up to it were
+# written (and maybe compacted) before the updates log was chained.
+UPDATE_CHAIN_FIELDS = frozenset({"update_seq", "prev_update", "update_hash", "ledger_seq"})
+
+
+# ======================================================================
+# ENTRY HASHES
+# ======================================================================
+
+def entry_hash(entry: dict[str, Any]) -> str:
+    """SHA-256 over the immutable fields of a ledger entry (prev_hash included)."""
+    immutable = {k: v for k, v in entry.items() if k not in UPDATABLE_FIELDS and k not in DETACHED_FIELDS}
+    return canonical_hash(immutable)
+
+
+def chain_entry(entry: dict[str, Any], prev_hash: str, seq: int) -> dict[str, Any]:
+    """Link `entry` after `prev_hash` and stamp its own entry_hash."""
+    linked = {**entry, "chain_seq": seq, "prev_hash": prev_hash}
+    linked["entry_hash"] = entry_hash(linked)
+    return linked
+
+
+def update_hash(update: dict[str, Any]) -> str:
+    """SHA-256 over an updates-log line (prev_update included), minus its own hash."""
+    return canonical_hash({k: v for k, v in update.items() if k != "update_hash"})
+
+
+def chain_update(update: dict[str, Any], prev_hash: str, seq: int) -> dict[str, Any]:
+    """Link an updates-log line after `prev_hash` and stamp its update_hash."""
+    linked = {**update, "update_seq": seq, "prev_update": prev_hash}
+    linked["update_hash"] = update_hash(linked)
+    return linked
+
+
+def split_update(line: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    """(analysis_hash, record fields) of an updates-log line."""
+    fields = {k: v for k, v in line.items() if k != "analysis_hash" and k not in UPDATE_CHAIN_FIELDS}
+    return str(line.get("analysis_hash") or ""), fields
+
+
+def read_updates_head(updates_path: Path) -> tuple[str, int] | None:
+    """
+    (update_hash, update_seq) of the last chained update, looking in the
+    archive when compaction left the live log empty. None if the updates log
+    has not been chained yet.
+    """
+    from src.blockchain.ledger_index import default_updates_archive_path, iter_lines_reverse
+
+    for path in (updates_path, default_updates_archive_path(updates_path)):
+        if not path.exists():
+            continue
+        for line in iter_lines_reverse(path):
+            try:
+                update = json.loads(line)
+            except ValueError:
+                continue  # torn last line of a crashed append
+            if "update_hash" in update:
+                return update["update_hash"], int(update["update_seq"])
+            return None  # last line is a legacy (unchained) update
+    return None
+
+
+def read_chain_head(ledger_path: Path) -> tuple[str, int]:
+    """(entry_hash, chain_seq) of the last chained entry, or (GENESIS_HASH, -1)."""
+    from src.blockchain.ledger_index import iter_lines_reverse
+
+    from src.blockchain.ledger_segments import read_manifest
+
+    if ledger_path.exists():
+        for line in iter_lines_reverse(ledger_path):
+            record = json.loads(line)
+            if "entry_hash" in record:
+                return record["entry_hash"], int(record["chain_seq"])
+            return GENESIS_HASH, -1  # last line is a legacy (unchained) entry
+    # Active segment empty (just rotated): continue from the last sealed one
+    for seg in reversed(read_manifest(ledger_path).get("segments", [])):
+        if seg.get("last_entry_hash"):
+            return seg["last_entry_hash"], int(seg["seq_last"])
+        if seg.get("records"):
+            break
+    return GENESIS_HASH, -1
+
+
+# ======================================================================
+# SIGNED CHECKPOINTS
+# ======================================================================
+
+def default_checkpoints_path(ledger_path: Path) -> Path:
+    return ledger_path.with_name(ledger_path.stem + ".checkpoints.jsonl")
+
+
+def _checkpoint_message(cp: dict[str, Any]) -> bytes:
+    # line_offset and segment are only seek hints (compaction/rotation move them), so they are not signed.
+    # Checkpoints written before the updates log was chained have no updates_* fields.
+    signed = {
+        k: cp[k] for k in ("chain_seq", "entry_hash", "created_utc", "updates_seq", "updates_hash") if k in cp
+    }
+    return canonical_bytes(signed)
+
+
+def _bsv_key():
+    if not config.BSV_PRIVATE_KEY:
+        return None
+    try:
+        from bsv import PrivateKey
+        return PrivateKey(config.BSV_PRIVATE_KEY)
+    except Exception:
+        return None
+
+
+def sign_checkpoint(cp: dict[str, Any]) -> dict[str, Any]:
+    """
+    Sign with HMAC-SHA256 when LEDGER_CHECKPOINT_KEY is set, otherwise with the
+    BSV key (ECDSA, verifiable by anyone holding the public key).
+    """
+    msg = _checkpoint_message(cp)
+    secret = os.getenv("LEDGER_CHECKPOINT_KEY") or getattr(config, "LEDGER_CHECKPOINT_KEY", "")
+    if secret:
+        return {**cp, "alg": "hmac-sha256", "sig": hmac.new(secret.encode(), msg, hashlib.sha256).hexdigest()}
+    key = _bsv_key()
+    if key is not None:
+        return {**cp, "alg": "bsv-ecdsa", "pubkey": key.public_key().hex(), "sig": key.sign(msg).hex()}
+    return {**cp, "alg": "none", "sig": ""}
+
+
+def verify_checkpoint(cp: dict[str, Any]) -> bool:
+    """True if the checkpoint carries a valid signature from our own key."""
+    try:
+        msg = _checkpoint_message(cp)
+        if cp.get("alg") == "hmac-sha256":
+            secret = os.getenv("LEDGER_CHECKPOINT_KEY") or getattr(config, "LEDGER_CHECKPOINT_KEY", "")
+            expected = hmac.new(secret.encode(), msg, hashlib.sha256).hexdigest()
+            return bool(secret) and hmac.compare_digest(expected, cp.get("sig", ""))
+        if cp.get("alg") == "bsv-ecdsa":
+            key = _bsv_key()
+            if key is None or key.public_key().hex() != cp.get("pubkey"):
+                return False
+            from bsv import PublicKey
+            return PublicKey(cp["pubkey"]).verify(bytes.fromhex(cp["sig"]), msg)
+    except Exception as e:
+        logger.warning("[CHAIN] Bad checkpoint %s: %s", cp.get("chain_seq"), e)
+    return False
+
+
+def load_checkpoints(ledger_path: Path) -> list[dict[str, Any]]:
+    path = default_checkpoints_path(ledger_path)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_checkpoint(
+    ledger_path: Path,
+    entry_hash_: str,
+    seq: int,
+    line_offset: int,
+    segment: str | None = None,
+) -> dict[str, Any]:
+    """
+    Append a signed checkpoint for the entry at `line_offset` (of sealed
+    `segment`, or the active ledger). It also signs the current head of the
+    updates chain, so rewriting updates before it is detected.
+    """
+    from src.blockchain.ledger_index import default_updates_path
+
+    cp = {
+        "chain_seq": seq,
+        "entry_hash": entry_hash_,
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "line_offset": line_offset,
+    }
+    if segment:
+        cp["segment"] = segment
+    updates_head = read_updates_head(default_updates_path(ledger_path))
+    if updates_head is not None:
+        cp["updates_hash"], cp["updates_seq"] = updates_head
+    cp = sign_checkpoint(cp)
+    with open(default_checkpoints_path(ledger_path), "a", encoding="utf-8") as f:
+        f.write(json.dumps(cp, sort_keys=True) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    logger.info("[CHAIN] Checkpoint at seq %d (%s)", seq, entry_hash_[:16])
+    return cp
+
+
+def remap_checkpoints(ledger_path: Path, offsets: dict[str, int], segment: str | None = None) -> None:
+    """
+    After compaction or rotation: point the line_offset (and segment) hints at
+    the rewritten/moved lines. Signatures are unchanged. `segment` is the
+    sealed segment file holding those lines, None for the active ledger.
+    """
+    cps = load_checkpoints(ledger_path)
+    if not cps or not offsets:
+        return
+    path = default_checkpoints_path(ledger_path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for cp in cps:
+            if cp["entry_hash"] in offsets:
+                cp["line_offset"] = offsets[cp["entry_hash"]]
+                if segment:
+                    cp["segment"] = segment
+                else:
+                    cp.pop("segment", None)
+            f.write(json.dumps(cp, sort_keys=True) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ======================================================================
+# AUDIT
+# ======================================================================
+
+def ledger_files(ledger_path: Path) -> list[tuple[str | None, Path]]:
+    """(segment name, path) of every ledger file in chain order; the active file last, as None."""
+    from src.blockchain.ledger_segments import default_segments_dir, read_manifest
+
+    seg_dir = default_segments_dir(ledger_path)
+    files: list[tuple[str | None, Path]] = [
+        (seg["name"], seg_dir / seg["name"]) for seg in read_manifest(ledger_path).get("segments", [])
+    ]
+    files.append((None, ledger_path))
+    return files
+
+
+def replay_updates(ledger_path: Path) -> dict[str, Any]:
+    """
+    Walk the updates chain (archive, then live log) checking every link and
+    update_hash, and that it still holds the updates head signed by the
+    latest checkpoint. Returns {ok, checked, legacy, errors, head, ledger_seq,
+    allowed}: allowed[(analysis_hash, field)] lists the values a ledger line
+    may hold for a folded field, i.e. the last one compaction archived or any
+    assigned after it (compaction may have stopped half way).
+    """
+    from src.blockchain.ledger_index import default_updates_archive_path, default_updates_path
+
+    updates_path = default_updates_path(ledger_path)
+    out: dict[str, Any] = {"ok": True, "checked": 0, "legacy": 0, "errors": [], "ledger_seq": None}
+    seen: dict[int, str] = {}
+    history: dict[tuple[str, str], list[tuple[Any, bool]]] = {}
+    prev: str | None = None
+    seq = -1
+
+    def fail(path: Path, offset: int, reason: str) -> None:
+        out["ok"] = False
+        out["errors"].append({"file": path.name, "offset": offset, "update_seq": seq + 1, "reason": reason})
+
+    for path, archived in ((default_updates_archive_path(updates_path), True), (updates_path, False)):
+        if not path.exists():
+            continue
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                pos, offset = offset, offset + len(line)
+                if not line.endswith(b"\n"):
+                    break  # torn append
+                if not line.strip():
+                    continue
+                update = json.loads(line)
+                if "update_hash" not in update:
+                    if prev is None:
+                        out["legacy"] += 1  # written before the updates log was chained
+                    else:
+                        fail(path, pos, "unchained update after chain start")
+                    continue
+                useq = update.get("update_seq")
+                if not archived and isinstance(useq, int) and useq <= seq and seen.get(useq) == update["update_hash"]:
+                    continue  # archived by a compaction that stopped before truncating the live log
+
+                if update.get("prev_update") != (GENESIS_HASH if prev is None else prev):
+                    fail(path, pos, "prev_update does not link to previous update")
+                if useq != seq + 1:
+                    fail(path, pos, f"update_seq {useq} != {seq + 1}")
+                if update_hash(update) != update["update_hash"]:
+                    fail(path, pos, "update modified (update_hash mismatch)")
+                if prev is None:
+                    out["ledger_seq"] = update.get("ledger_seq")
+                prev, seq = update["update_hash"], seq + 1
+                seen[seq] = prev
+                h, fields = split_update(update)
+                for field, value in fields.items():
+                    history.setdefault((h, field), []).append((value, archived))
+                out["checked"] += 1
+
+    for cp in reversed(load_checkpoints(ledger_path)):
+        if "updates_seq" in cp and verify_checkpoint(cp):
+            if seen.get(cp["updates_seq"]) != cp.get("updates_hash"):
+                out["ok"] = False
+                out["errors"].append({
+                    "file": updates_path.name,
+                    "update_seq": cp["updates_seq"],
+                    "reason": f"updates chain lost or rewrote the update signed at checkpoint {cp['chain_seq']}",
+                })
+            break
+
+    allowed: dict[tuple[str, str], list[Any]] = {}
+    for key, values in history.items():
+        last_archived = max((i for i, (_, arch) in enumerate(values) if arch), default=0)
+        allowed[key] = [v for v, _ in values[last_archived:]]
+    out["allowed"] = allowed
+    out["head"] = {"update_hash": prev, "update_seq": seq}
+    return out
+
+
+def _trusted_start(
+    ledger_path: Path,
+    files: list[tuple[str | None, Path]],
+) -> tuple[dict[str, Any] | None, int, int]:
+    """
+    Latest checkpoint whose signature verifies and whose entry is still in place.
+    Returns (checkpoint, index into `files`, offset just after the entry).
+    """
+    positions = {name: i for i, (name, _) in enumerate(files)}
+    for cp in reversed(load_checkpoints(ledger_path)):
+        i = positions.get(cp.get("segment"))
+        if i is None or not files[i][1].exists() or not verify_checkpoint(cp):
+            continue
+        with open(files[i][1], "rb") as f:
+            f.seek(cp["line_offset"])
+            line = f.readline()
+            end = f.tell()
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("entry_hash") == cp["entry_hash"] == entry_hash(record):
+            return cp, i, end
+        logger.warning("[CHAIN] Checkpoint %d does not match the ledger", cp["chain_seq"])
+    return None, 0, 0
+
+
+def audit(
+    ledger_path: str | Path | None = None,
+    full: bool = False,
+    check_payloads: bool = False,
+) -> dict[str, Any]:
+    """
+    Verify the hash chain across sealed segments and the active ledger.
+    Starts after the last trusted checkpoint (O(new entries)) unless `full`.
+    The updates chain is always replayed in full (replay_updates), and every
+    audited entry's folded fields (tx_id, status, ...) must match it.
+    With `check_payloads`, also recompute compute_hash(analysis_payload) for
+    every audited entry.
+    """
+    from src.blockchain.hashing import compute_hash
+    from src.storage.blob_store import BlobStore, default_blob_dir
+
+    ledger_path = Path(ledger_path) if ledger_path else Path(config.LEDGER_PATH)
+    blobs = BlobStore(default_blob_dir(ledger_path)) if check_payloads else None
+    report: dict[str, Any] = {"ledger": str(ledger_path), "ok": True, "checked": 0, "legacy": 0, "errors": []}
+    files = ledger_files(ledger_path)
+
+    cp, first, start = (None, 0, 0) if full else _trusted_start(ledger_path, files)
+    prev, seq = (cp["entry_hash"], cp["chain_seq"]) if cp else (None, -1)
+    report["from_checkpoint"] = cp["chain_seq"] if cp else None
+
+    updates = replay_updates(ledger_path)
+    report["updates"] = {k: updates[k] for k in ("checked", "legacy", "head")}
+    report["unbacked_legacy"] = 0
+    if not updates["ok"]:
+        report["ok"] = False
+        report["errors"].extend(updates["errors"])
+    allowed, updates_from = updates["allowed"], updates["ledger_seq"]
+    folded_fields = UPDATABLE_FIELDS - {"entry_hash"}
+
+    def fail(segment: str | None, offset: int, reason: str) -> None:
+        report["ok"] = False
+        report["errors"].append({"segment": segment, "offset": offset, "chain_seq": seq + 1, "reason": reason})
+
+    for segment, path in files[first:]:
+        if not path.exists():
+            if segment is not None:
+                fail(segment, 0, "segment file missing")
+            start = 0
+            continue
+        with open(path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                pos, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "entry_hash" not in record:
+                    if prev is None:
+                        report["legacy"] += 1  # written before chaining existed
+                    else:
+                        fail(segment, pos, "unchained entry after chain start")
+                    continue
+
+                expected_prev = GENESIS_HASH if prev is None else prev
+                if record.get("prev_hash") != expected_prev:
+                    fail(segment, pos, "prev_hash does not link to previous entry")
+                if record.get("chain_seq") != seq + 1:
+                    fail(segment, pos, f"chain_seq {record.get('chain_seq')} != {seq + 1}")
+                if entry_hash(record) != record["entry_hash"]:
+                    fail(segment, pos, "entry modified (entry_hash mismatch)")
+                for field in sorted(folded_fields & record.keys()):
+                    values = allowed.get((record.get("analysis_hash"), field))
+                    if values is None:
+                        # Folded before the updates log was chained: nothing to check against
+                        if updates_from is None or int(record.get("chain_seq", -1)) <= updates_from:
+                            report["unbacked_legacy"] += 1
+                        else:
+                            fail(segment, pos, f"{field} not backed by the updates log")
+                    elif record[field] not in values:
+                        fail(segment, pos, f"{field} does not match the updates log")
+                if blobs is not None:
+                    if isinstance(record.get("analysis_payload"), dict):
+                        payload_ok = compute_hash(record["analysis_payload"]) == record.get("analysis_hash")
+                    else:
+                        payload_ok = "payload_hash" not in record and blobs.verify(record.get("analysis_hash", ""))
+                    if not payload_ok:
+                        fail(segment, pos, "payload missing or does not match analysis_hash")
+
+                prev, seq = record["entry_hash"], int(record.get("chain_seq", seq + 1))
+                report["checked"] += 1
+                report["last_offset"] = pos
+                report["last_segment"] = segment
+        start = 0
+
+    report["head"] = {"entry_hash": prev, "chain_seq": seq}
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Audit the hash-chained evidence ledger")
+    p.add_argument("--ledger", default=str(config.LEDGER_PATH))
+    p.add_argument("--full", action="store_true", help="ignore checkpoints and audit from the start")
+    p.add_argument("--payloads", action="store_true", help="also recompute analysis hashes")
+    p.add_argument("--checkpoint", action="store_true", help="write a signed checkpoint if the audit passes")
+    args = p.parse_args()
+
+    ledger = Path(args.ledger)
+    result = audit(ledger, full=args.full, check_payloads=args.payloads)
+    print(json.dumps(result, indent=2))
+    if args.checkpoint and result["ok"] and result.get("last_offset") is not None:
+        head = result["head"]
+        cp = write_checkpoint(
+            ledger, head["entry_hash"], head["chain_seq"], result["last_offset"], result.get("last_segment")
+        )
+        print(f"Checkpoint written at seq {cp['chain_seq']} ({cp['alg']})")
+    raise SystemExit(0 if result["ok"] else 1)
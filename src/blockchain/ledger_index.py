@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Iterator
+
+from src.blockchain.ledger_chain import GENESIS_HASH, chain_update, read_chain_head, read_updates_head, split_update
+
+try:
+    import fcntl
+    _FCNTL_AVAILABLE = True
+except ImportError:
+    _FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def default_index_path(ledger_path: Path) -> Path:
+    return ledger_path.with_name(ledger_path.stem + ".idx.sqlite")
+
+
+def default_updates_path(ledger_path: Path) -> Path:
+    return ledger_path.with_name(ledger_path.stem + ".updates.jsonl")
+
+
+def default_updates_archive_path(updates_path: Path) -> Path:
+    """Updates already folded into the ledger by compaction (the chain continues there)."""
+    return updates_path.with_name(updates_path.stem + ".archive.jsonl")
+
+
+def default_lock_path(ledger_path: Path) -> Path:
+    return ledger_path.with_name(ledger_path.stem + ".lock")
+
+
+class FileLock:
+    """
+    Reentrant lock shared by the threads of this process (RLock) and by
+    other processes (flock on `path`, held by the outermost acquire).
+    Without fcntl (Windows) it only serialises this process.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def __enter__(self) -> "FileLock":
+        self._rlock.acquire()
+        if self._depth == 0 and _FCNTL_AVAILABLE:
+            fd = None
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                if fd is not None:
+                    os.close(fd)
+                self._rlock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._rlock.release()
+
+
+def iter_lines_reverse(path: Path, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Yield the non-empty lines of a file from last to first, reading fixed-size
+    blocks backwards from EOF. Only the blocks that hold the yielded lines are
+    read, so taking the last N lines costs O(N), not O(file).
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        remainder = b""
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + remainder
+            lines = chunk.split(b"\n")
+            # First piece may be the tail of a line that starts in an earlier block
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if remainder.strip():
+            yield remainder
+
+
+class LedgerIndex:
+    """
+    Sidecar index for the JSONL ledger: analysis_hash -> (offset, length).
+
+    The JSONL file stays the source of truth; the index (SQLite, WAL mode) is
+    derived from it and can always be rebuilt. `indexed_bytes` records how far
+    the ledger has been indexed so lines appended by other writers are picked
+    up incrementally by sync().
+
+    Field updates (e.g. tx_id after broadcast) are appended to a separate
+    updates log instead of rewriting the ledger, folded into the `updates`
+    table and merged into records at read time. Each update line is hash
+    chained to the previous one (see ledger_chain.chain_update).
+    """
+
+    def __init__(
+        self,
+        ledger_path: str | Path,
+        index_path: str | Path | None = None,
+        updates_path: str | Path | None = None,
+        lock_path: str | Path | None = None,
+        on_shrink: Callable[[], object] | None = None,
+    ):
+        self.ledger_path = Path(ledger_path)
+        self.index_path = Path(index_path) if index_path else default_index_path(self.ledger_path)
+        self.updates_path = Path(updates_path) if updates_path else default_updates_path(self.ledger_path)
+        # With lock_path, writers in other processes are serialised too
+        self.lock: FileLock | threading.RLock = FileLock(lock_path) if lock_path else threading.RLock()
+        # Called when the ledger file shrank (rotated or rewritten by another writer)
+        self.on_shrink = on_shrink
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                analysis_hash TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS updates (
+                analysis_hash TEXT PRIMARY KEY,
+                fields TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta(key, value) VALUES ('indexed_bytes', 0);
+            INSERT OR IGNORE INTO meta(key, value) VALUES ('updates_bytes', 0);
+            """
+        )
+        self._conn.commit()
+
+    # ---- state ----
+
+    def _meta(self, key: str) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    @property
+    def indexed_bytes(self) -> int:
+        return self._meta("indexed_bytes")
+
+    @property
+    def updates_bytes(self) -> int:
+        return self._meta("updates_bytes")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    # ---- writes ----
+
+    def add(self, analysis_hash: str, offset: int, length: int) -> None:
+        """Index a line just appended at `offset`. First occurrence of a hash wins."""
+        with self.lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO records(analysis_hash, offset, length) VALUES (?, ?, ?)",
+                (analysis_hash, offset, length),
+            )
+            # Only advance the watermark if nothing was appended in between by
+            # another writer; otherwise sync() will catch up from the old mark.
+            self._conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'indexed_bytes' AND value = ?",
+                (offset + length, offset),
+            )
+            self._conn.commit()
+
+    def sync(self) -> int:
+        """Index any complete ledger/update lines past the watermarks. Returns ledger lines indexed."""
+        with self.lock:
+            n = self._sync_ledger()
+            self._sync_updates()
+            return n
+
+    def _sync_ledger(self) -> int:
+        with self.lock:
+            size = self.ledger_path.stat().st_size if self.ledger_path.exists() else 0
+            start = self.indexed_bytes
+            if size == start:
+                return 0
+            if size < start:
+                logger.warning("[INDEX] Ledger shrank (%d < %d), rebuilding index", size, start)
+                if self.on_shrink is not None:
+                    self.on_shrink()
+                return self.rebuild()
+
+            rows: list[tuple[str, int, int]] = []
+            pos = start
+            with open(self.ledger_path, "rb") as f:
+                f.seek(start)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partial write in progress
+                    if line.strip():
+                        h = json.loads(line).get("analysis_hash")
+                        if h:
+                            rows.append((h, pos, len(line)))
+                    pos += len(line)
+
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO records(analysis_hash, offset, length) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'indexed_bytes'", (pos,))
+            self._conn.commit()
+            return len(rows)
+
+    def _sync_updates(self) -> int:
+        with self.lock:
+            size = self.updates_path.stat().st_size if self.updates_path.exists() else 0
+            start = self.updates_bytes
+            if size < start:
+                self._conn.execute("DELETE FROM updates")
+                start = 0
+            if size == start:
+                self._conn.commit()
+                return 0
+
+            n = 0
+            pos = start
+            with open(self.updates_path, "rb") as f:
+                f.seek(start)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    if line.strip():
+                        h, fields = split_update(json.loads(line))
+                        if h and fields:
+                            self._merge_update(h, fields)
+                            n += 1
+                    pos += len(line)
+
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'updates_bytes'", (pos,))
+            self._conn.commit()
+            return n
+
+    def _merge_update(self, analysis_hash: str, fields: dict) -> None:
+        row = self._conn.execute(
+            "SELECT fields FROM updates WHERE analysis_hash = ?", (analysis_hash,)
+        ).fetchone()
+        merged = json.loads(row[0]) if row else {}
+        merged.update(fields)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO updates(analysis_hash, fields) VALUES (?, ?)",
+            (analysis_hash, json.dumps(merged, sort_keys=True)),
+        )
+
+    def add_update(self, analysis_hash: str, fields: dict) -> None:
+        """Append a field update for a record (crash-safe: one appended line)."""
+        self.add_updates({analysis_hash: fields})
+
+    def _chained_lines(self, lines: list[dict]) -> bytes:
+        """Link `lines` after the head of the updates chain (started here if needed)."""
+        head = read_updates_head(self.updates_path)
+        if head is None:
+            # First chained line: ledger entries up to ledger_seq predate the updates chain
+            marker = chain_update({"analysis_hash": "", "ledger_seq": read_chain_head(self.ledger_path)[1]}, GENESIS_HASH, 0)
+            lines = [marker, *lines]
+            prev, seq = GENESIS_HASH, -1
+        else:
+            prev, seq = head
+        out = []
+        for line in lines:
+            if "update_hash" not in line:
+                line = chain_update(line, prev, seq + 1)
+            prev, seq = line["update_hash"], line["update_seq"]
+            out.append((json.dumps(line, sort_keys=True, ensure_ascii=True) + "\n").encode("utf-8"))
+        return b"".join(out)
+
+    def start_updates_chain(self) -> None:
+        """Write the first chained line now, so later entries can never pass as legacy."""
+        with self.lock:
+            if read_updates_head(self.updates_path) is None:
+                self._append_updates({})
+
+    def add_updates(self, updates: dict[str, dict]) -> None:
+        """Append several field updates with one write and one index transaction."""
+        if not updates:
+            return
+        self._append_updates(updates)
+
+    def _append_updates(self, updates: dict[str, dict]) -> None:
+        with self.lock:
+            # Under the (file) lock: the chain head cannot move until we have appended
+            data = self._chained_lines([{"analysis_hash": h, **fields} for h, fields in updates.items()])
+            with open(self.updates_path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+            for h, fields in updates.items():
+                self._merge_update(h, fields)
+            self._conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'updates_bytes' AND value = ?",
+                (offset + len(data), offset),
+            )
+            self._conn.commit()
+
+    def clear_records(self) -> None:
+        """Forget all ledger offsets (the ledger file was moved away); updates are kept."""
+        with self.lock:
+            self._conn.execute("DELETE FROM records")
+            self._conn.execute("UPDATE meta SET value = 0 WHERE key = 'indexed_bytes'")
+            self._conn.commit()
+
+    def rebuild(self) -> int:
+        """Drop and rebuild the whole index from the ledger and updates files."""
+        with self.lock:
+            self._conn.execute("DELETE FROM records")
+            self._conn.execute("DELETE FROM updates")
+            self._conn.execute("UPDATE meta SET value = 0 WHERE key IN ('indexed_bytes', 'updates_bytes')")
+            self._conn.commit()
+            return self.sync()
+
+    # ---- reads ----
+
+    def lookup(self, analysis_hash: str) -> tuple[int, int] | None:
+        row = self._conn.execute(
+            "SELECT offset, length FROM records WHERE analysis_hash = ?", (analysis_hash,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def updates_for(self, analysis_hash: str) -> dict:
+        row = self._conn.execute(
+            "SELECT fields FROM updates WHERE analysis_hash = ?", (analysis_hash,)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def all_updates(self) -> dict[str, dict]:
+        rows = self._conn.execute("SELECT analysis_hash, fields FROM updates").fetchall()
+        return {h: json.loads(f) for h, f in rows}
+
+    def apply_updates(self, record: dict) -> dict:
+        """Merge pending field updates into a record read from the ledger."""
+        upd = self.updates_for(str(record.get("analysis_hash", "")))
+        if upd:
+            record.update(upd)
+        return record
+
+    @staticmethod
+    def _read_at(f, offset: int, length: int, analysis_hash: str) -> dict | None:
+        """Parse the line at an indexed offset; None if it no longer holds that record."""
+        f.seek(offset)
+        line = f.read(length)
+        try:
+            record = json.loads(line) if line.strip() else None
+        except ValueError:
+            record = None
+        if not isinstance(record, dict) or record.get("analysis_hash") != analysis_hash:
+            return None
+        return record
+
+    def read_record(self, analysis_hash: str) -> dict | None:
+        """Seek to the indexed line and parse only that record."""
+        loc = self.lookup(analysis_hash)
+        if loc is None:
+            return None
+        with open(self.ledger_path, "rb") as f:
+            record = self._read_at(f, loc[0], loc[1], analysis_hash)
+        if record is None:
+            # Ledger rewritten behind our back: fall back to a rebuild
+            logger.warning("[INDEX] Stale offset for %s, rebuilding", analysis_hash[:16])
+            self.rebuild()
+            loc = self.lookup(analysis_hash)
+            if loc is None:
+                return None
+            with open(self.ledger_path, "rb") as f:
+                record = self._read_at(f, loc[0], loc[1], analysis_hash)
+            if record is None:
+                return None
+        return self.apply_updates(record)
+
+    def _locate(self, hashes: list[str]) -> list[tuple[int, int, str]]:
+        locs: list[tuple[int, int, str]] = []
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT analysis_hash, offset, length FROM records "
+                f"WHERE analysis_hash IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            locs.extend((offset, length, h) for h, offset, length in rows)
+        locs.sort()
+        return locs
+
+    def read_records(self, hashes: list[str]) -> dict[str, dict]:
+        """
+        Bulk lookup: one indexed query, then a single forward pass over the
+        ledger reading the matching lines in offset order.
+        """
+        locs = self._locate(list(dict.fromkeys(hashes)))
+        out: dict[str, dict] = {}
+        if not locs:
+            return out
+        stale: list[str] = []
+        with open(self.ledger_path, "rb") as f:
+            for offset, length, h in locs:
+                record = self._read_at(f, offset, length, h)
+                if record is None:
+                    stale.append(h)
+                else:
+                    out[h] = self.apply_updates(record)
+        if stale:
+            # Same fallback as read_record(): one rebuild, then retry the misses
+            logger.warning("[INDEX] %d stale offsets, rebuilding", len(stale))
+            self.rebuild()
+            with open(self.ledger_path, "rb") as f:
+                for offset, length, h in self._locate(stale):
+                    record = self._read_at(f, offset, length, h)
+                    if record is not None:
+                        out[h] = self.apply_updates(record)
+        return out
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src import config
+
+    p = argparse.ArgumentParser(description="Build/migrate the sidecar index of a JSONL ledger")
+    p.add_argument("--ledger", default=str(config.LEDGER_PATH))
+    p.add_argument("--index", default=None)
+    p.add_argument("--compact", action="store_true", help="Fold pending updates into the ledger")
+    args = p.parse_args()
+
+    if args.compact:
+        from src.blockchain.adapter import LocalLedgerAdapter
+
+        n = LocalLedgerAdapter(args.ledger).compact()
+        print(f"Compacted {args.ledger}: {n} records updated")
+    else:
+        idx = LedgerIndex(args.ledger, args.index)
+        n = idx.rebuild()
+        print(f"Indexed {n} records from {args.ledger} -> {idx.index_path}")
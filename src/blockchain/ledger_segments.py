@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.blockchain.ledger_index import FileLock, LedgerIndex
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+_SEGMENT_NAME = re.compile(r"^(\d{6})\.jsonl$")
+
+
+def default_segments_dir(ledger_path: Path) -> Path:
+    return ledger_path.with_name(ledger_path.stem + ".segments")
+
+
+def read_manifest(ledger_path: Path) -> dict[str, Any]:
+    """Manifest of the sealed segments ({} if the ledger was never rotated)."""
+    path = default_segments_dir(ledger_path) / "manifest.json"
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_utc(ts: Any) -> datetime | None:
+    """ISO timestamp (or datetime) as an aware UTC datetime; None if missing or unparseable."""
+    if isinstance(ts, datetime):
+        return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+    if not isinstance(ts, str) or not ts:
+        return None
+    try:
+        t = datetime.fromisoformat(ts)
+    except ValueError:
+        return None
+    return t if t.tzinfo else t.replace(tzinfo=timezone.utc)
+
+
+def period_key(t: datetime, period: str) -> str:
+    """Rotation bucket of a timestamp: 'day' -> YYYY-MM-DD, 'month' -> YYYY-MM, '' -> no bucket."""
+    t = t.astimezone(timezone.utc)
+    if period == "day":
+        return t.strftime("%Y-%m-%d")
+    if period == "month":
+        return t.strftime("%Y-%m")
+    return ""
+
+
+# ======================================================================
+# BLOOM FILTER
+# ======================================================================
+
+class BloomFilter:
+    """
+    Bit-array Bloom filter over analysis hashes.
+
+    Keys are SHA-256 hex digests, i.e. already uniform, so the k bit positions
+    come straight from the key bytes (double hashing) instead of rehashing.
+    """
+
+    def __init__(self, n_bits: int, k: int, bits: bytes | bytearray | None = None):
+        self.n_bits = max(8, int(n_bits))
+        self.k = max(1, int(k))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.n_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n: int, fp_rate: float = 0.01) -> "BloomFilter":
+        n = max(1, n)
+        n_bits = math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))
+        k = max(1, round(n_bits / n * math.log(2)))
+        return cls(n_bits, k)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        try:
+            digest = bytes.fromhex(key)
+        except ValueError:
+            digest = b""
+        if len(digest) < 16:
+            digest = hashlib.sha256(key.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.n_bits
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+# ======================================================================
+# SEGMENTS
+# ======================================================================
+
+class LedgerSegments:
+    """
+    Sealed, immutable segments of the evidence ledger.
+
+    The active segment is the ledger file itself (config.LEDGER_PATH). When it
+    grows past a size limit or a new day/month starts, it is moved to
+    <stem>.segments/NNNNNN.jsonl and described in manifest.json: record count,
+    chain_seq and analysis_hash ranges, timestamp_utc bounds, SHA-256 of the
+    file and a Bloom filter of its hashes (NNNNNN.bloom). Lookups consult the
+    manifest first and only open the segments that can hold the answer; each
+    sealed segment keeps its own sidecar index.
+
+    Field updates stay in the single updates log of the active ledger, so
+    sealed segments are only rewritten by compaction.
+    """
+
+    def __init__(self, ledger_path: str | Path, fp_rate: float = 0.01):
+        self.ledger_path = Path(ledger_path)
+        self.dir = default_segments_dir(self.ledger_path)
+        self.manifest_path = self.dir / "manifest.json"
+        self.fp_rate = fp_rate
+        # Manifest writers in other processes (rotation, compaction) are serialised too
+        self.lock = FileLock(self.ledger_path.with_name(self.ledger_path.stem + ".segments.lock"))
+        self._reload_lock = threading.Lock()
+        self._manifest_stat: tuple[int, int] | None = None
+        self.manifest: dict[str, Any] = self._load()
+        self._indexes: dict[str, LedgerIndex] = {}
+        self._blooms: dict[str, BloomFilter] = {}
+        self._stale: set[str] = set()  # segments rewritten since their sidecar index was built
+        with self.lock:
+            self._recover()
+
+    # ---- manifest ----
+
+    @property
+    def segments(self) -> list[dict[str, Any]]:
+        return self.manifest["segments"]
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def path(self, seg: dict[str, Any] | str) -> Path:
+        return self.dir / (seg if isinstance(seg, str) else seg["name"])
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            st = self.manifest_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self) -> dict[str, Any]:
+        self._manifest_stat = self._stat()
+        return read_manifest(self.ledger_path) or {"version": MANIFEST_VERSION, "segments": []}
+
+    @property
+    def version(self) -> tuple[int, int] | None:
+        """Changes whenever the manifest we hold changes (mtime_ns, size of manifest.json)."""
+        return self._manifest_stat
+
+    def reload(self) -> bool:
+        """
+        Re-read manifest.json if another adapter or process changed it since
+        we last read or wrote it (one stat() otherwise). Returns True if reloaded.
+        """
+        if self._stat() == self._manifest_stat:
+            return False
+        with self._reload_lock:
+            if self._stat() == self._manifest_stat:
+                return False
+            old = {seg["name"]: seg.get("sha256") for seg in self.segments}
+            self.manifest = self._load()
+            for seg in self.segments:
+                name = seg["name"]
+                if name in old and old[name] != seg.get("sha256"):
+                    # Rewritten by a compaction elsewhere: its sidecar index is stale
+                    # (dropped, not closed: another thread may still be reading it)
+                    self._blooms.pop(name, None)
+                    self._indexes.pop(name, None)
+                    self._stale.add(name)
+        logger.info("[SEGMENTS] Manifest changed on disk, reloaded (%d segments)", len(self.segments))
+        return True
+
+    def _save(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+        self._manifest_stat = self._stat()
+
+    def _recover(self) -> None:
+        """Describe segments moved into place by a rotation that crashed before saving the manifest."""
+        if not self.dir.exists():
+            return
+        known = {seg["name"] for seg in self.segments}
+        orphans = sorted(p for p in self.dir.iterdir() if _SEGMENT_NAME.match(p.name) and p.name not in known)
+        for path in orphans:
+            logger.warning("[SEGMENTS] Recovering unlisted segment %s", path.name)
+            seg, _ = self._describe(path, set())
+            self.segments.append(seg)
+        if orphans:
+            self.segments.sort(key=lambda s: s["name"])
+            self._save()
+
+    def active_opened(self) -> datetime | None:
+        return parse_utc(self.manifest.get("active_opened_utc"))
+
+    # ---- sealing ----
+
+    def _next_name(self) -> str:
+        used = [int(m.group(1)) for seg in self.segments if (m := _SEGMENT_NAME.match(seg["name"]))]
+        return f"{max(used, default=0) + 1:06d}.jsonl"
+
+    def _describe(self, path: Path, cp_hashes: set[str]) -> tuple[dict[str, Any], dict[str, int]]:
+        """One pass over a segment: manifest entry, Bloom filter and offsets of checkpointed entries."""
+        hashes: list[str] = []
+        seqs: list[int] = []
+        first_entry = last_entry = None
+        ts_min = ts_max = None
+        cp_offsets: dict[str, int] = {}
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            for line in f:
+                digest.update(line)
+                pos, size = size, size + len(line)
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("analysis_hash"):
+                    hashes.append(record["analysis_hash"])
+                if "entry_hash" in record:
+                    first_entry = first_entry or record["entry_hash"]
+                    last_entry = record["entry_hash"]
+                    seqs.append(int(record["chain_seq"]))
+                    if record["entry_hash"] in cp_hashes:
+                        cp_offsets[record["entry_hash"]] = pos
+                t = parse_utc(record.get("timestamp_utc"))
+                if t is not None:
+                    ts_min = t if ts_min is None or t < ts_min else ts_min
+                    ts_max = t if ts_max is None or t > ts_max else ts_max
+
+        bloom = BloomFilter.for_capacity(len(hashes), self.fp_rate)
+        for h in hashes:
+            bloom.add(h)
+        bloom_path = path.with_suffix(".bloom")
+        bloom_path.write_bytes(bytes(bloom.bits))
+        self._blooms[path.name] = bloom
+
+        seg = {
+            "name": path.name,
+            "records": len(hashes),
+            "bytes": size,
+            "sha256": digest.hexdigest(),
+            "seq_first": seqs[0] if seqs else None,
+            "seq_last": seqs[-1] if seqs else None,
+            "first_entry_hash": first_entry,
+            "last_entry_hash": last_entry,
+            "hash_min": min(hashes) if hashes else None,
+            "hash_max": max(hashes) if hashes else None,
+            "ts_min": ts_min.isoformat() if ts_min else None,
+            "ts_max": ts_max.isoformat() if ts_max else None,
+            "bloom": {"file": bloom_path.name, "bits": bloom.n_bits, "k": bloom.k},
+            "sealed_utc": datetime.now(timezone.utc).isoformat(),
+        }
+        return seg, cp_offsets
+
+    def seal(self, active_path: Path, cp_hashes: set[str] | None = None) -> tuple[dict[str, Any], dict[str, int]]:
+        """
+        Move the active ledger file into the segment directory and list it in
+        the manifest. Returns (segment entry, {entry_hash: offset}) for the
+        checkpointed entries it contains. Caller holds the ledger write lock.
+        """
+        with self.lock:
+            self.reload()  # segment names and entries sealed by other processes
+            self.dir.mkdir(parents=True, exist_ok=True)
+            with open(active_path, "rb+") as f:
+                os.fsync(f.fileno())
+            path = self.dir / self._next_name()
+            os.replace(active_path, path)
+            seg, cp_offsets = self._describe(path, cp_hashes or set())
+            self.index(seg)  # build the sidecar index now, not on the first lookup
+            self.segments.append(seg)
+            self.manifest["active_opened_utc"] = datetime.now(timezone.utc).isoformat()
+            self._save()
+        logger.info("[SEGMENTS] Sealed %s (%d records, %d bytes)", seg["name"], seg["records"], seg["bytes"])
+        return seg, cp_offsets
+
+    def refresh(self, name: str) -> None:
+        """Re-describe a segment rewritten by compaction (same records, new bytes)."""
+        with self.lock:
+            self.reload()
+            i = next(i for i, seg in enumerate(self.segments) if seg["name"] == name)
+            seg, _ = self._describe(self.path(name), set())
+            seg["sealed_utc"] = self.segments[i]["sealed_utc"]
+            self.segments[i] = seg
+            self._save()
+            # Rebuild the sidecar index now, also for readers that open it later
+            self._stale.add(name)
+            self._indexes.pop(name, None)
+            self.index(name)
+
+    def set_active_opened(self, t: datetime) -> None:
+        with self.lock:
+            self.reload()
+            self.manifest["active_opened_utc"] = t.isoformat()
+            if self.segments:
+                self._save()
+
+    # ---- per-segment structures ----
+
+    def index(self, seg: dict[str, Any] | str) -> LedgerIndex:
+        name = seg if isinstance(seg, str) else seg["name"]
+        idx = self._indexes.get(name)
+        if idx is None:
+            with self.lock:
+                idx = self._indexes.get(name)
+                if idx is None:
+                    idx = LedgerIndex(self.path(name))
+                    if name in self._stale:
+                        idx.rebuild()
+                        self._stale.discard(name)
+                    else:
+                        idx.sync()
+                    self._indexes[name] = idx
+        return idx
+
+    def bloom(self, seg: dict[str, Any]) -> BloomFilter | None:
+        bloom = self._blooms.get(seg["name"])
+        if bloom is None:
+            meta = seg.get("bloom") or {}
+            path = self.dir / meta.get("file", "")
+            if not meta or not path.is_file():
+                return None
+            bloom = BloomFilter(meta["bits"], meta["k"], path.read_bytes())
+            self._blooms[seg["name"]] = bloom
+        return bloom
+
+    # ---- pruning ----
+
+    def may_contain(self, seg: dict[str, Any], analysis_hash: str) -> bool:
+        """Manifest-only check: hash range, then Bloom filter. False means certainly absent."""
+        if not seg.get("records"):
+            return False
+        if seg.get("hash_min") and not seg["hash_min"] <= analysis_hash <= seg["hash_max"]:
+            return False
+        bloom = self.bloom(seg)
+        return bloom is None or analysis_hash in bloom
+
+    def overlapping(
+        self,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+    ) -> list[dict[str, Any]]:
+        """Segments (oldest first) whose timestamp_utc bounds intersect [since, until]."""
+        lo, hi = parse_utc(since), parse_utc(until)
+        if lo is None and hi is None:
+            return list(self.segments)
+        out = []
+        for seg in self.segments:
+            ts_min, ts_max = parse_utc(seg.get("ts_min")), parse_utc(seg.get("ts_max"))
+            if ts_min is None:
+                continue  # no timestamped records: nothing can match a time filter
+            if (hi is not None and ts_min > hi) or (lo is not None and ts_max < lo):
+                continue
+            out.append(seg)
+        return out
+
+    # ---- reads ----
+
+    def read_record(self, analysis_hash: str) -> dict[str, Any] | None:
+        """Newest segment first; only segments passing may_contain() are opened."""
+        for seg in reversed(self.segments):
+            if self.may_contain(seg, analysis_hash):
+                record = self.index(seg).read_record(analysis_hash)
+                if record is not None:
+                    return record
+        return None
+
+    def read_records(self, hashes: list[str]) -> dict[str, dict[str, Any]]:
+        """Bulk variant: hashes are grouped per candidate segment, one indexed pass each."""
+        out: dict[str, dict[str, Any]] = {}
+        remaining = list(dict.fromkeys(hashes))
+        for seg in reversed(self.segments):
+            if not remaining:
+                break
+            candidates = [h for h in remaining if self.may_contain(seg, h)]
+            if not candidates:
+                continue
+            found = self.index(seg).read_records(candidates)
+            out.update(found)
+            remaining = [h for h in remaining if h not in found]
+        return out
+
+    def close(self) -> None:
+        for idx in self._indexes.values():
+            idx.close()
+        self._indexes.clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src import config
+
+    p = argparse.ArgumentParser(description="Inspect or rotate the segmented evidence ledger")
+    p.add_argument("--ledger", default=str(config.LEDGER_PATH))
+    p.add_argument("--rotate", action="store_true", help="seal the active segment now")
+    p.add_argument("--compact", action="store_true", help="fold pending updates into all segments")
+    args = p.parse_args()
+
+    from src.blockchain.adapter import LocalLedgerAdapter
+
+    adapter = LocalLedgerAdapter(args.ledger)
+    if args.rotate:
+        seg = adapter.rotate()
+        print("Sealed:", seg["name"] if seg else "nothing to seal")
+    if args.compact:
+        print("Compacted:", adapter.compact(), "records updated")
+    print(json.dumps([{k: v for k, v in s.items() if k != "bloom"} for s in adapter.segments.segments], indent=2))
@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from src import config
+from src.blockchain.ledger_chain import default_checkpoints_path, read_chain_head
+from src.blockchain.ledger_index import default_updates_archive_path
+from src.blockchain.ledger_segments import default_segments_dir
+from src.storage.blob_store import default_blob_dir
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "evidence-snapshot"
+SNAPSHOT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Files that only ever grow: incremental snapshots ship just the new tail
+APPEND_ONLY_KINDS = frozenset({"ledger", "updates", "checkpoints"})
+# Content-addressed: same name => same bytes, never re-hashed against a base
+IMMUTABLE_KINDS = frozenset({"blob"})
+CHUNK = 1024 * 1024
+
+
+def default_state_path(ledger_path: Path) -> Path:
+    """Last snapshot imported into this store (incrementals must build on it)."""
+    return ledger_path.with_name(ledger_path.stem + ".snapshot.json")
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_range(f: BinaryIO, start: int, length: int, digest: Any = None) -> Any:
+    digest = digest or hashlib.sha256()
+    f.seek(start)
+    left = length
+    while left > 0:
+        chunk = f.read(min(CHUNK, left))
+        if not chunk:
+            raise IOError(f"{getattr(f, 'name', 'file')} shorter than expected")
+        digest.update(chunk)
+        left -= len(chunk)
+    return digest
+
+
+def _backup_sqlite(src: Path, dst: Path) -> None:
+    """Consistent copy of a live SQLite database (online backup API, WAL included)."""
+    source = sqlite3.connect(str(src))
+    target = sqlite3.connect(str(dst))
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+# ======================================================================
+# EXPORT
+# ======================================================================
+
+def _freeze(ledger: Any, utxo_db_path: Path | None, tmp: Path) -> tuple[list[dict[str, Any]], tuple[str, int]]:
+    """
+    Pin the store under the ledger write lock. SQLite files are copied with
+    the backup API, append-only logs are cut at their current size and every
+    other ledger file is opened: an open handle keeps reading the same inode
+    even if a rotation or compaction replaces the path afterwards.
+    Returns the sources ({path, kind, size, file}) and the chain head.
+    """
+    root = ledger.ledger_path.parent
+    sources: list[dict[str, Any]] = []
+
+    def add(path: Path, kind: str, member: str | None = None) -> None:
+        f = open(path, "rb")
+        sources.append({
+            "path": member or "ledger/" + path.relative_to(root).as_posix(),
+            "kind": kind,
+            "size": os.fstat(f.fileno()).st_size,
+            "file": f,
+        })
+
+    def add_db(db: Path, member: str) -> None:
+        copy = tmp / f"{len(sources):06d}.sqlite"
+        _backup_sqlite(db, copy)
+        add(copy, "index" if member.startswith("ledger/") else "utxo", member)
+
+    def ledger_member(path: Path) -> str:
+        return "ledger/" + path.relative_to(root).as_posix()
+
+    with ledger._index.lock:
+        ledger._index.sync()
+        ledger._catalog.sync(ledger._index.updates_path)
+        ledger.segments.reload()  # segments sealed by other processes since the adapter opened
+        head = read_chain_head(ledger.ledger_path)
+
+        add_db(ledger._index.index_path, ledger_member(ledger._index.index_path))
+        add_db(ledger._catalog.catalog_path, ledger_member(ledger._catalog.catalog_path))
+        for path, kind in (
+            (ledger.ledger_path, "ledger"),
+            (ledger._index.updates_path, "updates"),
+            (default_updates_archive_path(ledger._index.updates_path), "updates"),
+            (default_checkpoints_path(ledger.ledger_path), "checkpoints"),
+        ):
+            if path.exists():
+                add(path, kind)
+
+        segments = ledger.segments
+        if segments.manifest_path.exists():
+            add(segments.manifest_path, "segments")
+        for seg in segments.segments:
+            add(segments.path(seg), "segment")
+            bloom = segments.path(seg).with_suffix(".bloom")
+            if bloom.exists():
+                add(bloom, "segment")
+            idx = segments.index(seg)
+            add_db(idx.index_path, ledger_member(idx.index_path))
+
+        if utxo_db_path is not None and utxo_db_path.exists():
+            add_db(utxo_db_path, "utxo/utxos.sqlite")
+
+    # Blobs are written before their ledger line and never change: no lock needed
+    blob_root = ledger.blobs.root
+    for path in sorted(blob_root.rglob("*")):
+        if path.is_file() and not path.name.startswith("."):
+            immutable = len(path.parent.name) == 2 and path.parent.parent == blob_root
+            add(path, "blob" if immutable else "blob_meta")
+    return sources, head
+
+
+def read_snapshot_manifest(path: str | Path) -> dict[str, Any]:
+    """Manifest of a snapshot: from its .manifest.json sidecar, a manifest file, or the archive itself."""
+    path = Path(path)
+    sidecar = path.with_name(path.name + ".manifest.json")
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+    if sidecar.exists():
+        return json.loads(sidecar.read_text(encoding="utf-8"))
+    with tarfile.open(path, "r:gz") as tar:
+        first = tar.next()
+        if first is None or first.name != MANIFEST_NAME:
+            raise ValueError(f"{path}: not an evidence snapshot (no leading {MANIFEST_NAME})")
+        return json.load(tar.extractfile(first))
+
+
+def export_snapshot(
+    out_path: str | Path,
+    ledger_path: str | Path | None = None,
+    utxo_db_path: str | Path | None = None,
+    base: str | Path | None = None,
+    adapter: Any = None,
+    compresslevel: int = 6,
+    with_utxos: bool = False,
+) -> dict[str, Any]:
+    """
+    Pack the evidence store into one .tar.gz: active ledger, updates log
+    (with the verification cache), checkpoints, sealed segments with their
+    Bloom filters, primary/segment indexes, catalog and payload blobs, plus
+    the UTXO set if `with_utxos`. manifest.json (first member) lists every
+    file with size and SHA-256; <out>.sha256 and <out>.manifest.json are
+    written alongside.
+
+    With `base` (an earlier snapshot or its manifest) the snapshot is
+    incremental: files unchanged since the base are only listed, append-only
+    logs carry just the bytes added since, and files gone since are listed
+    as removed. Returns the manifest.
+    """
+    from src.blockchain.adapter import LocalLedgerAdapter
+
+    t0 = time.perf_counter()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    ledger = adapter or LocalLedgerAdapter(ledger_path)
+    utxo_db = Path(utxo_db_path) if utxo_db_path else Path(config.UTXO_DB_PATH)
+    base_manifest = read_snapshot_manifest(base) if base else None
+    base_files = {f["path"]: f for f in base_manifest["files"]} if base_manifest else {}
+
+    tmp = Path(tempfile.mkdtemp(prefix=".snapshot-", dir=out_path.parent))
+    sources: list[dict[str, Any]] = []
+    try:
+        sources, (head_hash, head_seq) = _freeze(ledger, utxo_db if with_utxos else None, tmp)
+
+        entries: list[dict[str, Any]] = []
+        for src in sources:
+            f, size, prev = src["file"], src["size"], base_files.get(src["path"])
+            entry = {"path": src["path"], "kind": src["kind"], "size": size}
+            if prev and src["kind"] in IMMUTABLE_KINDS and prev["size"] == size:
+                entries.append({**entry, "sha256": prev["sha256"], "store": "base"})
+                continue
+            if prev and src["kind"] in APPEND_ONLY_KINDS and prev["size"] <= size:
+                digest = _hash_range(f, 0, prev["size"])
+                prefix_ok = digest.hexdigest() == prev["sha256"]
+                entry["sha256"] = _hash_range(f, prev["size"], size - prev["size"], digest).hexdigest()
+            else:
+                prefix_ok = False
+                entry["sha256"] = _hash_range(f, 0, size).hexdigest()
+
+            if prev and entry["sha256"] == prev["sha256"]:
+                entry["store"] = "base"
+            elif prefix_ok:
+                entry.update(
+                    store="append",
+                    offset=prev["size"],
+                    base_sha256=prev["sha256"],
+                    delta_sha256=_hash_range(f, prev["size"], size - prev["size"]).hexdigest(),
+                )
+            else:
+                entry["store"] = "full"
+            entries.append(entry)
+
+        present = {e["path"] for e in entries}
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "id": f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{uuid.uuid4().hex[:8]}",
+            "created_utc": datetime.now(timezone.utc).isoformat(),
+            "base": {"id": base_manifest["id"]} if base_manifest else None,
+            "ledger_stem": ledger.ledger_path.stem,
+            "chain_head": {"entry_hash": head_hash, "chain_seq": head_seq},
+            "files": entries,
+            # A UTXO set left out of this export is not removed on import
+            "removed": sorted(p for p in base_files if p not in present and (with_utxos or not _is_utxo(p))),
+        }
+        manifest_bytes = json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8")
+
+        partial = out_path.with_name(out_path.name + ".part")
+        by_path = {s["path"]: s for s in sources}
+        with tarfile.open(partial, "w:gz", compresslevel=compresslevel) as tar:
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size, info.mtime = len(manifest_bytes), int(time.time())
+            tar.addfile(info, io.BytesIO(manifest_bytes))
+            for entry in entries:
+                if entry["store"] == "base":
+                    continue
+                f = by_path[entry["path"]]["file"]
+                start = entry.get("offset", 0)
+                f.seek(start)
+                info = tarfile.TarInfo(entry["path"])
+                info.size, info.mtime = entry["size"] - start, int(time.time())
+                tar.addfile(info, f)
+        os.replace(partial, out_path)
+
+        archive_sha = _sha256_file(out_path)
+        out_path.with_name(out_path.name + ".sha256").write_text(f"{archive_sha}  {out_path.name}\n", encoding="utf-8")
+        out_path.with_name(out_path.name + ".manifest.json").write_bytes(manifest_bytes)
+    finally:
+        for src in sources:
+            src["file"].close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    shipped = [e for e in entries if e["store"] != "base"]
+    logger.info(
+        "[SNAPSHOT] %s: %d files (%d shipped, %d from base) in %.2fs",
+        out_path.name, len(entries), len(shipped), len(entries) - len(shipped), time.perf_counter() - t0,
+    )
+    return manifest
+
+
+# ======================================================================
+# IMPORT
+# ======================================================================
+
+def _is_utxo(member: str) -> bool:
+    return member.startswith("utxo/")
+
+
+def _store_paths(ledger_path: Path, utxo_db: Path | None) -> list[Path]:
+    """Everything an import may replace (SQLite side files included)."""
+    paths = [ledger_path, default_checkpoints_path(ledger_path), default_state_path(ledger_path)]
+    for suffix in (".updates.jsonl", ".updates.archive.jsonl", ".idx.sqlite", ".catalog.sqlite"):
+        paths.append(ledger_path.with_name(ledger_path.stem + suffix))
+    if utxo_db is not None:
+        paths.append(utxo_db)
+    return [p.with_name(p.name + side) for p in paths for side in ("", "-wal", "-shm")]
+
+
+def import_snapshot(
+    archive: str | Path,
+    ledger_path: str | Path | None = None,
+    utxo_db_path: str | Path | None = None,
+    overwrite: bool = False,
+    with_utxos: bool = False,
+    reset_reservations: bool = False,
+) -> dict[str, Any]:
+    """
+    Restore a snapshot into this node's store. Every file is staged and
+    checked against the manifest (size + SHA-256) before anything is
+    replaced; the archive is checked against its .sha256 sidecar first and
+    the chain head against the manifest at the end.
+
+    A full snapshot refuses to replace a non-empty store unless `overwrite`.
+    An incremental one applies only on top of the snapshot it was made
+    from, and only if the append-only logs have not diverged since.
+    Run it before the node starts: open adapters keep their old handles.
+
+    A UTXO set in the archive is only restored with `with_utxos`, on a node
+    that takes over broadcasting from the exporter (two nodes spending the
+    same coins will conflict). Coins the exporter had reserved stay reserved
+    unless `reset_reservations`: their txs may still be in flight.
+    """
+    t0 = time.perf_counter()
+    archive = Path(archive)
+    ledger_path = Path(ledger_path) if ledger_path else Path(config.LEDGER_PATH)
+    utxo_db = Path(utxo_db_path) if utxo_db_path else Path(config.UTXO_DB_PATH)
+    root = ledger_path.parent
+    root.mkdir(parents=True, exist_ok=True)
+
+    sidecar = archive.with_name(archive.name + ".sha256")
+    if sidecar.exists():
+        expected = sidecar.read_text(encoding="utf-8").split()[0]
+        if _sha256_file(archive) != expected:
+            raise ValueError(f"{archive}: checksum mismatch with {sidecar.name}")
+
+    state_path = default_state_path(ledger_path)
+    state = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else None
+
+    with tarfile.open(archive, "r:gz") as tar:
+        first = tar.next()
+        if first is None or first.name != MANIFEST_NAME:
+            raise ValueError(f"{archive}: not an evidence snapshot (no leading {MANIFEST_NAME})")
+        manifest = json.load(tar.extractfile(first))
+        if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{archive}: unsupported snapshot {manifest.get('format')} v{manifest.get('version')}")
+
+        if manifest["base"]:
+            if not state or state.get("id") != manifest["base"]["id"]:
+                raise ValueError(
+                    f"Incremental snapshot on top of {manifest['base']['id']}, "
+                    f"this store is at {state.get('id') if state else 'no snapshot'}"
+                )
+        elif not overwrite and (
+            (ledger_path.exists() and ledger_path.stat().st_size > 0) or default_segments_dir(ledger_path).exists()
+        ):
+            raise FileExistsError(f"{ledger_path} already has evidence; pass overwrite=True to replace it")
+
+        old_stem, new_stem = manifest["ledger_stem"], ledger_path.stem
+
+        def target(member: str) -> Path:
+            if member == "utxo/utxos.sqlite":
+                return utxo_db
+            kind, _, rel = member.partition("/")
+            parts = Path(rel).parts
+            if kind != "ledger" or not parts or ".." in parts or Path(rel).is_absolute():
+                raise ValueError(f"Unsafe path in snapshot: {member}")
+            head = parts[0]
+            if head.startswith(old_stem + "."):
+                head = new_stem + head[len(old_stem):]
+            return root.joinpath(head, *parts[1:])
+
+        entries = {e["path"]: e for e in manifest["files"]}
+        for e in entries.values():
+            target(e["path"])  # reject unsafe names before touching the disk
+        # Entries this import applies (the UTXO set is opt-in)
+        applies = {name: e for name, e in entries.items() if with_utxos or not _is_utxo(name)}
+
+        staging = root / f".{new_stem}.snapshot-staging"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        try:
+            staged: dict[str, Path] = {}
+            for member in tar:
+                if member.offset == first.offset:
+                    continue
+                entry = entries.get(member.name)
+                if entry is None or not member.isfile() or entry["store"] == "base" or member.name in staged:
+                    raise ValueError(f"{archive}: unexpected member {member.name}")
+                dst = staging / f"{len(staged):06d}"
+                digest = hashlib.sha256()
+                src = tar.extractfile(member)
+                with open(dst, "wb") as out:
+                    while chunk := src.read(CHUNK):
+                        digest.update(chunk)
+                        out.write(chunk)
+                want = entry["delta_sha256"] if entry["store"] == "append" else entry["sha256"]
+                if digest.hexdigest() != want or member.size != entry["size"] - entry.get("offset", 0):
+                    raise ValueError(f"{archive}: checksum mismatch for {member.name}")
+                staged[member.name] = dst
+
+            for e in entries.values():
+                if e["store"] != "base" and e["path"] not in staged:
+                    raise ValueError(f"{archive}: missing member {e['path']}")
+                if e["path"] not in applies:
+                    continue
+                if e["store"] == "base":
+                    path = target(e["path"])
+                    if not path.exists() or path.stat().st_size != e["size"]:
+                        raise ValueError(f"{path} does not match the base snapshot")
+                if e["store"] == "append":
+                    path = target(e["path"])
+                    if not path.exists() or path.stat().st_size != e["offset"]:
+                        raise ValueError(f"{path} diverged from the base snapshot")
+                    with open(path, "rb") as f:
+                        if _hash_range(f, 0, e["offset"]).hexdigest() != e["base_sha256"]:
+                            raise ValueError(f"{path} diverged from the base snapshot")
+
+            # ---- everything verified: swap it in ----
+            if not manifest["base"]:
+                for path in _store_paths(ledger_path, utxo_db if with_utxos else None):
+                    path.unlink(missing_ok=True)
+                shutil.rmtree(default_segments_dir(ledger_path), ignore_errors=True)
+                shutil.rmtree(default_blob_dir(ledger_path), ignore_errors=True)
+            for name, src in staged.items():
+                if name not in applies:
+                    continue
+                e, path = entries[name], target(name)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if e["store"] == "append":
+                    with open(path, "ab") as out, open(src, "rb") as f:
+                        shutil.copyfileobj(f, out, CHUNK)
+                else:
+                    # A stale WAL would be replayed into the new database
+                    for side in ("-wal", "-shm"):
+                        path.with_name(path.name + side).unlink(missing_ok=True)
+                    os.replace(src, path)
+            for name in manifest.get("removed", []):
+                if with_utxos or not _is_utxo(name):
+                    target(name).unlink(missing_ok=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    if reset_reservations and utxo_db.exists() and "utxo/utxos.sqlite" in applies:
+        # Explicitly asked: the exporter's in-flight txs are known to be dead
+        conn = sqlite3.connect(str(utxo_db))
+        conn.execute("UPDATE utxos SET status = 'available' WHERE status = 'reserved'")
+        conn.commit()
+        conn.close()
+
+    head_hash, head_seq = read_chain_head(ledger_path)
+    expected = manifest["chain_head"]
+    if (head_hash, head_seq) != (expected["entry_hash"], expected["chain_seq"]):
+        raise ValueError(f"Chain head after import {head_hash[:16]}#{head_seq} does not match the snapshot")
+
+    state_path.write_text(
+        json.dumps({"id": manifest["id"], "imported_utc": datetime.now(timezone.utc).isoformat()}, indent=1),
+        encoding="utf-8",
+    )
+    elapsed = time.perf_counter() - t0
+    logger.info("[SNAPSHOT] Imported %s (%d files) in %.2fs", manifest["id"], len(entries), elapsed)
+    return {
+        "id": manifest["id"],
+        "base": manifest["base"],
+        "files": len(entries),
+        "applied": sum(1 for name in staged if name in applies),
+        "utxos": "utxo/utxos.sqlite" in applies,
+        "chain_head": expected,
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Export/import snapshots of the evidence store")
+    p.add_argument("--ledger", default=str(config.LEDGER_PATH))
+    p.add_argument("--utxo-db", default=str(config.UTXO_DB_PATH))
+    g = p.add_mutually_exclusive_group(required=True)
+    g.add_argument("--export", metavar="ARCHIVE", help="write a snapshot (.tar.gz)")
+    g.add_argument("--import", dest="import_", metavar="ARCHIVE", help="restore a snapshot")
+    p.add_argument("--base", default=None, help="earlier snapshot: export only what changed since")
+    p.add_argument("--overwrite", action="store_true", help="replace a non-empty store on full import")
+    p.add_argument("--with-utxos", action="store_true", help="include (export) or restore (import) the UTXO set")
+    p.add_argument(
+        "--reset-reservations", action="store_true",
+        help="on import with --with-utxos, make coins the exporter had reserved available again",
+    )
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.export:
+        m = export_snapshot(args.export, args.ledger, args.utxo_db, base=args.base, with_utxos=args.with_utxos)
+        shipped = sum(1 for e in m["files"] if e["store"] != "base")
+        print(f"Snapshot {m['id']}: {len(m['files'])} files, {shipped} shipped -> {args.export}")
+    else:
+        result = import_snapshot(
+            args.import_, args.ledger, args.utxo_db, overwrite=args.overwrite,
+            with_utxos=args.with_utxos, reset_reservations=args.reset_reservations,
+        )
+        print(json.dumps(result, indent=2))
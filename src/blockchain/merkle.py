@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import hashlib
+
+# Domain separation (RFC 6962 style) so a leaf can never be passed off as an
+# inner node. Odd nodes are promoted unchanged instead of duplicated.
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def _leaf(analysis_hash: str) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(analysis_hash)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(leaves: list[str]) -> list[list[bytes]]:
+    """All tree levels, from hashed leaves (level 0) up to the root."""
+    if not leaves:
+        raise ValueError("Merkle tree needs at least one leaf")
+    level = [_leaf(h) for h in leaves]
+    levels = [level]
+    while len(level) > 1:
+        nxt = [_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+        levels.append(level)
+    return levels
+
+
+def merkle_root(leaves: list[str]) -> str:
+    return build_levels(leaves)[-1][0].hex()
+
+
+def merkle_proof(levels: list[list[bytes]], index: int) -> list[list[str]]:
+    """
+    Inclusion proof for leaf `index` as [[side, sibling_hex], ...], bottom-up.
+    side is "L" when the sibling goes on the left of the running hash.
+    """
+    proof: list[list[str]] = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(["L" if sibling < index else "R", level[sibling].hex()])
+        index //= 2
+    return proof
+
+
+def verify_proof(analysis_hash: str, proof: list[list[str]], root: str) -> bool:
+    try:
+        h = _leaf(analysis_hash)
+        for side, sibling_hex in proof:
+            sibling = bytes.fromhex(sibling_hex)
+            h = _node(sibling, h) if side == "L" else _node(h, sibling)
+    except (ValueError, TypeError):
+        return False
+    return h.hex() == root
@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from typing import Any
 
+from src.blockchain.adapter import get_blockchain_adapter
 from src.blockchain.hashing import hash_bundle
-from src.blockchain.bsv_client import register_on_chain
 
 
 def register_evidence(bundle: dict[str, Any]) -> dict[str, Any]:
@@ -11,6 +11,9 @@ def register_evidence(bundle: dict[str, Any]) -> dict[str, Any]:
     Always works:
     - computes hash + timestamp (local evidence)
     - tries on-chain (optional). Never crashes.
+    Idempotent: the key is the content hash of the bundle, so registering the
+    same bundle again returns the stored evidence and tx status (indexed
+    ledger lookup) instead of building a new transaction.
     Returns:
       {
         "evidence": {...},
@@ -25,8 +28,20 @@ def register_evidence(bundle: dict[str, Any]) -> dict[str, Any]:
         "scene_id": bundle.get("scene_id", "unknown"),
         "model_version": bundle.get("model_version", "MyE_v1"),
     }
+    if bundle.get("image_hash"):
+        evidence_record["image_hash"] = bundle["image_hash"]
 
-    chain = register_on_chain(evidence_record)
+    try:
+        chain = get_blockchain_adapter().register({
+            **evidence_record,
+            "analysis_payload": {k: v for k, v in bundle.items() if k != "evidence"},
+        })
+    except Exception as ex:
+        chain = {"status": "failed", "error": str(ex)}
+
+    if chain.get("duplicate") and chain.get("timestamp_utc"):
+        # Keep the original registration time, not this call's
+        evidence_record["timestamp_utc"] = chain["timestamp_utc"]
 
     return {
         "evidence": evidence_record,
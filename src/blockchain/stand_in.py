@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+_B58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_EF_MARKER = b"\x00\x00\x00\x00\x00\xef"
+
+
+# ======================================================================
+# TX ENCODING (stdlib only: enough to fund, parse and index P2PKH/OP_RETURN)
+# ======================================================================
+
+def _sha256d(b: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(b).digest()).digest()
+
+
+def _varint(n: int) -> bytes:
+    if n < 0xFD:
+        return bytes([n])
+    if n <= 0xFFFF:
+        return b"\xfd" + n.to_bytes(2, "little")
+    if n <= 0xFFFFFFFF:
+        return b"\xfe" + n.to_bytes(4, "little")
+    return b"\xff" + n.to_bytes(8, "little")
+
+
+def _read_varint(b: bytes, i: int) -> tuple[int, int]:
+    n = b[i]
+    if n < 0xFD:
+        return n, i + 1
+    width = {0xFD: 2, 0xFE: 4, 0xFF: 8}[n]
+    return int.from_bytes(b[i + 1:i + 1 + width], "little"), i + 1 + width
+
+
+def address_hash160(address: str) -> bytes:
+    """Base58Check P2PKH address -> 20-byte pubkey hash."""
+    n = 0
+    for c in address:
+        n = n * 58 + _B58.index(c)
+    raw = n.to_bytes(25, "big")
+    if _sha256d(raw[:21])[:4] != raw[21:]:
+        raise ValueError(f"Bad address checksum: {address}")
+    return raw[1:21]
+
+
+def p2pkh_script(address: str) -> bytes:
+    return b"\x76\xa9\x14" + address_hash160(address) + b"\x88\xac"
+
+
+def build_funding_tx(address: str, n_outputs: int, satoshis: int) -> bytes:
+    """Coinbase-like tx paying n_outputs P2PKH outputs of `satoshis` to address."""
+    script = p2pkh_script(address)
+    tx = bytearray((1).to_bytes(4, "little"))
+    tx += _varint(1)
+    tx += b"\x00" * 32 + b"\xff\xff\xff\xff"
+    nonce = os.urandom(8)  # unique txid per funding
+    tx += _varint(len(nonce)) + nonce + b"\xff\xff\xff\xff"
+    tx += _varint(n_outputs)
+    for _ in range(n_outputs):
+        tx += satoshis.to_bytes(8, "little") + _varint(len(script)) + script
+    tx += (0).to_bytes(4, "little")
+    return bytes(tx)
+
+
+def parse_tx(raw: bytes) -> dict[str, Any]:
+    """
+    Parse a raw or Extended Format (BRC-30) tx. Returns txid, the plain
+    serialization (EF extras stripped), spent outpoints and outputs.
+    """
+    ef = raw[4:10] == _EF_MARKER
+    i = 10 if ef else 4
+    plain = bytearray(raw[:4])
+
+    n_in, i = _read_varint(raw, i)
+    plain += _varint(n_in)
+    inputs = []
+    for _ in range(n_in):
+        start = i
+        prev = raw[i:i + 32][::-1].hex()
+        vout = int.from_bytes(raw[i + 32:i + 36], "little")
+        slen, i = _read_varint(raw, i + 36)
+        i += slen + 4  # unlocking script + sequence
+        plain += raw[start:i]
+        inputs.append((prev, vout))
+        if ef:
+            i += 8  # previous satoshis
+            llen, i = _read_varint(raw, i)
+            i += llen  # previous locking script
+
+    out_start = i
+    n_out, i = _read_varint(raw, i)
+    outputs = []
+    for _ in range(n_out):
+        sats = int.from_bytes(raw[i:i + 8], "little")
+        slen, i = _read_varint(raw, i + 8)
+        outputs.append((sats, raw[i:i + slen]))
+        i += slen
+    plain += raw[out_start:i + 4]  # outputs + locktime
+
+    plain = bytes(plain)
+    return {"txid": _sha256d(plain)[::-1].hex(), "raw": plain, "inputs": inputs, "outputs": outputs}
+
+
+# ======================================================================
+# CHAIN STATE
+# ======================================================================
+
+class ChainState:
+    """In-memory UTXO set, mempool and blocks. Thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.height = 800_000
+        self.txs: dict[str, dict[str, Any]] = {}
+        self.utxos: dict[tuple[str, int], tuple[bytes, int]] = {}
+        self.mempool: list[str] = []
+
+    def _accept(self, tx: dict[str, Any], check_inputs: bool = True) -> str | None:
+        """Add a parsed tx; returns an error string instead on double spend / unknown input."""
+        txid = tx["txid"]
+        if txid in self.txs:
+            return None  # re-broadcast is fine
+        if check_inputs:
+            for outpoint in tx["inputs"]:
+                if outpoint not in self.utxos:
+                    return f"input {outpoint[0]}:{outpoint[1]} missing or already spent"
+            for outpoint in tx["inputs"]:
+                del self.utxos[outpoint]
+        for n, (sats, script) in enumerate(tx["outputs"]):
+            if not script.startswith(b"\x00\x6a") and not script.startswith(b"\x6a"):
+                self.utxos[(txid, n)] = (script, sats)
+        self.txs[txid] = {**tx, "height": None}
+        self.mempool.append(txid)
+        return None
+
+    def fund(self, address: str, n_outputs: int = 1, satoshis: int = 100_000) -> str:
+        tx = parse_tx(build_funding_tx(address, n_outputs, satoshis))
+        with self.lock:
+            self._accept(tx, check_inputs=False)
+        self.mine()
+        return tx["txid"]
+
+    def broadcast(self, raw: bytes) -> tuple[str, str | None]:
+        tx = parse_tx(raw)
+        with self.lock:
+            return tx["txid"], self._accept(tx)
+
+    def mine(self) -> int:
+        with self.lock:
+            self.height += 1
+            for txid in self.mempool:
+                self.txs[txid]["height"] = self.height
+            self.mempool.clear()
+            return self.height
+
+    def unspent(self, address: str) -> list[dict[str, Any]]:
+        script = p2pkh_script(address)
+        with self.lock:
+            return [
+                {
+                    "tx_hash": txid,
+                    "tx_pos": n,
+                    "value": sats,
+                    "height": self.txs[txid]["height"] or 0,
+                }
+                for (txid, n), (s, sats) in self.utxos.items()
+                if s == script
+            ]
+
+    def tx_json(self, txid: str) -> dict[str, Any] | None:
+        """WhatsOnChain-style tx JSON."""
+        with self.lock:
+            tx = self.txs.get(txid)
+            if tx is None:
+                return None
+            height = tx["height"]
+            confirmations = self.height - height + 1 if height else 0
+        return {
+            "txid": txid,
+            "hash": txid,
+            "hex": tx["raw"].hex(),
+            "size": len(tx["raw"]),
+            "blockheight": height,
+            "confirmations": confirmations,
+            "vin": [{"txid": p, "vout": v} for p, v in tx["inputs"]],
+            "vout": [
+                {
+                    "value": sats / 1e8,
+                    "n": n,
+                    "scriptPubKey": {
+                        "hex": script.hex(),
+                        "type": "nulldata" if b"\x6a" in script[:2] else "pubkeyhash",
+                    },
+                }
+                for n, (sats, script) in enumerate(tx["outputs"])
+            ],
+        }
+
+    def raw_hex(self, txid: str) -> str | None:
+        with self.lock:
+            tx = self.txs.get(txid)
+            return tx["raw"].hex() if tx else None
+
+
+# ======================================================================
+# HTTP SERVER (WhatsOnChain + ARC subset)
+# ======================================================================
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Local stand-in for WhatsOnChain and ARC. Point the adapters at
+    `woc_base` / `arc_url`.
+
+    Fault injection:
+      latency_ms / jitter_ms  delay added to every request
+      error_rate              fraction of requests answered with HTTP 500
+      rate_limit_rate         fraction answered with HTTP 429
+      reject_rate             fraction of broadcasts answered txStatus REJECTED
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        reject_rate: float = 0.0,
+        block_interval_s: float = 0.0,
+        seed: int | None = None,
+    ):
+        super().__init__((host, port), _Handler)
+        self.state = ChainState()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.reject_rate = reject_rate
+        self.block_interval_s = block_interval_s
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "broadcasts": 0, "injected_errors": 0}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def woc_base(self) -> str:
+        return f"{self.base_url}/v1/bsv/main"
+
+    @property
+    def arc_url(self) -> str:
+        return f"{self.base_url}/arc"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stand-in", daemon=True)
+        self._thread.start()
+        if self.block_interval_s > 0:
+            threading.Thread(target=self._miner, name="stand-in-miner", daemon=True).start()
+        logger.info("[STAND-IN] WoC %s | ARC %s", self.woc_base, self.arc_url)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.shutdown()
+        self.server_close()
+
+    def _miner(self) -> None:
+        while not self._stop.wait(self.block_interval_s):
+            self.state.mine()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandInServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+
+    _UNSPENT = re.compile(r"^/v1/bsv/\w+/address/(\w+)/unspent$")
+    _TX_HEX = re.compile(r"^/v1/bsv/\w+/tx/([0-9a-f]{64})/hex$")
+    _TX = re.compile(r"^/v1/bsv/\w+/tx/(?:hash/)?([0-9a-f]{64})$")
+    _TXS = re.compile(r"^/v1/bsv/\w+/txs$")
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        logger.debug("[STAND-IN] " + fmt, *args)
+
+    def _send(self, status: int, body: Any, content_type: str = "application/json") -> None:
+        data = body if isinstance(body, bytes) else (
+            body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _inject(self) -> bool:
+        """Apply latency and maybe answer with an injected failure. True if answered."""
+        srv = self.server
+        srv.stats["requests"] += 1
+        delay = srv.latency_ms + (srv.rng.uniform(0, srv.jitter_ms) if srv.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        roll = srv.rng.random()
+        if roll < srv.error_rate:
+            srv.stats["injected_errors"] += 1
+            self._send(500, {"error": "injected failure"})
+            return True
+        if roll < srv.error_rate + srv.rate_limit_rate:
+            srv.stats["injected_errors"] += 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0.05")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        return False
+
+    def do_GET(self) -> None:
+        if self._inject():
+            return
+        state = self.server.state
+        path = self.path.split("?", 1)[0]
+
+        m = self._UNSPENT.match(path)
+        if m:
+            return self._send(200, state.unspent(m.group(1)))
+        m = self._TX_HEX.match(path)
+        if m:
+            raw = state.raw_hex(m.group(1))
+            return self._send(200, raw, "text/plain") if raw else self._send(404, "Not Found", "text/plain")
+        m = self._TX.match(path)
+        if m:
+            tx = state.tx_json(m.group(1))
+            return self._send(200, tx) if tx else self._send(404, "Not Found", "text/plain")
+        if path == "/v1/bsv/main/chain/info":
+            return self._send(200, {"chain": "main", "blocks": state.height})
+        self._send(404, "Not Found", "text/plain")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self._inject():
+            return
+        path = self.path.split("?", 1)[0]
+
+        if self._TXS.match(path):
+            # WhatsOnChain bulk tx details: unknown txids come back with an error
+            try:
+                txids = json.loads(body)["txids"]
+            except Exception as e:
+                return self._send(400, {"error": str(e)})
+            if len(txids) > 20:
+                return self._send(400, {"error": "max 20 txids per request"})
+            state = self.server.state
+            return self._send(200, [state.tx_json(t) or {"txid": t, "error": "unknown"} for t in txids])
+        if path == "/arc/v1/tx":
+            try:
+                raw = bytes.fromhex(json.loads(body)["rawTx"])
+                # Roll the injected rejection first: a rejected tx must not spend its inputs
+                if self.server.rng.random() < self.server.reject_rate:
+                    txid, error = parse_tx(raw)["txid"], "injected rejection"
+                else:
+                    txid, error = self.server.state.broadcast(raw)
+            except Exception as e:
+                return self._send(422, {"title": "Malformed transaction", "detail": str(e)})
+            self.server.stats["broadcasts"] += 1
+            if error:
+                return self._send(200, {"txid": txid, "txStatus": "REJECTED", "extraInfo": error})
+            return self._send(200, {"txid": txid, "txStatus": "SEEN_ON_NETWORK", "status": 200})
+        self._send(404, "Not Found", "text/plain")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Local WhatsOnChain/ARC stand-in for load tests")
+    p.add_argument("--port", type=int, default=8088)
+    p.add_argument("--fund", action="append", default=[], help="address to fund (repeatable)")
+    p.add_argument("--utxos", type=int, default=10, help="outputs per funded address")
+    p.add_argument("--sats", type=int, default=100_000, help="satoshis per output")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0)
+    p.add_argument("--reject-rate", type=float, default=0.0)
+    p.add_argument("--block-interval", type=float, default=10.0, help="seconds per mined block (0 = never)")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    srv = StandInServer(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        reject_rate=args.reject_rate,
+        block_interval_s=args.block_interval,
+    )
+    for addr in args.fund:
+        print("Funded", addr, "->", srv.state.fund(addr, args.utxos, args.sats))
+    print("WOC_BASE =", srv.woc_base)
+    print("ARC_URL  =", srv.arc_url)
+    srv.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.stop()
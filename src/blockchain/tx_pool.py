@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("reserve", "build", "sign", "broadcast", "total")
+# The fee rate is looked up in the parent and shipped with each job; LivePolicy
+# only caches successful fetches, so keep whatever it returned (even the
+# offline fallback) for this long instead of retrying on every tx
+FEE_RATE_TTL_S = 300.0
+
+
+# ======================================================================
+# WORKER PROCESS SIDE (pure: picklable dicts in, dicts out)
+# ======================================================================
+
+@lru_cache(maxsize=4)
+def _private_key(wif: str):
+    from bsv import PrivateKey
+    return PrivateKey(wif)
+
+
+@lru_cache(maxsize=256)
+def _source_tx(txid: str, raw_hex: str):
+    # Change coins are spent again and again: parse each parent once per process
+    from bsv import Transaction
+    return Transaction.from_hex(raw_hex)
+
+
+def _warm() -> None:
+    # Pay the import cost before the first job
+    importlib.import_module("bsv")
+
+
+def build_and_sign(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    Build and sign one data tx in a worker process.
+
+    job: wif, address, utxo {txid, vout, satoshis}, source_tx_hex,
+         op_return_data (list of push lists, one OP_RETURN output each),
+         fee_rate (sat/kB, fetched once by the parent)
+    Returns the EF and plain hex, txid, our change outputs and stage timings.
+    """
+    from bsv import OpReturn, P2PKH, Transaction, TransactionInput, TransactionOutput
+    from bsv.fee_models import SatoshisPerKilobyte
+
+    t0 = time.perf_counter()
+    key = _private_key(job["wif"])
+    utxo = job["utxo"]
+    tx = Transaction()
+    tx.add_input(TransactionInput(
+        source_transaction=_source_tx(utxo["txid"], job["source_tx_hex"]),
+        source_output_index=utxo["vout"],
+        unlocking_script_template=P2PKH().unlock(key),
+    ))
+    for data in job["op_return_data"]:
+        tx.add_output(TransactionOutput(locking_script=OpReturn().lock(data), satoshis=0))
+    tx.add_output(TransactionOutput(locking_script=P2PKH().lock(job["address"]), change=True))
+    tx.fee(SatoshisPerKilobyte(job["fee_rate"]))
+    t1 = time.perf_counter()
+    tx.sign()
+    t2 = time.perf_counter()
+
+    try:
+        raw = tx.to_ef().hex()
+    except Exception:
+        raw = tx.hex()
+    ours = P2PKH().lock(job["address"]).hex()
+    return {
+        "txid": tx.txid(),
+        "raw": raw,
+        "hex": tx.hex(),
+        "change": [(i, int(o.satoshis or 0)) for i, o in enumerate(tx.outputs) if o.locking_script.hex() == ours],
+        "bytes": tx.byte_length(),
+        "fee": tx.get_fee(),
+        "build_ms": (t1 - t0) * 1000.0,
+        "sign_ms": (t2 - t1) * 1000.0,
+    }
+
+
+# ======================================================================
+# STAGE TIMINGS
+# ======================================================================
+
+class StageTimings:
+    """Rolling per-stage latency samples (last `window` txs) plus counters."""
+
+    def __init__(self, window: int = 1000):
+        self._samples = {stage: deque(maxlen=window) for stage in STAGES}
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    def add(self, timings: dict[str, float]) -> None:
+        with self._lock:
+            self.completed += 1
+            for stage, ms in timings.items():
+                if stage in self._samples:
+                    self._samples[stage].append(ms)
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = {"completed": self.completed, "failed": self.failed}
+            for stage, values in self._samples.items():
+                if not values:
+                    continue
+                s = sorted(values)
+                out[stage] = {
+                    "mean_ms": round(sum(s) / len(s), 2),
+                    "p50_ms": round(s[len(s) // 2], 2),
+                    "p95_ms": round(s[min(len(s) - 1, int(0.95 * len(s)))], 2),
+                    "max_ms": round(s[-1], 2),
+                }
+            return out
+
+
+# ======================================================================
+# PIPELINE (parent process)
+# ======================================================================
+
+class TxPipeline:
+    """
+    reserve (caller thread) -> build + sign (process pool) -> broadcast +
+    UTXO commit (I/O threads).
+
+    Fee calculation, parent-tx parsing and ECDSA signing run in separate
+    processes, so a burst of registrations does not compete for the GIL with
+    inference. Stages of different txs overlap: while one tx is being
+    broadcast the next ones are already being signed.
+    """
+
+    def __init__(self, adapter: Any, processes: int = 2, broadcast_threads: int = 4):
+        self.adapter = adapter
+        # spawn: the parent runs sqlite/HTTP threads, forking them is unsafe
+        self._procs = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm,
+        )
+        self._io = ThreadPoolExecutor(max_workers=broadcast_threads, thread_name_prefix="bsv-broadcast")
+        self.timings = StageTimings()
+        self._fee: tuple[int, float] | None = None  # (sat/kB, fetched at)
+        self._fee_lock = threading.Lock()
+
+    def _fee_rate(self) -> int:
+        # Same source as tx.fee() in-process: the adapter's pinned rate, else
+        # LivePolicy with the fallback rate when offline
+        from bsv.constants import TRANSACTION_FEE_RATE
+        from bsv.fee_models import LivePolicy
+
+        pinned = int(getattr(self.adapter, "fee_rate_sat_per_kb", 0))
+        if pinned > 0:
+            return pinned
+        with self._fee_lock:
+            now = time.monotonic()
+            if self._fee is None or now - self._fee[1] > FEE_RATE_TTL_S:
+                policy = LivePolicy.get_instance(fallback_sat_per_kb=int(TRANSACTION_FEE_RATE))
+                self._fee = (int(policy.current_rate_sat_per_kb()), now)
+            return self._fee[0]
+
+    def submit(self, op_return_data: list[list[str]], min_sats: int = 1) -> Future:
+        """
+        Queue one tx with an OP_RETURN output per entry. The returned future
+        resolves to {tx_id, fee, bytes, timings} once it is broadcast.
+        """
+        adapter = self.adapter
+        result: Future = Future()
+        t0 = time.perf_counter()
+        try:
+            utxo = adapter.utxos.reserve(min_sats=min_sats)
+        except Exception as e:
+            self.timings.failure()
+            result.set_exception(e)
+            return result
+        try:
+            job = {
+                "wif": adapter.private_key_wif,
+                "address": str(adapter.address),
+                "utxo": utxo,
+                "source_tx_hex": adapter.utxos.source_tx_hex(utxo["txid"]),
+                "op_return_data": op_return_data,
+                "fee_rate": self._fee_rate(),
+            }
+            reserved = time.perf_counter()
+            built = self._procs.submit(build_and_sign, job)
+        except Exception as e:
+            adapter.utxos.release(utxo)
+            self.timings.failure()
+            result.set_exception(e)
+            return result
+        built.add_done_callback(lambda f: self._hand_off(f, utxo, result, t0, reserved))
+        return result
+
+    def _hand_off(self, built: Future, utxo: dict[str, Any], result: Future, t0: float, reserved: float) -> None:
+        # Runs in the pool's callback thread: if the I/O pool is already shut
+        # down the tx is never sent, so fail the result instead of leaving it pending
+        try:
+            self._io.submit(self._broadcast, built, utxo, result, t0, reserved)
+        except Exception as e:
+            self.adapter.utxos.release(utxo)
+            self.timings.failure()
+            result.set_exception(e)
+
+    def _broadcast(self, built: Future, utxo: dict[str, Any], result: Future, t0: float, reserved: float) -> None:
+        from src.blockchain.http_client import arc_broadcast
+
+        adapter = self.adapter
+        try:
+            tx = built.result()
+        except Exception as e:
+            adapter.utxos.release(utxo)
+            self.timings.failure()
+            result.set_exception(e)
+            return
+        try:
+            t_send = time.perf_counter()
+            txid = arc_broadcast(adapter._arc, tx["raw"], adapter.arc_api_key)
+            t_done = time.perf_counter()
+        except Exception as e:
+            adapter.utxos.abandon(utxo, e)
+            self.timings.failure()
+            result.set_exception(e)
+            return
+        try:
+            adapter.utxos.commit([utxo], txid, tx["hex"], tx["change"])
+        except Exception as e:
+            # The tx is out whatever happens here: never hand its input back
+            logger.error("[BSV] UTXO commit failed for broadcast tx %s: %s", txid, e)
+            try:
+                adapter.utxos.mark_spent(utxo)
+            except Exception:
+                pass
+
+        timings = {
+            "reserve": (reserved - t0) * 1000.0,
+            "build": tx["build_ms"],
+            "sign": tx["sign_ms"],
+            "broadcast": (t_done - t_send) * 1000.0,
+            "total": (t_done - t0) * 1000.0,
+        }
+        self.timings.add(timings)
+        logger.info("[BSV] Pipeline broadcast %s (%d bytes, fee=%d sats)", txid, tx["bytes"], tx["fee"])
+        result.set_result({"tx_id": txid, "fee": tx["fee"], "bytes": tx["bytes"], "timings": timings})
+
+    def shutdown(self) -> None:
+        self._procs.shutdown(wait=True)
+        self._io.shutdown(wait=True)
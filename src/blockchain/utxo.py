@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from src import config
+from src.blockchain.http_client import ArcRejected
+
+
+logger = logging.getLogger(__name__)
+
+
+class UtxoManager:
+    """
+    Local UTXO set for our address (SQLite).
+
+    - utxos: known outputs with status available | reserved | in_doubt | spent
+    - parent_txs: raw hex cache of the transactions that created them
+
+    reserve() hands each concurrent builder a different coin, and commit()
+    registers the change outputs of our own broadcast tx as spendable right
+    away (with its hex cached), so chained transactions need no WhatsOnChain
+    round trip for UTXOs or parent tx.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        fetch_utxos: Callable[[], list[dict[str, Any]]],
+        fetch_raw_tx: Callable[[str], str],
+        db_path: str | Path | None = None,
+        reservation_timeout_s: float = 600.0,
+    ):
+        self.address = address
+        self._fetch_utxos = fetch_utxos
+        self._fetch_raw_tx = fetch_raw_tx
+        self.reservation_timeout_s = reservation_timeout_s
+        self.db_path = Path(db_path) if db_path else Path(config.UTXO_DB_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS utxos (
+                address TEXT NOT NULL,
+                txid TEXT NOT NULL,
+                vout INTEGER NOT NULL,
+                satoshis INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (txid, vout)
+            );
+            CREATE INDEX IF NOT EXISTS idx_utxos_avail ON utxos(address, status, satoshis);
+            CREATE TABLE IF NOT EXISTS parent_txs (
+                txid TEXT PRIMARY KEY,
+                hex TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    # ---- sync with the indexer ----
+
+    def refresh(self) -> int:
+        """
+        Merge WhatsOnChain's view. Coins we already track keep their local
+        status, except (once older than UTXO_REFRESH_GRACE_S) available coins
+        WhatsOnChain no longer lists, which are marked spent, and in_doubt
+        coins, which become available again if still listed or spent if not.
+        """
+        utxos = self._fetch_utxos()
+        listed = [
+            (u.get("tx_hash") or u.get("txid"), int(u["tx_pos"]), int(u.get("value", 0)))
+            for u in utxos
+        ]
+        keys = {(txid, vout) for txid, vout, _ in listed}
+        now = time.time()
+        cutoff = now - float(getattr(config, "UTXO_REFRESH_GRACE_S", 120))
+        with self._lock:
+            cur = self._conn.executemany(
+                "INSERT OR IGNORE INTO utxos(address, txid, vout, satoshis, status, updated_at) "
+                "VALUES (?, ?, ?, ?, 'available', ?)",
+                [(self.address, txid, vout, sats, now) for txid, vout, sats in listed],
+            )
+            added = cur.rowcount
+            rows = self._conn.execute(
+                "SELECT txid, vout, status FROM utxos "
+                "WHERE address = ? AND status IN ('available', 'in_doubt') AND updated_at < ?",
+                (self.address, cutoff),
+            ).fetchall()
+            settled = [
+                ("available" if (txid, vout) in keys else "spent", now, txid, vout)
+                for txid, vout, status in rows
+                if status == "in_doubt" or (txid, vout) not in keys
+            ]
+            self._conn.executemany(
+                "UPDATE utxos SET status = ?, updated_at = ? WHERE txid = ? AND vout = ?", settled
+            )
+            self._conn.commit()
+        if settled:
+            logger.info("[UTXO] Refresh settled %d coins against WhatsOnChain", len(settled))
+        return added
+
+    def _release_stale(self) -> None:
+        cutoff = time.time() - self.reservation_timeout_s
+        self._conn.execute(
+            "UPDATE utxos SET status = 'available' WHERE status = 'reserved' AND updated_at < ?",
+            (cutoff,),
+        )
+
+    # ---- coin selection ----
+
+    def reserve(self, min_sats: int = 1, largest: bool = False) -> dict[str, Any]:
+        """
+        Take one available coin (smallest that covers min_sats, or the largest)
+        and mark it reserved. Refreshes from WhatsOnChain only if none is known.
+        """
+        for attempt in range(2):
+            with self._lock:
+                self._release_stale()
+                order = "DESC" if largest else "ASC"
+                row = self._conn.execute(
+                    "SELECT txid, vout, satoshis FROM utxos "
+                    "WHERE address = ? AND status = 'available' AND satoshis >= ? "
+                    f"ORDER BY satoshis {order} LIMIT 1",
+                    (self.address, min_sats),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE utxos SET status = 'reserved', updated_at = ? WHERE txid = ? AND vout = ?",
+                        (time.time(), row[0], row[1]),
+                    )
+                    self._conn.commit()
+                    return {"txid": row[0], "vout": row[1], "satoshis": row[2]}
+            if attempt == 0:
+                self.refresh()
+
+        raise RuntimeError(
+            f"No UTXOs available for address {self.address}. "
+            "Fund the address to broadcast on-chain."
+        )
+
+    def release(self, utxo: dict[str, Any]) -> None:
+        """Give a reserved coin back (tx not broadcast)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE utxos SET status = 'available', updated_at = ? "
+                "WHERE txid = ? AND vout = ? AND status = 'reserved'",
+                (time.time(), utxo["txid"], utxo["vout"]),
+            )
+            self._conn.commit()
+
+    def mark_spent(self, utxo: dict[str, Any]) -> None:
+        """The coin is gone (e.g. ARC reports the input already spent)."""
+        self._set_status(utxo, "spent")
+
+    def abandon(self, utxo: dict[str, Any], error: BaseException) -> None:
+        """
+        Settle the coin of a tx whose broadcast failed. Only a definitive ARC
+        rejection gives it back (or marks it spent when the input is gone); on
+        a timeout or lost connection the tx may have gone out, so the coin is
+        held in_doubt until refresh() sees whether WhatsOnChain still lists it.
+        """
+        if isinstance(error, ArcRejected):
+            if error.input_spent:
+                self.mark_spent(utxo)
+            else:
+                self.release(utxo)
+        else:
+            logger.warning("[UTXO] Broadcast outcome unknown, holding %s:%s: %s", utxo["txid"], utxo["vout"], error)
+            self._set_status(utxo, "in_doubt")
+
+    def _set_status(self, utxo: dict[str, Any], status: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE utxos SET status = ?, updated_at = ? WHERE txid = ? AND vout = ?",
+                (status, time.time(), utxo["txid"], utxo["vout"]),
+            )
+            self._conn.commit()
+
+    def source_tx_hex(self, txid: str) -> str:
+        """Parent tx hex, from cache or fetched once and cached."""
+        row = self._conn.execute("SELECT hex FROM parent_txs WHERE txid = ?", (txid,)).fetchone()
+        if row:
+            return row[0]
+        raw = self._fetch_raw_tx(txid)
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO parent_txs(txid, hex) VALUES (?, ?)", (txid, raw))
+            self._conn.commit()
+        return raw
+
+    def commit(self, spent: list[dict[str, Any]], txid: str, raw_hex: str, outputs: list[tuple[int, int]]) -> None:
+        """
+        Record a broadcast tx: mark its inputs spent, cache its hex and add our
+        outputs [(vout, satoshis), ...] as immediately spendable.
+        """
+        now = time.time()
+        with self._lock:
+            for u in spent:
+                self._conn.execute(
+                    "UPDATE utxos SET status = 'spent', updated_at = ? WHERE txid = ? AND vout = ?",
+                    (now, u["txid"], u["vout"]),
+                )
+            self._conn.execute("INSERT OR REPLACE INTO parent_txs(txid, hex) VALUES (?, ?)", (txid, raw_hex))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO utxos(address, txid, vout, satoshis, status, updated_at) "
+                "VALUES (?, ?, ?, ?, 'available', ?)",
+                [(self.address, txid, vout, sats, now) for vout, sats in outputs if sats > 0],
+            )
+            # Spent coins are no longer needed as parents
+            self._conn.execute(
+                "DELETE FROM parent_txs WHERE txid NOT IN (SELECT txid FROM utxos WHERE status != 'spent')"
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*), COALESCE(SUM(satoshis), 0) FROM utxos WHERE address = ? GROUP BY status",
+                (self.address,),
+            ).fetchall()
+        return {status: {"count": n, "satoshis": sats} for status, n, sats in rows}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.blockchain.adapter import BSVAdapter
+
+    p = argparse.ArgumentParser(description="Local UTXO set: status and pre-splitting")
+    p.add_argument("--split", type=int, default=0, help="Split funds into N UTXOs")
+    p.add_argument("--sats", type=int, default=1000, help="Satoshis per split output")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    adapter = BSVAdapter(async_broadcast=False)
+    if args.split:
+        print(adapter.presplit_utxos(args.split, args.sats))
+    print(adapter.utxos.stats() if adapter.utxos else "BSV not configured")
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from src import config
+from src.blockchain.adapter import BSVAdapter, _is_chain_tx, _tx_contains_data
+from src.blockchain.hashing import verify_integrity
+from src.blockchain.merkle import verify_proof
+from src.blockchain.verify_cache import cache_entry, fetch_tx_status, is_stale
+from src.storage.blob_store import BlobStore
+
+
+logger = logging.getLogger(__name__)
+
+# Below this many payloads a process pool costs more than it saves
+PROCESS_POOL_MIN = 64
+
+
+@lru_cache(maxsize=4)
+def _blob_store(root: str) -> BlobStore:
+    return BlobStore(root)
+
+
+def _check_integrity(item: tuple[str, dict[str, Any] | None, str]) -> tuple[str, bool]:
+    """Inline (legacy) payloads are rehashed; detached ones are read and checked in the worker."""
+    h, payload, blob_root = item
+    if payload is not None:
+        return h, verify_integrity(payload, h)
+    return h, _blob_store(blob_root).verify(h)
+
+
+def verify_many(
+    hashes: list[str],
+    adapter: BSVAdapter | None = None,
+    max_workers: int = 8,
+    processes: int | None = None,
+    confirmed_depth: int | None = None,
+) -> dict[str, Any]:
+    """
+    Re-verify many analyses at once.
+
+    1. one indexed pass over the local ledger
+    2. chain status per distinct txid, in bulk WoC requests of 20 txids;
+       records whose cached verification is still fresh (see verify_cache)
+       are not queried, and every answer is cached with its record
+    3. integrity of stored payloads (inline or blob store) in a process pool
+    Returns a report dict (summary + per-hash results).
+    """
+    adapter = adapter or BSVAdapter(async_broadcast=False)
+    local = adapter._local
+    depth = confirmed_depth if confirmed_depth is not None else config.VERIFY_CONFIRMED_DEPTH
+    t0 = time.perf_counter()
+
+    records = local.read_records(hashes)
+
+    # ---- chain status (bulk WoC requests, I/O bound -> threads) ----
+    # Cached per record: records sharing a tx (multi-output, Merkle) each check their own data
+    pending_txids: set[str] = set()
+    cached: dict[str, dict[str, Any]] = {}
+    for h, rec in records.items():
+        txid = rec.get("tx_id")
+        if not _is_chain_tx(txid):
+            continue
+        if is_stale(rec, depth):
+            pending_txids.add(txid)
+        else:
+            cached[h] = rec["verification"]
+
+    chain: dict[str, dict[str, Any]] = {}
+    if pending_txids and adapter._woc is not None:
+        chain = fetch_tx_status(adapter._woc, pending_txids, max_workers=max_workers)
+
+    # ---- integrity (CPU bound -> processes) ----
+    blob_root = str(local.blobs.root)
+    integrity: dict[str, bool] = {}
+    items = []
+    for h, r in records.items():
+        if isinstance(r.get("analysis_payload"), dict):
+            items.append((h, r["analysis_payload"], blob_root))
+        elif "payload_hash" in r:
+            integrity[h] = False  # stored payload never hashed to analysis_hash
+        elif h in local.blobs:
+            items.append((h, None, blob_root))
+
+    if len(items) >= PROCESS_POOL_MIN:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            integrity.update(pool.map(_check_integrity, items, chunksize=32))
+    else:
+        integrity.update(map(_check_integrity, items))
+
+    # ---- report ----
+    now = datetime.now(timezone.utc).isoformat()
+    results: list[dict[str, Any]] = []
+    fresh: dict[str, dict[str, Any]] = {}
+    for h in hashes:
+        rec = records.get(h)
+        if rec is None:
+            results.append({"analysis_hash": h, "found": False})
+            continue
+
+        txid = rec.get("tx_id")
+        res: dict[str, Any] = {
+            "analysis_hash": h,
+            "found": True,
+            "scene_id": rec.get("scene_id"),
+            "tx_id": txid,
+            "integrity_ok": integrity.get(h),
+        }
+        if rec.get("merkle_proof") is not None:
+            res["merkle_verified"] = verify_proof(h, rec["merkle_proof"], rec.get("merkle_root", ""))
+
+        status = cached.get(h) or (chain.get(txid) if _is_chain_tx(txid) else None)
+        if status is not None:
+            res["on_chain_verified"] = status["on_chain_verified"]
+            res["confirmations"] = status.get("confirmations")
+            res["cached"] = h in cached
+            if h in cached:
+                for key in ("merkle_root_in_tx", "output_verified"):
+                    if key in status:
+                        res[key] = status[key]
+            elif "verify_error" in status:
+                res["verify_error"] = status["verify_error"]
+            else:
+                # Cache every answer with the ledger record; refreshed by confirmation depth
+                entry = cache_entry(rec, status, _tx_contains_data, now, depth)
+                fresh[h] = {"verification": entry}
+                for key in ("merkle_root_in_tx", "output_verified"):
+                    if key in entry:
+                        res[key] = entry[key]
+        results.append(res)
+
+    local._update_records(fresh)
+
+    summary = {
+        "total": len(hashes),
+        "found": sum(1 for r in results if r["found"]),
+        "missing": sum(1 for r in results if not r["found"]),
+        "integrity_ok": sum(1 for r in results if r.get("integrity_ok") is True),
+        "integrity_failed": sum(1 for r in results if r.get("integrity_ok") is False),
+        "on_chain": sum(1 for r in results if r.get("on_chain_verified") is True),
+        "not_on_chain": sum(1 for r in results if r.get("on_chain_verified") is False),
+        "chain_queries": len(pending_txids),
+        "cached": sum(1 for r in results if r.get("cached")),
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
+    return {"generated_utc": now, "summary": summary, "results": results}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Bulk re-verification of evidence records")
+    p.add_argument("hashes", nargs="*", help="analysis hashes to verify")
+    p.add_argument("--file", help="text file with one hash per line")
+    p.add_argument("--all", action="store_true", help="verify every record in the ledger")
+    p.add_argument("--workers", type=int, default=8, help="concurrent chain queries")
+    p.add_argument("--woc-base", default=None, help="WhatsOnChain base URL (e.g. local stand-in)")
+    p.add_argument("--rate", type=float, default=None, help="WoC requests/s (0 = unlimited, for local mocks)")
+    p.add_argument("--out", default=None, help="report path (JSON)")
+    args = p.parse_args()
+
+    if args.rate is not None:
+        config.WOC_RATE_LIMIT_PER_S = args.rate
+    adapter = BSVAdapter(async_broadcast=False, woc_base=args.woc_base)
+    hashes = list(args.hashes)
+    if args.file:
+        hashes += [line.strip() for line in Path(args.file).read_text(encoding="utf-8").splitlines() if line.strip()]
+    if args.all:
+        hashes += [r["analysis_hash"] for r in adapter.iter_records() if r.get("analysis_hash")]
+
+    report = verify_many(hashes, adapter=adapter, max_workers=args.workers)
+    out = Path(args.out) if args.out else config.REPORTS_DIR / f"verification_{int(time.time())}.json"
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report["summary"], indent=2))
+    print("Report:", out)
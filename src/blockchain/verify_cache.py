@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any
+
+from src import config
+from src.blockchain.ledger_segments import parse_utc
+
+
+logger = logging.getLogger(__name__)
+
+# WhatsOnChain POST /txs accepts at most this many txids per request
+WOC_BULK_TXS_MAX = 20
+
+
+# ======================================================================
+# REFRESH POLICY
+# ======================================================================
+
+def refresh_interval_s(entry: dict[str, Any] | None, depth: int | None = None) -> float | None:
+    """
+    Seconds a cached verification stays valid, or None once it is final.
+
+    not found / mempool    VERIFY_REFRESH_UNCONFIRMED_S
+    1 .. depth-1 confs     VERIFY_REFRESH_CONFIRMING_S
+    >= depth confs         never refreshed again
+    """
+    depth = config.VERIFY_CONFIRMED_DEPTH if depth is None else depth
+    if not entry:
+        return 0.0
+    confirmations = int(entry.get("confirmations") or 0)
+    if entry.get("on_chain_verified") and confirmations >= depth:
+        return None
+    if confirmations > 0:
+        return float(config.VERIFY_REFRESH_CONFIRMING_S)
+    return float(config.VERIFY_REFRESH_UNCONFIRMED_S)
+
+
+def needs_refresh(entry: dict[str, Any] | None, depth: int | None = None, now: datetime | None = None) -> bool:
+    """True if the cached verification of a record must be fetched again."""
+    ttl = refresh_interval_s(entry, depth)
+    if ttl is None:
+        return False
+    checked = parse_utc((entry or {}).get("checked_at"))
+    if checked is None:
+        return True
+    now = now or datetime.now(timezone.utc)
+    return (now - checked).total_seconds() >= ttl
+
+
+def is_stale(record: dict[str, Any], depth: int | None = None, now: datetime | None = None) -> bool:
+    """needs_refresh() for a ledger record; an entry cached for another txid is always stale."""
+    entry = record.get("verification")
+    if entry and entry.get("tx_id") not in (None, record.get("tx_id")):
+        return True
+    return needs_refresh(entry, depth, now)
+
+
+# ======================================================================
+# BATCHED WHATSONCHAIN LOOKUPS
+# ======================================================================
+
+def _status(data: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "on_chain_verified": True,
+        "confirmations": data.get("confirmations", 0) or 0,
+        "blockheight": data.get("blockheight"),
+        "_tx": data,
+    }
+
+
+def _fetch_one(woc: Any, txid: str) -> dict[str, Any]:
+    try:
+        resp = woc.get(f"tx/{txid}", timeout=10)
+        if resp.status_code == 404:
+            return {"on_chain_verified": False, "http_status": 404}
+        if resp.status_code != 200:
+            return {"on_chain_verified": False, "verify_error": f"WhatsOnChain HTTP {resp.status_code}"}
+        return _status(resp.json())
+    except Exception as e:
+        return {"on_chain_verified": False, "verify_error": str(e)}
+
+
+def _fetch_chunk(woc: Any, txids: list[str]) -> dict[str, dict[str, Any]]:
+    """One POST /txs for up to WOC_BULK_TXS_MAX txids; per-tx GETs if the bulk call fails."""
+    try:
+        resp = woc.post_json("txs", {"txids": txids}, timeout=15)
+        if resp.status_code == 200:
+            found = {
+                d["txid"]: d for d in resp.json()
+                if isinstance(d, dict) and d.get("txid") and not d.get("error")
+            }
+            return {
+                txid: _status(found[txid]) if txid in found else {"on_chain_verified": False, "http_status": 404}
+                for txid in txids
+            }
+        logger.warning("[VERIFY] Bulk tx lookup answered %d, falling back to single lookups", resp.status_code)
+    except Exception as e:
+        logger.warning("[VERIFY] Bulk tx lookup failed, falling back to single lookups: %s", e)
+    return {txid: _fetch_one(woc, txid) for txid in txids}
+
+
+def fetch_tx_status(
+    woc: Any,
+    txids: list[str] | set[str],
+    batch_size: int = WOC_BULK_TXS_MAX,
+    max_workers: int = 4,
+) -> dict[str, dict[str, Any]]:
+    """
+    Chain status per txid: {on_chain_verified, confirmations, blockheight,
+    _tx (WoC tx JSON)}; network failures carry verify_error instead.
+    Batches of `batch_size` txids go out concurrently (the client's rate
+    limiter still spaces them).
+    """
+    unique = sorted(set(txids))
+    if not unique or woc is None:
+        return {}
+    chunks = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    out: dict[str, dict[str, Any]] = {}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        for part in pool.map(lambda c: _fetch_chunk(woc, c), chunks):
+            out.update(part)
+    logger.info("[VERIFY] %d txids in %d requests (%.2fs)", len(unique), len(chunks), time.perf_counter() - t0)
+    return out
+
+
+# ======================================================================
+# CACHE ENTRIES
+# ======================================================================
+
+def cache_entry(
+    record: dict[str, Any],
+    status: dict[str, Any],
+    contains: Any,
+    checked_at: str | None = None,
+    depth: int | None = None,
+) -> dict[str, Any]:
+    """
+    Verification stored with the ledger record (updates log, field
+    `verification`). `contains(tx_data, text, vout)` checks the record's data
+    is really in the tx (merkle root, or its own output for multi-output txs).
+    """
+    entry: dict[str, Any] = {
+        "tx_id": record.get("tx_id"),
+        "on_chain_verified": bool(status.get("on_chain_verified")),
+        "confirmations": status.get("confirmations", 0) or 0,
+        "blockheight": status.get("blockheight"),
+        "checked_at": checked_at or datetime.now(timezone.utc).isoformat(),
+    }
+    if "http_status" in status:
+        entry["http_status"] = status["http_status"]
+    tx_data = status.get("_tx")
+    if tx_data is not None:
+        if record.get("merkle_root"):
+            entry["merkle_root_in_tx"] = contains(tx_data, record["merkle_root"])
+        elif record.get("vout") is not None:
+            entry["output_verified"] = contains(tx_data, str(record.get("analysis_hash", "")), record["vout"])
+        entry["raw_tx_available"] = bool(tx_data.get("hex"))
+    entry["final"] = refresh_interval_s(entry, depth) is None
+    return entry
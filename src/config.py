@@ -12,6 +12,11 @@ PROCESSED_DATA_DIR = DATA_DIR / "processed"
 REPORTS_DIR = BASE_DIR / "reports"
 RUNS_DIR = REPORTS_DIR / "runs"
 ANALYSIS_DIR = REPORTS_DIR / "analysis_json"
+RESULTS_STORE_DIR = REPORTS_DIR / "results_store"
+# Particion "camera=" de las escenas sin camara conocida
+RESULTS_DEFAULT_CAMERA = "default"
+# Segundos maximos que una fila espera en el buffer del ResultsStore compartido
+RESULTS_FLUSH_INTERVAL_S = 300.0
 
 # Configs
 CONFIGS_DIR = BASE_DIR / "configs"
@@ -36,5 +41,67 @@ BSV_PRIVATE_KEY = "L4DArgykDjNHg1UvvSiEB1qK7RkcayJQ9ZypuDeKGWhvMEmZsmHt"  # empt
 
 ARC_URL = "https://arc.gorillapool.io"
 
+# Shared HTTP client (src/blockchain/http_client.py)
+WOC_TIMEOUT_S = 15.0
+WOC_RATE_LIMIT_PER_S = 3.0  # WhatsOnChain free tier
+ARC_TIMEOUT_S = 30.0
+
+# Verification cache (stored with each ledger record): refreshed every
+# VERIFY_REFRESH_UNCONFIRMED_S while the tx is unknown/in mempool, every
+# VERIFY_REFRESH_CONFIRMING_S below VERIFY_CONFIRMED_DEPTH confirmations,
+# and kept for good after that
+VERIFY_CONFIRMED_DEPTH = 6
+VERIFY_REFRESH_UNCONFIRMED_S = 60.0
+VERIFY_REFRESH_CONFIRMING_S = 600.0
+
+# Anchoring: "single" = one OP_RETURN tx per analysis,
+# "merkle" = one tx per batch anchoring the Merkle root of its hashes
+BSV_ANCHOR_MODE = "single"
+BSV_BATCH_MAX_SIZE = 64
+BSV_BATCH_MAX_AGE_S = 60.0
+# Leaves claimed by an adapter that has not flushed them for this long (or
+# whose process is gone) can be recovered by another one
+BSV_BATCH_CLAIM_TTL_S = 600.0
+# register_many(): OP_RETURN outputs per transaction and size cap of each tx
+BSV_MULTI_MAX_OUTPUTS = 50
+BSV_MULTI_MAX_TX_BYTES = 50_000
+
+# True: registration returns right away and a background worker broadcasts
+# (needs a long-lived process running the worker, e.g. the app)
+BSV_ASYNC_BROADCAST = False
+BROADCAST_QUEUE_PATH = DATA_DIR / "broadcast_queue.sqlite"
+# Tx build + sign in worker processes, pipelined with the broadcast
+# (0 = in the calling process); jobs the queue worker keeps in flight.
+# Worth it for long-lived processes with a busy broadcast queue (the app);
+# a one-shot register() would pay for spawning the pool
+BSV_TX_POOL_WORKERS = 0
+BSV_TX_POOL_IN_FLIGHT = 16
+# Fixed fee rate in sat/kB (0 = live mining policy, fetched from the public
+# fee endpoint; the SDK's default rate when offline)
+BSV_FEE_RATE_SAT_PER_KB = 0
+
+# Local UTXO set + parent tx cache
+UTXO_DB_PATH = DATA_DIR / "utxos.sqlite"
+# A refresh only drops/settles coins untouched for this long (WhatsOnChain
+# may not have indexed our latest broadcasts yet)
+UTXO_REFRESH_GRACE_S = 120
+
 
 LEDGER_PATH = DATA_DIR / "evidence_ledger.jsonl"
+# Hash-chained ledger: signed checkpoint every N entries (0 = only on demand).
+# Signed with HMAC if LEDGER_CHECKPOINT_KEY is set, otherwise with the BSV key.
+LEDGER_CHECKPOINT_EVERY = 1000
+LEDGER_CHECKPOINT_KEY = ""
+# Segmented ledger: the active file is sealed into <stem>.segments/ when it
+# reaches this size or a new period ("day", "month", "" = size only) starts.
+LEDGER_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+LEDGER_SEGMENT_PERIOD = "month"
+# False-positive rate of the per-segment Bloom filters used to skip segments
+LEDGER_BLOOM_FP_RATE = 0.01
+
+
+# ============================================================
+# METRICAS (serie temporal y alertas)
+# ============================================================
+TIMESERIES_DB_PATH = DATA_DIR / "metrics_timeseries.sqlite"
+ALERTS_PATH = DATA_DIR / "alerts.jsonl"
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import queue
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import requests
+
+from src import config
+from src.metrics.impact import DEFAULT_WEIGHTS
+from src.metrics.registry import MetricEngine
+from src.metrics.timeseries import to_epoch
+
+
+logger = logging.getLogger(__name__)
+
+ALERT_METRICS = ("congestion_index", "impact_score")
+
+
+class OnlineStats:
+    """Media/varianza de Welford en memoria constante."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def zscore(self, x: float) -> float:
+        std = self.std
+        if std == 0.0:
+            return 0.0
+        return (x - self.mean) / std
+
+
+# ======================================================================
+# SINKS
+# ======================================================================
+
+class JsonlAlertSink:
+    """Anade cada alerta como una linea JSON."""
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else Path(config.ALERTS_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def emit(self, alert: dict[str, Any]) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(alert, sort_keys=True, ensure_ascii=True) + "\n")
+
+
+class WebhookAlertSink:
+    """
+    POST JSON a un webhook desde un hilo propio. emit() solo encola: ni la
+    latencia ni un fallo de red llegan al bucle de video. Con la cola llena
+    (webhook caido) las alertas nuevas se descartan y se cuentan en `dropped`.
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0, max_pending: int = 1000):
+        self.url = url
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="alerts-webhook", daemon=True)
+        self._thread.start()
+
+    def emit(self, alert: dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("[ALERTS] Webhook %s queue full, alert dropped", self.url)
+
+    def _run(self) -> None:
+        session = requests.Session()
+        while True:
+            alert = self._queue.get()
+            try:
+                if alert is None:
+                    return
+                session.post(self.url, json=alert, timeout=self.timeout)
+            except Exception as e:
+                logger.warning("[ALERTS] Webhook %s failed: %s", self.url, e)
+            finally:
+                self._queue.task_done()
+
+    def close(self, timeout: float | None = None) -> None:
+        """Envia lo pendiente y para el hilo (espera como mucho `timeout`)."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+# ======================================================================
+# ALERTER
+# ======================================================================
+
+class CongestionAlerter:
+    """
+    Alertas en linea sobre congestion_index / impact_score.
+
+    Mantiene un OnlineStats por (camara, zona, metrica, franja horaria), de
+    modo que la linea base depende de la hora del dia, y una EWMA por
+    (camara, zona, metrica) con el nivel reciente. La alerta se decide como en
+    un grafico de control EWMA: la desviacion de la EWMA frente a la linea
+    base, medida en desviaciones tipicas de la propia EWMA. Un cambio
+    sostenido dispara en pocos frames; un pico aislado solo mueve la EWMA en
+    ewma_alpha * pico. Memoria constante: no guarda historico, solo el estado
+    agregado de cada clave.
+    """
+
+    def __init__(
+        self,
+        sink: Any | None = None,
+        metrics: tuple[str, ...] = ALERT_METRICS,
+        z_threshold: float = 3.0,
+        min_samples: int = 30,
+        ewma_alpha: float = 0.05,
+        bucket_hours: int = 1,
+        cooldown_s: float = 60.0,
+    ):
+        self.sink = sink if sink is not None else JsonlAlertSink()
+        self.metrics = metrics
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.bucket_hours = max(1, int(bucket_hours))
+        self.cooldown_s = cooldown_s
+
+        self._stats: dict[tuple[str, str, str, int], OnlineStats] = {}
+        # El nivel es continuo entre franjas: no depende de la hora
+        # (ewma, peso^2 de la primera muestra)
+        self._level: dict[tuple[str, str, str], tuple[float, float]] = {}
+        self._last_fired: dict[tuple[str, str, str, int], float] = {}
+
+    def _bucket(self, t: float) -> int:
+        return datetime.fromtimestamp(t, timezone.utc).hour // self.bucket_hours
+
+    def observe(
+        self,
+        camera_id: str,
+        metrics: dict[str, Any],
+        ts: float | str | datetime | None = None,
+        zone: str = "all",
+    ) -> list[dict[str, Any]]:
+        """Procesa un frame/escena. Devuelve (y emite) las alertas disparadas."""
+        t = to_epoch(ts)
+        bucket = self._bucket(t)
+        fired: list[dict[str, Any]] = []
+
+        for metric in self.metrics:
+            if metric not in metrics:
+                continue
+            x = float(metrics[metric])
+            key = (camera_id, zone, metric, bucket)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OnlineStats()
+            level_key = (camera_id, zone, metric)
+            prev = self._level.get(level_key)
+            if prev is None:
+                level, decay = x, 1.0
+            else:
+                level = self.ewma_alpha * x + (1.0 - self.ewma_alpha) * prev[0]
+                decay = prev[1] * (1.0 - self.ewma_alpha) ** 2
+            self._level[level_key] = (level, decay)
+
+            # Comparar contra la linea base ANTES de incorporar la muestra
+            if stats.n >= self.min_samples:
+                # Varianza de la EWMA / varianza de una muestra (suma de pesos^2)
+                scale = math.sqrt(decay + self.ewma_alpha * (1.0 - decay) / (2.0 - self.ewma_alpha))
+                z = stats.zscore(level) / scale
+                if abs(z) >= self.z_threshold and t - self._last_fired.get(key, -math.inf) >= self.cooldown_s:
+                    alert = {
+                        "camera_id": camera_id,
+                        "zone": zone,
+                        "metric": metric,
+                        "value": x,
+                        "baseline_mean": stats.mean,
+                        "baseline_std": stats.std,
+                        "ewma": level,
+                        "zscore": z,
+                        "value_zscore": stats.zscore(x),
+                        "direction": "high" if z > 0 else "low",
+                        "hour_bucket": bucket,
+                        "timestamp_utc": datetime.fromtimestamp(t, timezone.utc).isoformat(),
+                    }
+                    self._last_fired[key] = t
+                    self.sink.emit(alert)
+                    fired.append(alert)
+
+            # La linea base aprende la muestra recortada a +-z_threshold desviaciones:
+            # un pico no la desplaza de golpe
+            if stats.n >= self.min_samples and stats.std > 0.0:
+                bound = self.z_threshold * stats.std
+                x = min(max(x, stats.mean - bound), stats.mean + bound)
+            stats.update(x)
+
+        return fired
+
+    def observe_detections(
+        self,
+        camera_id: str,
+        detections: list[dict],
+        image_width: int,
+        image_height: int,
+        ts: float | str | datetime | None = None,
+        zone: str = "all",
+        weights: dict | None = None,
+    ) -> list[dict[str, Any]]:
+        """Atajo para video: calcula solo las metricas vigiladas y observa."""
+        engine = MetricEngine(
+            detections=detections,
+            image_width=image_width,
+            image_height=image_height,
+            weights=weights or DEFAULT_WEIGHTS,
+        )
+        return self.observe(camera_id, engine.compute(self.metrics), ts=ts, zone=zone)
@@ -1,5 +1,9 @@
 from collections import Counter
 
+from src.metrics.registry import register_metric
+
+
+@register_metric("count_by_class_id", inputs=("detections",))
 def count_by_class(detections: list[dict]) -> dict:
     class_ids = [d["class_id"] for d in detections]
     return dict(Counter(class_ids))
@@ -1,3 +1,7 @@
+from src.metrics.registry import register_metric
+
+
+@register_metric("density_per_megapixel", inputs=("num_detections", "image_width", "image_height"))
 def density_per_megapixel(num_detections, image_width, image_height):
     mp = (image_width * image_height) / 1_000_000.0
     if mp <= 0:
@@ -0,0 +1,24 @@
+from src.metrics.registry import register_metric
+
+
+@register_metric("num_detections", inputs=("detections",), intermediate=True)
+def num_detections(detections: list[dict]) -> int:
+    return len(detections)
+
+
+@register_metric("box_areas", inputs=("detections",), intermediate=True)
+def box_areas(detections: list[dict]) -> list[float]:
+    areas = []
+    for d in detections:
+        x1, y1, x2, y2 = d["bbox_xyxy"]
+        areas.append(max(0.0, x2 - x1) * max(0.0, y2 - y1))
+    return areas
+
+
+@register_metric("centroids", inputs=("detections",), intermediate=True)
+def centroids(detections: list[dict]) -> list[tuple[float, float]]:
+    out = []
+    for d in detections:
+        x1, y1, x2, y2 = d["bbox_xyxy"]
+        out.append(((x1 + x2) / 2.0, (y1 + y2) / 2.0))
+    return out
@@ -1,5 +1,7 @@
 from collections import Counter
 
+from src.metrics.registry import register_metric
+
 DEFAULT_WEIGHTS = {
     "car": 1.0,
     "motorcycle": 0.6,
@@ -9,10 +11,12 @@ DEFAULT_WEIGHTS = {
     "unknown": 1.0,
 }
 
+@register_metric("count_by_typology", inputs=("detections",))
 def count_by_typology(detections: list[dict]) -> dict:
     types = [d.get("typology", "unknown") for d in detections]
     return dict(Counter(types))
 
+@register_metric("impact_score", inputs=("detections", "weights"))
 def impact_score(detections: list[dict], weights: dict) -> float:
     total = 0.0
     for d in detections:
@@ -20,5 +24,6 @@ def impact_score(detections: list[dict], weights: dict) -> float:
         total += float(weights.get(t, weights.get("unknown", 1.0)))
     return total
 
+@register_metric("congestion_index", inputs=("density_per_megapixel", "occupancy_ratio"))
 def congestion_index(density_per_megapixel: float, occupancy_ratio: float) -> float:
     return 0.7 * float(density_per_megapixel) + 0.3 * float(occupancy_ratio) * 100.0
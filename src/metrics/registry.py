@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Iterable
+
+# Registro de metricas: nombre de salida -> {"fn", "inputs", "intermediate"}
+# Las entradas son entradas base del motor (detections, image_width, ...) u
+# otras metricas registradas, de forma que el conjunto forma un DAG.
+METRICS: dict[str, dict[str, Any]] = {}
+
+BASE_INPUTS = ("detections", "image_width", "image_height", "weights")
+
+# Subconjunto barato para video (por frame) y conjunto completo (por escena/minuto)
+FRAME_METRICS = (
+    "count_by_typology",
+    "density_per_megapixel",
+    "occupancy_ratio",
+    "congestion_index",
+)
+SCENE_METRICS = (
+    "count_by_class_id",
+    "count_by_typology",
+    "occupancy_ratio",
+    "density_per_megapixel",
+    "impact_score",
+    "congestion_index",
+)
+
+
+def register_metric(name: str, inputs: Iterable[str], intermediate: bool = False) -> Callable:
+    """
+    Decorador: registra fn como productora de la salida `name`.
+    fn se llama con keywords cuyo nombre coincide con cada entrada declarada.
+    """
+    def deco(fn: Callable) -> Callable:
+        METRICS[name] = {"fn": fn, "inputs": tuple(inputs), "intermediate": intermediate}
+        return fn
+    return deco
+
+
+def _load_builtin_metrics() -> None:
+    # Import diferido: los modulos de metricas importan este registro
+    from src.metrics import counts, density, geometry, impact, occupancy  # noqa: F401
+
+
+def resolve_order(names: Iterable[str]) -> list[str]:
+    """Orden topologico de las metricas necesarias para calcular `names`."""
+    _load_builtin_metrics()
+    order: list[str] = []
+    done: set[str] = set()
+
+    def visit(name: str, stack: tuple[str, ...]) -> None:
+        if name in done or name in BASE_INPUTS:
+            return
+        if name in stack:
+            raise ValueError(f"Ciclo en metricas: {' -> '.join(stack + (name,))}")
+        spec = METRICS.get(name)
+        if spec is None:
+            raise KeyError(f"Metrica desconocida: {name}")
+        for dep in spec["inputs"]:
+            visit(dep, stack + (name,))
+        done.add(name)
+        order.append(name)
+
+    for n in names:
+        visit(n, ())
+    return order
+
+
+class MetricEngine:
+    """
+    Evalua bajo demanda solo las metricas pedidas y sus dependencias.
+    Los valores (incluidos intermedios como box_areas o centroids) se memorizan
+    en la instancia, asi que varias llamadas a compute() sobre la misma escena
+    no recalculan nada.
+    """
+
+    def __init__(self, **inputs: Any):
+        self._values: dict[str, Any] = dict(inputs)
+        self.timings_ms: dict[str, float] = {}
+
+    def compute(self, names: Iterable[str]) -> dict[str, Any]:
+        names = list(names)
+        for name in resolve_order(names):
+            if name in self._values:
+                continue
+            spec = METRICS[name]
+            missing = [d for d in spec["inputs"] if d not in self._values]
+            if missing:
+                raise KeyError(f"Faltan entradas para {name}: {missing}")
+
+            t0 = time.perf_counter()
+            self._values[name] = spec["fn"](**{d: self._values[d] for d in spec["inputs"]})
+            self.timings_ms[name] = (time.perf_counter() - t0) * 1000.0
+
+        return {n: self._values[n] for n in names}
+
+
+def compute_metrics(names: Iterable[str], **inputs: Any) -> dict[str, Any]:
+    """Atajo para una sola evaluacion sin reutilizar el motor."""
+    return MetricEngine(**inputs).compute(names)
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import atexit
+import bisect
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from src import config
+
+# Ventanas por defecto (segundos)
+DEFAULT_WINDOWS = {"1m": 60, "15m": 15 * 60, "1h": 60 * 60}
+
+# Claves del bloque de metricas que no son series (configuracion)
+SKIP_KEYS = {"impact_weights"}
+
+
+def to_epoch(ts: float | str | datetime | None) -> float:
+    """Acepta epoch, ISO-8601 o datetime; None = ahora."""
+    if ts is None:
+        return time.time()
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    if isinstance(ts, str):
+        return datetime.fromisoformat(ts).timestamp()
+    return float(ts)
+
+
+def flatten_metrics(metrics: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """{"count_by_typology": {"car": 3}} -> {"count_by_typology.car": 3.0}"""
+    out: dict[str, float] = {}
+    for k, v in metrics.items():
+        if not prefix and k in SKIP_KEYS:
+            continue
+        name = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten_metrics(v, prefix=f"{name}."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[name] = float(v)
+    return out
+
+
+def histogram_bucket(value: float) -> float:
+    """Cubeta fija de 3 cifras significativas: exacta para enteros < 1000, error relativo < 0.05%."""
+    return float(f"{value:.3g}")
+
+
+class RollingWindow:
+    """
+    Ventana deslizante por tiempo.
+    - media: suma acumulada, O(1) por muestra
+    - maximo: deque monotona, O(1) amortizado
+    - percentiles: histograma de cubetas fijas (histogram_bucket), O(1) por
+      muestra; la consulta recorre las cubetas ocupadas, no las muestras
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = float(seconds)
+        self._samples: deque[tuple[float, float, float]] = deque()
+        self._max: deque[tuple[float, float]] = deque()
+        self._hist: dict[float, int] = {}
+        self._buckets: list[float] = []  # cubetas ocupadas, ordenadas
+        self._sum = 0.0
+
+    def add(self, ts: float, value: float) -> None:
+        bucket = histogram_bucket(value)
+        self._samples.append((ts, value, bucket))
+        self._sum += value
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((ts, value))
+        n = self._hist.get(bucket)
+        if n:
+            self._hist[bucket] = n + 1
+        else:
+            # Solo una cubeta nueva toca la lista ordenada
+            self._hist[bucket] = 1
+            bisect.insort(self._buckets, bucket)
+        self._evict(ts)
+
+    def _evict(self, now: float) -> None:
+        limit = now - self.seconds
+        while self._samples and self._samples[0][0] <= limit:
+            _, v, bucket = self._samples.popleft()
+            self._sum -= v
+            n = self._hist[bucket] - 1
+            if n:
+                self._hist[bucket] = n
+            else:
+                del self._hist[bucket]
+                del self._buckets[bisect.bisect_left(self._buckets, bucket)]
+        while self._max and self._max[0][0] <= limit:
+            self._max.popleft()
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    def mean(self) -> float:
+        return self._sum / len(self._samples) if self._samples else 0.0
+
+    def max(self) -> float:
+        return self._max[0][1] if self._max else 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        rank = min(len(self._samples), max(1, math.ceil(q / 100.0 * len(self._samples))))
+        seen = 0
+        for bucket in self._buckets:
+            seen += self._hist[bucket]
+            if seen >= rank:
+                return bucket
+        return self._buckets[-1]
+
+    def stats(self, now: float | None = None) -> dict[str, float]:
+        if now is not None:
+            self._evict(now)
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "max": self.max(),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p95": self.percentile(95),
+        }
+
+
+class MetricStore:
+    """
+    Serie temporal local (SQLite) de metricas por camara/escena.
+
+    - samples: muestras crudas recientes
+    - rollups: agregados (count/sum/min/max) por bucket para datos antiguos
+    - ventanas deslizantes en memoria para dashboards y alertas
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path | None = None,
+        windows: dict[str, float] | None = None,
+        raw_retention_s: float = 24 * 3600,
+        rollup_resolution_s: float = 60,
+        downsample_every_s: float = 3600,
+    ):
+        self.db_path = Path(db_path) if db_path else Path(config.TIMESERIES_DB_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.windows = windows or DEFAULT_WINDOWS
+        self.raw_retention_s = raw_retention_s
+        self.rollup_resolution_s = rollup_resolution_s
+        self.downsample_every_s = downsample_every_s
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS samples (
+                camera_id TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                ts REAL NOT NULL,
+                value REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_samples ON samples(camera_id, metric, ts);
+            CREATE TABLE IF NOT EXISTS rollups (
+                camera_id TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                bucket_ts REAL NOT NULL,
+                resolution REAL NOT NULL,
+                count INTEGER NOT NULL,
+                sum REAL NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                PRIMARY KEY (camera_id, metric, resolution, bucket_ts)
+            );
+            """
+        )
+        self._rolling: dict[tuple[str, str, str], RollingWindow] = {}
+        self._last_downsample = time.time()
+        self._warm_windows()
+
+    # ---- escritura ----
+
+    def record(
+        self,
+        camera_id: str,
+        metrics: dict[str, Any],
+        ts: float | str | datetime | None = None,
+    ) -> None:
+        """Registra el bloque `metrics` de un bundle (o de un frame)."""
+        t = to_epoch(ts)
+        flat = flatten_metrics(metrics)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO samples(camera_id, metric, ts, value) VALUES (?, ?, ?, ?)",
+                [(camera_id, m, t, v) for m, v in flat.items()],
+            )
+            self._conn.commit()
+            for m, v in flat.items():
+                self._push(camera_id, m, t, v)
+
+        if t - self._last_downsample >= self.downsample_every_s:
+            self.downsample(now=t)
+
+    def _push(self, camera_id: str, metric: str, ts: float, value: float) -> None:
+        for wname, seconds in self.windows.items():
+            key = (camera_id, metric, wname)
+            win = self._rolling.get(key)
+            if win is None:
+                win = self._rolling[key] = RollingWindow(seconds)
+            win.add(ts, value)
+
+    def _warm_windows(self) -> None:
+        """Reconstruye las ventanas en memoria desde las muestras recientes."""
+        horizon = time.time() - max(self.windows.values())
+        rows = self._conn.execute(
+            "SELECT camera_id, metric, ts, value FROM samples WHERE ts > ? ORDER BY ts",
+            (horizon,),
+        )
+        for camera_id, metric, ts, value in rows:
+            self._push(camera_id, metric, ts, value)
+
+    # ---- lectura ----
+
+    def window_stats(
+        self,
+        camera_id: str,
+        metric: str,
+        window: str = "1m",
+        now: float | None = None,
+    ) -> dict[str, float]:
+        """Media, maximo y percentiles de la ventana sin tocar disco (`now` por defecto: ahora)."""
+        win = self._rolling.get((camera_id, metric, window))
+        if win is None:
+            return RollingWindow(self.windows.get(window, 60)).stats()
+        with self._lock:
+            return win.stats(now=time.time() if now is None else now)
+
+    def query(
+        self,
+        camera_id: str,
+        metric: str,
+        start: float | str | datetime | None = None,
+        end: float | str | datetime | None = None,
+    ) -> list[dict[str, float]]:
+        """
+        Rango [start, end] ordenado por tiempo. Los tramos ya submuestreados
+        devuelven la media del bucket junto con min/max/count.
+        """
+        t0 = to_epoch(start) if start is not None else 0.0
+        t1 = to_epoch(end) if end is not None else float("inf")
+        with self._lock:
+            rolled = self._conn.execute(
+                "SELECT bucket_ts, count, sum, min, max FROM rollups "
+                "WHERE camera_id = ? AND metric = ? AND bucket_ts >= ? AND bucket_ts <= ? "
+                "ORDER BY bucket_ts",
+                (camera_id, metric, t0, t1),
+            ).fetchall()
+            raw = self._conn.execute(
+                "SELECT ts, value FROM samples "
+                "WHERE camera_id = ? AND metric = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (camera_id, metric, t0, t1),
+            ).fetchall()
+
+        out = [
+            {"ts": b, "value": s / c, "count": c, "min": mn, "max": mx}
+            for b, c, s, mn, mx in rolled
+        ]
+        out.extend({"ts": ts, "value": v, "count": 1, "min": v, "max": v} for ts, v in raw)
+        out.sort(key=lambda r: r["ts"])
+        return out
+
+    def cameras(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT camera_id FROM samples UNION SELECT DISTINCT camera_id FROM rollups"
+            ).fetchall()
+        return sorted(r[0] for r in rows)
+
+    # ---- mantenimiento ----
+
+    def downsample(self, now: float | None = None) -> int:
+        """
+        Agrega las muestras crudas mas antiguas que raw_retention_s en buckets
+        de rollup_resolution_s y las borra. Devuelve filas crudas eliminadas.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.raw_retention_s
+        res = float(self.rollup_resolution_s)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO rollups(camera_id, metric, bucket_ts, resolution, count, sum, min, max)
+                SELECT camera_id, metric, CAST(ts / :res AS INTEGER) * :res AS b, :res,
+                       COUNT(*), SUM(value), MIN(value), MAX(value)
+                FROM samples WHERE ts < :cutoff
+                GROUP BY camera_id, metric, b
+                ON CONFLICT(camera_id, metric, resolution, bucket_ts) DO UPDATE SET
+                    count = count + excluded.count,
+                    sum = sum + excluded.sum,
+                    min = MIN(min, excluded.min),
+                    max = MAX(max, excluded.max)
+                """,
+                {"res": res, "cutoff": cutoff},
+            )
+            deleted = self._conn.execute("DELETE FROM samples WHERE ts < ?", (cutoff,)).rowcount
+            self._conn.commit()
+            self._last_downsample = now
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_STORES: dict[str, MetricStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def shared_store(db_path: str | Path | None = None) -> MetricStore:
+    """Un MetricStore por fichero y proceso: abrirlo recarga las ventanas desde disco."""
+    key = str(Path(db_path) if db_path else Path(config.TIMESERIES_DB_PATH))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = MetricStore(key)
+    return store
+
+
+def close_shared_stores() -> None:
+    """Cierra los stores de shared_store(); se llama al terminar el proceso."""
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+        _STORES.clear()
+    for store in stores:
+        store.close()
+
+
+atexit.register(close_shared_stores)
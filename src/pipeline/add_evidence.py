@@ -1,34 +1,69 @@
 from pathlib import Path
 import json
 
-from src.blockchain.hashing import hash_bundle
+from src.blockchain.hashing import compute_file_hash, hash_bundle
 from src.blockchain.adapter import get_blockchain_adapter
 from src.config import ANALYSIS_DIR
+from src.storage.bundle_codec import load_bundle
 
 
-def main(bundle_path: Path) -> None:
-    bundle = json.loads(bundle_path.read_text(encoding="utf-8"))
+def resolve_image_hash(bundle: dict) -> str | None:
+    """Hash de la imagen: el del bundle si ya viene (pipeline), si no se calcula del fichero."""
+    if bundle.get("image_hash"):
+        return bundle["image_hash"]
+    image_path = bundle.get("image_path")
+    if image_path and Path(image_path).is_file():
+        return compute_file_hash(image_path)
+    return None
+
+
+def register_bundle(bundle: dict, scene_id: str | None = None) -> tuple[dict, dict]:
+    """
+    Hashea y registra un bundle en memoria. Anade el bloque `evidence` al
+    bundle y devuelve (bundle, resultado del registro).
+    """
+    image_hash = resolve_image_hash(bundle)
 
     evidence = hash_bundle(bundle)
-    bundle["evidence"] = evidence
 
     adapter = get_blockchain_adapter()
 
+    # El payload es el bundle tal y como se hasheo (sin el bloque evidence)
     evidence_record = {
         "analysis_hash": evidence["sha256"],
-        "scene_id": bundle.get("scene_id", bundle_path.stem),
+        "scene_id": bundle.get("scene_id", scene_id),
         "timestamp_utc": evidence["timestamp_utc"],
-        "analysis_payload": bundle,
+        "analysis_payload": {k: v for k, v in bundle.items() if k != "evidence"},
     }
+    if image_hash:
+        evidence_record["image_hash"] = image_hash
 
+    # Idempotente: si el mismo analisis ya estaba registrado se devuelve ese registro
     result = adapter.register(evidence_record)
+    if result.get("duplicate") and result.get("timestamp_utc"):
+        evidence["timestamp_utc"] = result["timestamp_utc"]
+    bundle["evidence"] = evidence
+    return bundle, result
+
+
+def main(bundle_path: Path) -> None:
+    # Acepta bundle JSON o compacto (.npz); el hash se calcula sobre la forma decodificada
+    bundle, result = register_bundle(load_bundle(bundle_path), scene_id=bundle_path.stem)
+    evidence = bundle["evidence"]
+    image_hash = resolve_image_hash(bundle)
 
     out = ANALYSIS_DIR / f"{bundle_path.stem}_evidence.json"
     out.write_text(json.dumps(bundle, indent=2), encoding="utf-8")
 
     print("EVIDENCE SHA256:", evidence["sha256"])
     print("EVIDENCE TIMESTAMP:", evidence["timestamp_utc"])
+    if image_hash:
+        print("IMAGE SHA256:", image_hash)
     print("BLOCKCHAIN STATUS:", result["status"])
+    if result.get("duplicate"):
+        print("Ya registrado anteriormente (sin nueva transaccion)")
+    if result["status"] == "pending":
+        print("Broadcast en cola (worker: python -m src.blockchain.broadcast_queue)")
     if "tx_id" in result:
         print("TX ID:", result["tx_id"])
     if "explorer_url" in result:
@@ -1,14 +1,16 @@
 from pathlib import Path
-import json
 import cv2
+import numpy as np
 from ultralytics import YOLO
 
 from src.vision.infer import run_inference, save_outputs
 from src.vision.typology import crop_with_padding, classify_typology_crop
-from src.pipeline.run_metrics import main as run_metrics_main
-from src.pipeline.add_evidence import main as add_evidence_main
-from src.metrics.impact import DEFAULT_WEIGHTS, count_by_typology, impact_score, congestion_index
-from src.config import RUNS_DIR, ANALYSIS_DIR
+from src.pipeline.run_metrics import build_bundle
+from src.pipeline.add_evidence import register_bundle
+from src.blockchain.hashing import compute_bytes_hash
+from src.metrics.impact import DEFAULT_WEIGHTS
+from src.metrics.timeseries import MetricStore, shared_store
+from src.storage.results_store import ResultsStore, shared_results_store
 
 def analyze_scene(
     image_path: Path,
@@ -17,16 +19,27 @@ def analyze_scene(
     weights: dict | None = None,
     conf_det: float = 0.25,
     conf_type: float = 0.25,
+    camera_id: str | None = None,
+    store: MetricStore | None = None,
+    results: ResultsStore | None = None,
 ) -> dict:
     """
     Ejecuta: deteccion (MyE) => tipologia (COCO sobre recortes) => metricas => evidencia.
-    Devuelve el bundle final como dict.
+    Devuelve el bundle final como dict. `store`: serie temporal donde se
+    registran las metricas; `results`: almacen columnar de la escena (por
+    defecto, los compartidos del proceso). No escribe JSON por escena.
     """
     weights = weights or DEFAULT_WEIGHTS
 
-    analysis = run_inference(image_path, detector_model_path, conf_threshold=conf_det)
+    # Una sola lectura del fichero: los mismos bytes dan el hash de evidencia y la imagen
+    data = image_path.read_bytes()
+    image_hash = compute_bytes_hash(data)
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"No se pudo decodificar la imagen: {image_path}")
+
+    analysis = run_inference(image_path, detector_model_path, conf_threshold=conf_det, image=img)
 
-    img = cv2.imread(str(image_path))
     type_model = YOLO(str(typology_model_path))
 
     for det in analysis["detections"]:
@@ -35,27 +48,18 @@ def analyze_scene(
         det["typology"] = typ
         det["typology_confidence"] = typ_conf
 
-    save_outputs(image_path, analysis)
-    det_json_path = ANALYSIS_DIR / f"{image_path.stem}.json"
-
-    run_metrics_main(det_json_path, image_path)
-    bundle_path = ANALYSIS_DIR / f"{image_path.stem}_bundle.json"
-    bundle = json.loads(bundle_path.read_text(encoding="utf-8"))
-
-    dets = bundle["detections"]["detections"]
-    typ_counts = count_by_typology(dets)
-    score = impact_score(dets, weights)
-    cong = congestion_index(bundle["metrics"]["density_per_megapixel"], bundle["metrics"]["occupancy_ratio"])
+    save_outputs(image_path, analysis, image=img, write_json=False)
 
-    bundle["metrics"]["count_by_typology"] = typ_counts
-    bundle["metrics"]["impact_score"] = score
-    bundle["metrics"]["congestion_index"] = cong
-    bundle["metrics"]["impact_weights"] = weights
+    # Metricas en una sola pasada (sin releer el JSON de detecciones ni la imagen)
+    h, w = img.shape[:2]
+    bundle = build_bundle(analysis, image_path, w, h, weights, image_hash=image_hash)
 
-    bundle_path.write_text(json.dumps(bundle, indent=2), encoding="utf-8")
+    # Serie temporal por camara: dashboards y alertas no releen bundles.
+    # Un store para toda la ejecucion, no uno (con su recarga de ventanas) por escena
+    (store or shared_store()).record(camera_id or image_path.stem, bundle["metrics"])
 
-    add_evidence_main(bundle_path)
-    evidence_path = ANALYSIS_DIR / f"{image_path.stem}_bundle_evidence.json"
-    bundle_evidence = json.loads(evidence_path.read_text(encoding="utf-8"))
+    # Evidencia en memoria; la escena va al almacen columnar en lotes compartidos
+    bundle_evidence, _ = register_bundle(bundle)
+    (results or shared_results_store()).append_bundle(bundle_evidence, camera_id=camera_id)
 
     return bundle_evidence
@@ -1,41 +1,71 @@
 from pathlib import Path
 import json
 import cv2
+import numpy as np
 
-from src.metrics.counts import count_by_class
-from src.metrics.occupancy import occupancy_ratio
-from src.metrics.density import density_per_megapixel
+from src.metrics.impact import DEFAULT_WEIGHTS
+from src.metrics.registry import MetricEngine, SCENE_METRICS
+from src.blockchain.hashing import compute_bytes_hash
 from src.config import ANALYSIS_DIR
 
-def main(json_path: Path, image_path: Path) -> None:
-    analysis = json.loads(json_path.read_text(encoding="utf-8"))
-    detections = analysis.get("detections", [])
-    print("JSON leído:", json_path)
-    print("Num detections:", len(analysis.get("detections", [])))
-    print("ANALYSIS_DIR:", ANALYSIS_DIR)
 
-    img = cv2.imread(str(image_path))
-    h, w = img.shape[:2]
+def build_bundle(
+    analysis: dict,
+    image_path: Path,
+    image_width: int,
+    image_height: int,
+    weights: dict | None = None,
+    image_hash: str | None = None,
+) -> dict:
+    """
+    Calcula todas las metricas de escena en una sola pasada del motor de
+    metricas (los intermedios compartidos se calculan una vez) y monta el bundle.
+    `image_hash` (SHA-256 de los bytes de la imagen) entra en el bundle y, por
+    tanto, en el hash de la evidencia.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    engine = MetricEngine(
+        detections=analysis.get("detections", []),
+        image_width=image_width,
+        image_height=image_height,
+        weights=weights,
+    )
+    metrics = engine.compute(SCENE_METRICS)
+    metrics["impact_weights"] = weights
 
-    metrics = {
-        "count_by_class_id": count_by_class(detections),
-        "occupancy_ratio": occupancy_ratio(detections, w, h),
-        "density_per_megapixel": density_per_megapixel(len(detections), w, h),
-    }
+    for name, ms in engine.timings_ms.items():
+        print(f"Metrica {name}: {ms:.3f} ms")
 
     bundle = {
         "scene_id": image_path.stem,
         "image_path": str(image_path),
-        "image_width": w,
-        "image_height": h,
+        "image_width": image_width,
+        "image_height": image_height,
         "detections": analysis,
         "metrics": metrics,
     }
+    if image_hash:
+        bundle["image_hash"] = image_hash
+    return bundle
+
+
+def main(json_path: Path, image_path: Path, weights: dict | None = None) -> dict:
+    analysis = json.loads(json_path.read_text(encoding="utf-8"))
+    print("JSON leído:", json_path)
+    print("Num detections:", len(analysis.get("detections", [])))
+    print("ANALYSIS_DIR:", ANALYSIS_DIR)
+
+    data = image_path.read_bytes()
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    h, w = img.shape[:2]
+
+    bundle = build_bundle(analysis, image_path, w, h, weights, image_hash=compute_bytes_hash(data))
 
     out = ANALYSIS_DIR / f"{image_path.stem}_bundle.json"
     print("Guardando bundle en:", out)
     out.write_text(json.dumps(bundle, indent=2), encoding="utf-8")
     print(f"Bundle guardado en: {out}")
+    return bundle
 
 if __name__ == "__main__":
     import argparse
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.blockchain.canonical import canonical_bytes
+
+try:
+    import zstandard as zstd
+    _ZSTD_AVAILABLE = True
+except ImportError:
+    _ZSTD_AVAILABLE = False
+
+
+# Blobs: <root>/<hash[:2]>/<hash>.zst (zstd) o .zz (zlib si no hay zstandard)
+# Diccionarios: <root>/dicts/<dict_id>.zdict (los frames llevan su dict_id)
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 9
+DICT_SIZE = 64 * 1024
+
+
+def default_blob_dir(ledger_path: Path) -> Path:
+    return ledger_path.with_name(ledger_path.stem + ".blobs")
+
+
+class BlobStore:
+    """
+    Almacen direccionado por contenido para los payloads de analisis.
+
+    La clave es el SHA-256 de la forma canonica (= analysis_hash), asi que cada
+    blob se autoverifica y escribir dos veces el mismo payload no duplica nada.
+    Se guardan los bytes canonicos comprimidos; el dict y la forma canonica se
+    reconstruyen al leer.
+    """
+
+    def __init__(self, root: str | Path, use_zstd: bool | None = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.use_zstd = _ZSTD_AVAILABLE if use_zstd is None else (use_zstd and _ZSTD_AVAILABLE)
+        self._dicts: dict[int, Any] = {}
+        self._compressor = None
+        if self.use_zstd:
+            current = self._current_dict()
+            self._compressor = zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=current) if current \
+                else zstd.ZstdCompressor(level=ZSTD_LEVEL)
+
+    # ---- diccionarios ----
+
+    @property
+    def dict_dir(self) -> Path:
+        return self.root / "dicts"
+
+    def _current_dict(self):
+        current = self.dict_dir / "current"
+        if not current.exists():
+            return None
+        return self._load_dict(int(current.read_text().strip()))
+
+    def _load_dict(self, dict_id: int):
+        d = self._dicts.get(dict_id)
+        if d is None:
+            d = zstd.ZstdCompressionDict((self.dict_dir / f"{dict_id}.zdict").read_bytes())
+            self._dicts[dict_id] = d
+        return d
+
+    def train_dictionary(self, max_samples: int = 2000, dict_size: int = DICT_SIZE) -> int:
+        """Entrena un diccionario zstd con una muestra de los blobs existentes. Devuelve su dict_id."""
+        if not _ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard no instalado: pip install zstandard")
+        keys = list(self.keys())
+        random.shuffle(keys)
+        samples = [self.get_bytes(k) for k in keys[:max_samples]]
+        if len(samples) < 8:
+            raise ValueError(f"Muy pocas muestras para entrenar ({len(samples)})")
+        d = zstd.train_dictionary(dict_size, samples)
+        self.dict_dir.mkdir(exist_ok=True)
+        (self.dict_dir / f"{d.dict_id()}.zdict").write_bytes(d.as_bytes())
+        (self.dict_dir / "current").write_text(str(d.dict_id()))
+        self._dicts[d.dict_id()] = d
+        self._compressor = zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=d)
+        return d.dict_id()
+
+    # ---- escritura ----
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def _existing(self, key: str) -> Path | None:
+        for suffix in (".zst", ".zz"):
+            p = self._path(key, suffix)
+            if p.exists():
+                return p
+        return None
+
+    def put_bytes(self, canon: bytes) -> str:
+        """Guarda bytes canonicos; devuelve su hash. Idempotente."""
+        key = hashlib.sha256(canon).hexdigest()
+        if self._existing(key) is not None:
+            return key
+        if self._compressor is not None:
+            data, suffix = self._compressor.compress(canon), ".zst"
+        else:
+            data, suffix = zlib.compress(canon, ZLIB_LEVEL), ".zz"
+
+        path = self._path(key, suffix)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return key
+
+    def put(self, payload: dict[str, Any]) -> str:
+        return self.put_bytes(canonical_bytes(payload))
+
+    # ---- lectura ----
+
+    def get_bytes(self, key: str) -> bytes | None:
+        path = self._existing(key)
+        if path is None:
+            return None
+        data = path.read_bytes()
+        if path.suffix == ".zz":
+            return zlib.decompress(data)
+        if not _ZSTD_AVAILABLE:
+            raise RuntimeError(f"{path.name} esta comprimido con zstd: pip install zstandard")
+        dict_id = zstd.get_frame_parameters(data).dict_id
+        dctx = zstd.ZstdDecompressor(dict_data=self._load_dict(dict_id)) if dict_id else zstd.ZstdDecompressor()
+        return dctx.decompress(data)
+
+    def get_canonical(self, key: str) -> str | None:
+        canon = self.get_bytes(key)
+        return canon.decode("utf-8") if canon is not None else None
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        canon = self.get_bytes(key)
+        return json.loads(canon) if canon is not None else None
+
+    def verify(self, key: str) -> bool:
+        """El blob existe y su contenido sigue hasheando a su clave."""
+        canon = self.get_bytes(key)
+        return canon is not None and hashlib.sha256(canon).hexdigest() == key
+
+    def __contains__(self, key: str) -> bool:
+        return self._existing(key) is not None
+
+    def keys(self) -> Iterator[str]:
+        for sub in sorted(self.root.iterdir()):
+            if sub.is_dir() and len(sub.name) == 2:
+                for p in sub.iterdir():
+                    if p.suffix in (".zst", ".zz"):
+                        yield p.stem
+
+    def stats(self) -> dict[str, Any]:
+        n = size = 0
+        for key in self.keys():
+            n += 1
+            size += self._existing(key).stat().st_size
+        return {"blobs": n, "bytes": size, "codec": "zstd" if self.use_zstd else "zlib"}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src import config
+
+    p = argparse.ArgumentParser(description="Almacen de payloads del ledger")
+    p.add_argument("--ledger", default=str(config.LEDGER_PATH))
+    p.add_argument("--migrate", action="store_true", help="mover payloads inline del ledger al almacen")
+    p.add_argument("--train", action="store_true", help="entrenar diccionario zstd con los blobs existentes")
+    args = p.parse_args()
+
+    ledger = Path(args.ledger)
+    if args.migrate:
+        from src.blockchain.adapter import LocalLedgerAdapter
+
+        n = LocalLedgerAdapter(ledger).compact(detach_payloads=True)
+        print(f"Migrados/compactados {n} registros de {ledger}")
+    store = BlobStore(default_blob_dir(ledger))
+    if args.train:
+        print("Diccionario:", store.train_dictionary())
+    print(json.dumps(store.stats(), indent=2))
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import copy
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+CODEC_NAME = "mye-npz"
+CODEC_VERSION = 1
+
+# Campos de deteccion que se guardan como arrays tipados
+DET_FIELDS = ("class_id", "class_name", "confidence", "bbox_xyxy", "typology", "typology_confidence")
+
+# Cuantizacion: coordenadas a 1/100 px y confianzas a 1e-4
+BBOX_SCALE = 100
+CONF_SCALE = 10_000
+
+
+def _split_detections(bundle: dict[str, Any]) -> tuple[dict[str, Any], list[dict], str]:
+    """Separa la lista de detecciones del resto del bundle (misma logica que extract_detections)."""
+    header = copy.deepcopy({k: v for k, v in bundle.items() if k != "detections"})
+    d = bundle.get("detections", {})
+    if isinstance(d, dict) and isinstance(d.get("detections"), list):
+        header["detections"] = {k: v for k, v in d.items() if k != "detections"}
+        return header, d["detections"], "nested"
+    if isinstance(d, list):
+        return header, d, "flat"
+    if "detections" in bundle:
+        header["detections"] = d
+    return header, [], "none"
+
+
+def _vocab(values: list[str | None]) -> tuple[list[str | None], np.ndarray]:
+    vocab: list[str | None] = []
+    index: dict[str | None, int] = {}
+    codes = np.empty(len(values), dtype=np.uint16)
+    for i, v in enumerate(values):
+        if v not in index:
+            index[v] = len(vocab)
+            vocab.append(v)
+        codes[i] = index[v]
+    return vocab, codes
+
+
+def encode_bundle(bundle: dict[str, Any]) -> bytes:
+    """
+    Bundle -> NPZ comprimido con una cabecera JSON.
+    Las detecciones se guardan como columnas tipadas (int32/uint16) con
+    coordenadas y confianzas cuantizadas; los textos repetidos como diccionario.
+    """
+    header, dets, layout = _split_detections(bundle)
+    n = len(dets)
+
+    present = np.zeros((n, len(DET_FIELDS)), dtype=bool)
+    for i, det in enumerate(dets):
+        for j, field in enumerate(DET_FIELDS):
+            present[i, j] = field in det
+
+    def col(field: str, default: Any) -> list[Any]:
+        return [det.get(field, default) for det in dets]
+
+    bbox = np.array(col("bbox_xyxy", [0.0, 0.0, 0.0, 0.0]), dtype=np.float64).reshape(n, 4)
+    class_names, class_name_codes = _vocab(col("class_name", None))
+    typologies, typology_codes = _vocab(col("typology", None))
+
+    extras = {
+        str(i): {k: v for k, v in det.items() if k not in DET_FIELDS}
+        for i, det in enumerate(dets)
+        if any(k not in DET_FIELDS for k in det)
+    }
+
+    meta = {
+        "codec": CODEC_NAME,
+        "version": CODEC_VERSION,
+        "layout": layout,
+        "bbox_scale": BBOX_SCALE,
+        "conf_scale": CONF_SCALE,
+        "class_names": class_names,
+        "typologies": typologies,
+        "extras": extras,
+        "bundle": header,
+    }
+
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        header=np.frombuffer(json.dumps(meta, separators=(",", ":")).encode("utf-8"), dtype=np.uint8),
+        present=np.packbits(present, axis=None),
+        class_id=np.array(col("class_id", 0), dtype=np.int32),
+        class_name=class_name_codes,
+        confidence=np.rint(np.array(col("confidence", 0.0), dtype=np.float64) * CONF_SCALE).astype(np.uint16),
+        bbox=np.rint(bbox * BBOX_SCALE).astype(np.int32),
+        typology=typology_codes,
+        typology_confidence=np.rint(
+            np.array(col("typology_confidence", 0.0), dtype=np.float64) * CONF_SCALE
+        ).astype(np.uint16),
+    )
+    return buf.getvalue()
+
+
+def decode_bundle(data: bytes) -> dict[str, Any]:
+    """
+    NPZ -> bundle con la misma forma que produce el pipeline (la que espera
+    extract_detections). Los valores cuantizados se decodifican siempre igual,
+    asi que compute_hash sobre el resultado es estable.
+    """
+    with np.load(io.BytesIO(data), allow_pickle=False) as z:
+        meta = json.loads(z["header"].tobytes().decode("utf-8"))
+        if meta.get("codec") != CODEC_NAME:
+            raise ValueError(f"Codec desconocido: {meta.get('codec')}")
+
+        n = len(z["class_id"])
+        present = np.unpackbits(z["present"], count=n * len(DET_FIELDS)).reshape(n, len(DET_FIELDS))
+        bbox_scale = float(meta["bbox_scale"])
+        conf_scale = float(meta["conf_scale"])
+
+        columns = {
+            "class_id": z["class_id"].tolist(),
+            "class_name": [meta["class_names"][c] for c in z["class_name"].tolist()],
+            "confidence": (z["confidence"] / conf_scale).tolist(),
+            "bbox_xyxy": (z["bbox"] / bbox_scale).tolist(),
+            "typology": [meta["typologies"][c] for c in z["typology"].tolist()],
+            "typology_confidence": (z["typology_confidence"] / conf_scale).tolist(),
+        }
+
+    dets: list[dict[str, Any]] = []
+    for i in range(n):
+        det = {f: columns[f][i] for j, f in enumerate(DET_FIELDS) if present[i, j]}
+        det.update(meta["extras"].get(str(i), {}))
+        dets.append(det)
+
+    bundle = meta["bundle"]
+    if meta["layout"] == "nested":
+        bundle["detections"]["detections"] = dets
+    elif meta["layout"] == "flat":
+        bundle["detections"] = dets
+    return bundle
+
+
+def save_bundle(path: str | Path, bundle: dict[str, Any]) -> Path:
+    """Guarda en compacto si la extension es .npz, si no en JSON."""
+    path = Path(path)
+    if path.suffix == ".npz":
+        path.write_bytes(encode_bundle(bundle))
+    else:
+        path.write_text(json.dumps(bundle, indent=2), encoding="utf-8")
+    return path
+
+
+def load_bundle(path: str | Path) -> dict[str, Any]:
+    path = Path(path)
+    if path.suffix == ".npz":
+        return decode_bundle(path.read_bytes())
+    return json.loads(path.read_text(encoding="utf-8"))
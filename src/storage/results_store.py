@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import atexit
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from src import config
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    _ARROW_AVAILABLE = True
+except ImportError:
+    _ARROW_AVAILABLE = False
+
+
+# Particiones hive: <root>/<tabla>/date=YYYY-MM-DD/camera=<id>/part-<uuid>.parquet
+PARTITION_FIELDS = ("date", "camera")
+
+if _ARROW_AVAILABLE:
+    DETECTIONS_SCHEMA = pa.schema([
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("scene_id", pa.string()),
+        ("det_index", pa.int32()),
+        ("class_id", pa.int32()),
+        ("class_name", pa.dictionary(pa.int32(), pa.string())),
+        ("confidence", pa.float32()),
+        ("typology", pa.dictionary(pa.int32(), pa.string())),
+        ("typology_confidence", pa.float32()),
+        ("x1", pa.float32()),
+        ("y1", pa.float32()),
+        ("x2", pa.float32()),
+        ("y2", pa.float32()),
+    ])
+
+    SCENES_SCHEMA = pa.schema([
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("scene_id", pa.string()),
+        ("image_path", pa.string()),
+        ("image_width", pa.int32()),
+        ("image_height", pa.int32()),
+        ("num_detections", pa.int32()),
+        ("occupancy_ratio", pa.float64()),
+        ("density_per_megapixel", pa.float64()),
+        ("impact_score", pa.float64()),
+        ("congestion_index", pa.float64()),
+        ("count_by_typology", pa.string()),  # JSON compacto
+        ("analysis_hash", pa.string()),
+    ])
+
+    PARTITIONING = ds.partitioning(
+        pa.schema([("date", pa.string()), ("camera", pa.string())]),
+        flavor="hive",
+    )
+
+
+def _require_arrow() -> None:
+    if not _ARROW_AVAILABLE:
+        raise RuntimeError("pyarrow no instalado: pip install pyarrow")
+
+
+def _parse_ts(ts: str | datetime | None) -> datetime:
+    if ts is None:
+        return datetime.now(timezone.utc)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+class ResultsStore:
+    """
+    Almacen columnar append-only (Parquet) de detecciones y metricas de escena.
+
+    Las filas se acumulan en memoria por particion y se escriben en lotes (un
+    fichero por particion y lote, con row groups de `row_group_size`), asi que
+    el numero de ficheros crece con los lotes y no con las escenas. Un lote se
+    cierra al llegar a `row_group_size` filas o, con `flush_interval_s`, cuando
+    la fila mas antigua lleva ese tiempo en memoria.
+    """
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        row_group_size: int = 50_000,
+        flush_interval_s: float | None = None,
+    ):
+        _require_arrow()
+        self.root = Path(root) if root else Path(config.RESULTS_STORE_DIR)
+        self.row_group_size = row_group_size
+        self.flush_interval_s = flush_interval_s
+        self._det_rows: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        self._scene_rows: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        self._pending = 0
+        self._oldest: float | None = None  # monotonic de la primera fila del lote
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.flush()
+
+    # ---- escritura ----
+
+    def append_bundle(
+        self,
+        bundle: dict[str, Any],
+        camera_id: str | None = None,
+        timestamp_utc: str | datetime | None = None,
+    ) -> None:
+        """
+        Anade un bundle (con o sin bloque `evidence`) al buffer. Sin camara
+        conocida la escena va a la particion config.RESULTS_DEFAULT_CAMERA.
+        """
+        evidence = bundle.get("evidence") or {}
+        ts = _parse_ts(timestamp_utc or evidence.get("timestamp_utc"))
+        scene_id = str(bundle.get("scene_id", "unknown"))
+        camera = str(camera_id or bundle.get("camera_id") or config.RESULTS_DEFAULT_CAMERA)
+        part = (ts.date().isoformat(), camera)
+
+        d = bundle.get("detections", {})
+        dets = d.get("detections", []) if isinstance(d, dict) else (d or [])
+        det_rows: list[dict[str, Any]] = []
+        for i, det in enumerate(dets):
+            x1, y1, x2, y2 = det["bbox_xyxy"]
+            det_rows.append({
+                "ts": ts,
+                "scene_id": scene_id,
+                "det_index": i,
+                "class_id": int(det.get("class_id", -1)),
+                "class_name": det.get("class_name"),
+                "confidence": float(det.get("confidence", 0.0)),
+                "typology": det.get("typology", "unknown"),
+                "typology_confidence": float(det.get("typology_confidence", 0.0)),
+                "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            })
+
+        m = bundle.get("metrics", {})
+        scene_row = {
+            "ts": ts,
+            "scene_id": scene_id,
+            "image_path": bundle.get("image_path"),
+            "image_width": bundle.get("image_width"),
+            "image_height": bundle.get("image_height"),
+            "num_detections": len(dets),
+            "occupancy_ratio": m.get("occupancy_ratio"),
+            "density_per_megapixel": m.get("density_per_megapixel"),
+            "impact_score": m.get("impact_score"),
+            "congestion_index": m.get("congestion_index"),
+            "count_by_typology": json.dumps(m.get("count_by_typology", {}), sort_keys=True),
+            "analysis_hash": evidence.get("sha256"),
+        }
+
+        with self._lock:
+            self._det_rows.setdefault(part, []).extend(det_rows)
+            self._scene_rows.setdefault(part, []).append(scene_row)
+            self._pending += len(det_rows) + 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if self._pending >= self.row_group_size or (
+                self.flush_interval_s is not None
+                and time.monotonic() - self._oldest >= self.flush_interval_s
+            ):
+                self.flush()
+
+    def flush(self) -> int:
+        """Escribe el buffer como nuevos ficheros Parquet. Devuelve filas escritas."""
+        written = 0
+        with self._lock:
+            for table_name, buf, schema in (
+                ("detections", self._det_rows, DETECTIONS_SCHEMA),
+                ("scenes", self._scene_rows, SCENES_SCHEMA),
+            ):
+                for (date, camera), rows in buf.items():
+                    if not rows:
+                        continue
+                    out_dir = self.root / table_name / f"date={date}" / f"camera={camera}"
+                    out_dir.mkdir(parents=True, exist_ok=True)
+                    table = pa.Table.from_pylist(rows, schema=schema)
+                    tmp = out_dir / f".part-{uuid.uuid4().hex}.parquet.tmp"
+                    pq.write_table(table, tmp, row_group_size=self.row_group_size, compression="zstd")
+                    tmp.rename(out_dir / tmp.name[1:-len(".tmp")])
+                    written += len(rows)
+                buf.clear()
+            self._pending = 0
+            self._oldest = None
+        return written
+
+    # ---- lectura ----
+
+    def _read(
+        self,
+        table_name: str,
+        schema: Any,
+        start: str | datetime | None,
+        end: str | datetime | None,
+        scene_ids: Iterable[str] | None,
+        camera_ids: Iterable[str] | None,
+        extra: Any = None,
+        columns: list[str] | None = None,
+    ) -> Any:
+        path = self.root / table_name
+        if not path.exists():
+            return schema.empty_table()
+
+        full_schema = schema.append(pa.field("date", pa.string())).append(pa.field("camera", pa.string()))
+        dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING, schema=full_schema)
+
+        flt = None
+
+        def _and(expr: Any) -> None:
+            nonlocal flt
+            flt = expr if flt is None else flt & expr
+
+        # Poda de particiones por fecha + filtro fino por ts
+        if start is not None:
+            t0 = _parse_ts(start)
+            _and(ds.field("date") >= t0.date().isoformat())
+            _and(ds.field("ts") >= pa.scalar(t0, type=pa.timestamp("us", tz="UTC")))
+        if end is not None:
+            t1 = _parse_ts(end)
+            _and(ds.field("date") <= t1.date().isoformat())
+            _and(ds.field("ts") <= pa.scalar(t1, type=pa.timestamp("us", tz="UTC")))
+        if camera_ids is not None:
+            _and(ds.field("camera").isin(list(camera_ids)))
+        if scene_ids is not None:
+            _and(ds.field("scene_id").isin(list(scene_ids)))
+        if extra is not None:
+            _and(extra)
+
+        return dataset.to_table(columns=columns, filter=flt)
+
+    def read_detections(
+        self,
+        start: str | datetime | None = None,
+        end: str | datetime | None = None,
+        scene_ids: Iterable[str] | None = None,
+        typologies: Iterable[str] | None = None,
+        camera_ids: Iterable[str] | None = None,
+        columns: list[str] | None = None,
+    ) -> Any:
+        """Detecciones filtradas como pyarrow.Table (usar .to_pandas() si hace falta)."""
+        extra = ds.field("typology").isin(list(typologies)) if typologies is not None else None
+        return self._read("detections", DETECTIONS_SCHEMA, start, end, scene_ids, camera_ids, extra, columns)
+
+    def read_scenes(
+        self,
+        start: str | datetime | None = None,
+        end: str | datetime | None = None,
+        scene_ids: Iterable[str] | None = None,
+        camera_ids: Iterable[str] | None = None,
+        columns: list[str] | None = None,
+    ) -> Any:
+        """Metricas por escena como pyarrow.Table."""
+        return self._read("scenes", SCENES_SCHEMA, start, end, scene_ids, camera_ids, None, columns)
+
+
+_SHARED: ResultsStore | None = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_results_store() -> ResultsStore:
+    """
+    ResultsStore del proceso para el pipeline: las escenas de toda la
+    ejecucion comparten lotes y se vuelcan al salir.
+    """
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = ResultsStore(flush_interval_s=config.RESULTS_FLUSH_INTERVAL_S)
+            atexit.register(_SHARED.flush)
+        return _SHARED
+
+
+# ======================================================================
+# CONVERSOR DESDE reports/analysis_json
+# ======================================================================
+
+def convert_json_outputs(
+    analysis_dir: str | Path | None = None,
+    store: ResultsStore | None = None,
+    delete: bool = False,
+    camera_id: str | None = None,
+) -> int:
+    """
+    Importa los `<stem>_bundle.json` (o su `_bundle_evidence.json` si existe,
+    que aporta hash y timestamp) al almacen columnar. Devuelve escenas importadas.
+    Todas van a la particion de `camera_id` (por defecto la de
+    config.RESULTS_DEFAULT_CAMERA, salvo que el bundle traiga la suya).
+    Con delete=True borra los tres JSON de cada escena ya importada.
+    """
+    analysis_dir = Path(analysis_dir) if analysis_dir else Path(config.ANALYSIS_DIR)
+    store = store or ResultsStore()
+
+    converted: list[Path] = []
+    for bundle_path in sorted(analysis_dir.glob("*_bundle.json")):
+        stem = bundle_path.name[: -len("_bundle.json")]
+        evidence_path = analysis_dir / f"{stem}_bundle_evidence.json"
+        src = evidence_path if evidence_path.exists() else bundle_path
+        bundle = json.loads(src.read_text(encoding="utf-8"))
+
+        ts = (bundle.get("evidence") or {}).get("timestamp_utc")
+        if ts is None:
+            ts = datetime.fromtimestamp(src.stat().st_mtime, timezone.utc)
+        store.append_bundle(bundle, camera_id=camera_id, timestamp_utc=ts)
+        converted.append(bundle_path)
+
+    store.flush()
+
+    if delete:
+        for bundle_path in converted:
+            stem = bundle_path.name[: -len("_bundle.json")]
+            for p in (bundle_path, analysis_dir / f"{stem}_bundle_evidence.json", analysis_dir / f"{stem}.json"):
+                p.unlink(missing_ok=True)
+
+    return len(converted)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser()
+    p.add_argument("--analysis-dir", default=None)
+    p.add_argument("--store", default=None)
+    p.add_argument("--camera", default=None, help="Camara de las escenas importadas")
+    p.add_argument("--delete", action="store_true", help="Borra los JSON ya convertidos")
+    args = p.parse_args()
+
+    n = convert_json_outputs(args.analysis_dir, ResultsStore(args.store), delete=args.delete, camera_id=args.camera)
+    print("Escenas convertidas:", n)
@@ -9,16 +9,18 @@ from src.config import RUNS_DIR, ANALYSIS_DIR
 def run_inference(
     image_path: Path,
     model_path: Path,
-    conf_threshold: float = 0.25
+    conf_threshold: float = 0.25,
+    image=None,
 ) -> dict:
     """
     Ejecuta inferencia YOLO sobre una imagen y devuelve las detecciones.
+    Si se pasa `image` (BGR ya decodificada) no se vuelve a leer el fichero.
     """
 
     model = YOLO(str(model_path))
 
     results = model.predict(
-        source=str(image_path),
+        source=image if image is not None else str(image_path),
         conf=conf_threshold,
         save=False
     )
@@ -50,12 +52,12 @@ def run_inference(
     }
 
 
-def save_outputs(image_path: Path, analysis: dict):
+def save_outputs(image_path: Path, analysis: dict, image=None, write_json: bool = True):
     """
-    Guarda imagen con bounding boxes y JSON de análisis.
+    Guarda imagen con bounding boxes y (con write_json) JSON de análisis.
     """
 
-    img = cv2.imread(str(image_path))
+    img = image.copy() if image is not None else cv2.imread(str(image_path))
 
     for det in analysis["detections"]:
         x1, y1, x2, y2 = map(int, det["bbox_xyxy"])
@@ -80,12 +82,13 @@ def save_outputs(image_path: Path, analysis: dict):
     out_img = RUNS_DIR / image_path.name
     cv2.imwrite(str(out_img), img)
 
-    out_json = ANALYSIS_DIR / f"{image_path.stem}.json"
-    with open(out_json, "w") as f:
-        json.dump(analysis, f, indent=2)
-
     print(f"Imagen guardada en: {out_img}")
-    print(f"JSON guardado en: {out_json}")
+
+    if write_json:
+        out_json = ANALYSIS_DIR / f"{image_path.stem}.json"
+        with open(out_json, "w") as f:
+            json.dump(analysis, f, indent=2)
+        print(f"JSON guardado en: {out_json}")
 
 
 if __name__ == "__main__":
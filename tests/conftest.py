@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los tests importan el paquete `src` desde la raiz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,12 @@
+import pytest
+
+from src.blockchain import canonical
+
+
+@pytest.mark.parametrize("orjson_backend", [True, False], ids=["orjson", "stdlib"])
+def test_golden_corpus(orjson_backend, monkeypatch):
+    """Cada backend produce exactamente los bytes canonicos guardados en el corpus."""
+    if orjson_backend and not canonical._ORJSON_AVAILABLE:
+        pytest.skip("orjson no instalado")
+    monkeypatch.setattr(canonical, "_ORJSON_AVAILABLE", orjson_backend)
+    assert canonical.check_golden() == []
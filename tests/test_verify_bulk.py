@@ -0,0 +1,83 @@
+import re
+
+import pytest
+
+from src import config
+from src.blockchain.hashing import build_evidence_record
+from src.blockchain.stand_in import StandInServer, _Handler
+
+UNKNOWN_TXID = "ab" * 32
+
+
+@pytest.fixture
+def stand_in(tmp_path, monkeypatch):
+    """Stand-in WoC/ARC y almacenes propios: el test nunca toca mainnet ni data/."""
+    server = StandInServer().start()
+    monkeypatch.setattr(config, "BSV_PRIVATE_KEY", "")
+    monkeypatch.setattr(config, "WOC_BASE", server.woc_base)
+    monkeypatch.setattr(config, "ARC_URL", server.arc_url)
+    monkeypatch.setattr(config, "WOC_RATE_LIMIT_PER_S", 0.0)
+    monkeypatch.setattr(config, "LEDGER_PATH", tmp_path / "ledger.jsonl")
+    monkeypatch.setattr(config, "BROADCAST_QUEUE_PATH", tmp_path / "broadcast_queue.sqlite")
+    monkeypatch.setattr(config, "UTXO_DB_PATH", tmp_path / "utxos.sqlite")
+    yield server
+    server.stop()
+
+
+def _ledger(server):
+    """Tres registros anclados en txs del stand-in, uno en una tx desconocida y uno solo local."""
+    from src.blockchain.adapter import BSVAdapter
+
+    adapter = BSVAdapter(async_broadcast=False)
+    hashes = []
+    for i in range(5):
+        record = build_evidence_record({"scene_id": f"scene_{i}", "dataset_id": "test", "counts": {"car": i}})
+        adapter._local.register(record)
+        hashes.append(record["analysis_hash"])
+    txids = [server.state.fund("1BoatSLRHtKNngkdXEeobR76b53LETtpyT", 1, 1000 + i) for i in range(3)]
+    server.state.mine()
+    for h, txid in zip(hashes, txids + [UNKNOWN_TXID]):
+        adapter._local._update_record(h, {"tx_id": txid, "status": "on_chain"})
+    return adapter, hashes
+
+
+def _check(report, hashes):
+    by_hash = {r["analysis_hash"]: r for r in report["results"]}
+    assert [by_hash[h]["on_chain_verified"] for h in hashes[:3]] == [True, True, True]
+    assert by_hash[hashes[3]]["on_chain_verified"] is False
+    assert "on_chain_verified" not in by_hash[hashes[4]]
+    assert all(by_hash[h]["integrity_ok"] for h in hashes)
+    assert report["summary"]["on_chain"] == 3
+    assert report["summary"]["not_on_chain"] == 1
+
+
+def test_bulk_lookup_and_cache(stand_in):
+    from src.blockchain.verify_bulk import verify_many
+
+    adapter, hashes = _ledger(stand_in)
+    before = stand_in.stats["requests"]
+    report = verify_many(hashes, adapter=adapter)
+    _check(report, hashes)
+    assert report["summary"]["chain_queries"] == 4
+    assert stand_in.stats["requests"] - before == 1  # un solo POST /txs
+
+    # Segunda pasada: las verificaciones cacheadas siguen vigentes
+    before = stand_in.stats["requests"]
+    again = verify_many(hashes, adapter=adapter)
+    assert again["summary"]["chain_queries"] == 0
+    assert again["summary"]["cached"] == 4  # tambien la tx desconocida (404)
+    assert stand_in.stats["requests"] == before
+    by_hash = {r["analysis_hash"]: r for r in again["results"]}
+    assert all(by_hash[h]["on_chain_verified"] for h in hashes[:3])
+
+
+def test_per_tx_fallback(stand_in, monkeypatch):
+    from src.blockchain.verify_bulk import verify_many
+
+    # Sin endpoint bulk: el POST /txs responde 404 y se consulta tx a tx
+    monkeypatch.setattr(_Handler, "_TXS", re.compile(r"^$"))
+    adapter, hashes = _ledger(stand_in)
+    before = stand_in.stats["requests"]
+    report = verify_many(hashes, adapter=adapter)
+    _check(report, hashes)
+    assert stand_in.stats["requests"] - before == 1 + 4